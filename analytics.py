@@ -0,0 +1,205 @@
+#!/usr/bin/env python3
+"""
+Relatórios do histórico de mãos sobre as colunas exportadas (history_export.py)
+
+As colunas .npy são abertas com mmap_mode='r' e percorridas em blocos de
+CHUNK_ROWS mãos: cada relatório lê só as colunas de que precisa e agrega
+cada bloco com operações vetorizadas (bincount, ufunc.at), então a memória
+usada não depende do tamanho do histórico e 100 milhões de mãos são
+varridas em segundos.
+
+Como a mesa não tem banca, "carta aberta" é a primeira carta de cada
+jogador: o relatório de estouros agrupa as mãos pelo valor dela.
+
+O NumPy é opcional para o resto do jogo: só a exportação e as análises precisam dele.
+
+Uso: python analytics.py [--dir history_columns] [--report regras|primeira-carta|sessoes|jogadores]
+"""
+import argparse
+import json
+import os
+import time
+from card import DECK_SIZE, CARD_VALUE
+from constants import HISTORY_COLUMNS_DIR
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+CHUNK_ROWS = 1 << 22
+SEATS = 2
+RESULTS = 3  # derrota, empate, vitória: result + 1
+
+def require_numpy():
+    if np is None:
+        raise RuntimeError("As análises precisam do NumPy: pip install numpy")
+
+class HistoryColumns:
+    """Colunas exportadas, mapeadas em memória sob demanda"""
+    def __init__(self, directory=HISTORY_COLUMNS_DIR):
+        require_numpy()
+        self.directory = directory
+        with open(os.path.join(directory, 'columns.json')) as file:
+            self.metadata = json.load(file)
+        self.rows = self.metadata['rows']
+        self.columns = {}
+    
+    def __getitem__(self, name):
+        """Coluna só com as linhas válidas (os arquivos podem ter sobra no fim)"""
+        if name not in self.columns:
+            column = np.load(os.path.join(self.directory, f"{name}.npy"), mmap_mode='r')
+            self.columns[name] = column[..., :self.rows]
+        return self.columns[name]
+    
+    def chunks(self, chunk_rows=CHUNK_ROWS):
+        for start in range(0, self.rows, chunk_rows):
+            yield slice(start, min(start + chunk_rows, self.rows))
+
+def card_values():
+    """Tabela índice da carta -> valor (0 para NO_CARD), para indexar colunas uint8"""
+    values = np.zeros(256, dtype=np.uint8)
+    values[:DECK_SIZE] = CARD_VALUE
+    return values
+
+def rates(counts, hands):
+    return np.divide(counts, hands, out=np.zeros(counts.shape), where=hands > 0)
+
+def outcomes_by_rules(columns):
+    """
+    Resultado do assento 0 (quem gravou a mão) por conjunto de regras
+    [(regras, mãos, vitórias, derrotas, empates, estouros do assento 0, estouros do oponente)]
+    """
+    names = columns.metadata['rules']
+    kinds = len(names)
+    outcomes = np.zeros(kinds * RESULTS, dtype=np.int64)
+    busts = np.zeros((SEATS, kinds), dtype=np.int64)
+    for rows in columns.chunks():
+        rules = columns['rules'][rows].astype(np.intp)
+        result = columns['result'][0, rows]
+        outcomes += np.bincount(rules * RESULTS + (result + 1), minlength=kinds * RESULTS)
+        for seat in range(SEATS):
+            busts[seat] += np.bincount(rules, weights=columns['busted'][seat, rows], minlength=kinds).astype(np.int64)
+    
+    outcomes = outcomes.reshape(kinds, RESULTS)
+    report = []
+    for rule in range(kinds):
+        losses, pushes, wins = (int(count) for count in outcomes[rule])
+        report.append((names[rule], wins + losses + pushes, wins, losses, pushes, int(busts[0, rule]), int(busts[1, rule])))
+    return report
+
+def busts_by_first_card(columns):
+    """
+    Estouros e vitórias por valor da primeira carta, para cada assento
+    {assento: [(valor, mãos, estouros, vitórias)]} com valores de 2 a 11 (ás)
+    """
+    values = card_values()
+    hands = np.zeros((SEATS, 12), dtype=np.int64)
+    busts = np.zeros((SEATS, 12), dtype=np.int64)
+    wins = np.zeros((SEATS, 12), dtype=np.int64)
+    for rows in columns.chunks():
+        for seat in range(SEATS):
+            first = values[columns['cards'][seat, 0, rows]]
+            hands[seat] += np.bincount(first, minlength=12)
+            busts[seat] += np.bincount(first, weights=columns['busted'][seat, rows], minlength=12).astype(np.int64)
+            wins[seat] += np.bincount(first, weights=columns['result'][seat, rows] == 1, minlength=12).astype(np.int64)
+    return {
+        seat: [(value, int(hands[seat, value]), int(busts[seat, value]), int(wins[seat, value]))
+               for value in range(2, 12) if hands[seat, value]]
+        for seat in range(SEATS)
+    }
+
+def sessions(columns):
+    """
+    Duração das sessões (uma por mesa): [(mesa, mãos, início, fim, segundos jogados)]
+    Início e fim são acumulados com ufunc.at, sem ordenar as mãos por mesa.
+    """
+    names = columns.metadata['rooms']
+    kinds = len(names)
+    hands = np.zeros(kinds, dtype=np.int64)
+    played = np.zeros(kinds)
+    first = np.full(kinds, np.inf)
+    last = np.full(kinds, -np.inf)
+    for rows in columns.chunks():
+        room = columns['room'][rows]
+        when = columns['time'][rows]
+        hands += np.bincount(room, minlength=kinds)
+        played += np.bincount(room, weights=columns['duration'][rows], minlength=kinds)
+        np.minimum.at(first, room, when)
+        np.maximum.at(last, room, when)
+    return [(names[room], int(hands[room]), float(first[room]), float(last[room]), float(played[room]))
+            for room in range(kinds) if hands[room]]
+
+def player_totals(columns):
+    """Totais de cada jogador somando os dois assentos: [(nome, mãos, vitórias, derrotas, empates, estouros)]"""
+    names = columns.metadata['players']
+    kinds = len(names)
+    outcomes = np.zeros(kinds * RESULTS, dtype=np.int64)
+    busts = np.zeros(kinds, dtype=np.int64)
+    for rows in columns.chunks():
+        for seat in range(SEATS):
+            player = columns['player'][seat, rows].astype(np.intp)
+            outcomes += np.bincount(player * RESULTS + (columns['result'][seat, rows] + 1), minlength=kinds * RESULTS)
+            busts += np.bincount(player, weights=columns['busted'][seat, rows], minlength=kinds).astype(np.int64)
+    outcomes = outcomes.reshape(kinds, RESULTS)
+    report = []
+    for player in range(kinds):
+        losses, pushes, wins = (int(count) for count in outcomes[player])
+        report.append((names[player], wins + losses + pushes, wins, losses, pushes, int(busts[player])))
+    report.sort(key=lambda entry: entry[1], reverse=True)
+    return report
+
+def print_rules(columns):
+    print(f"{'regras':<26} {'mãos':>12} {'vitórias':>9} {'derrotas':>9} {'empates':>9} {'estouro':>8} {'estouro op.':>11}")
+    for name, hands, wins, losses, pushes, busts, opponent_busts in outcomes_by_rules(columns):
+        counts = rates(np.array([wins, losses, pushes, busts, opponent_busts]), hands)
+        print(f"{name:<26} {hands:>12,} {counts[0]:>9.2%} {counts[1]:>9.2%} {counts[2]:>9.2%} {counts[3]:>8.2%} {counts[4]:>11.2%}")
+
+def print_first_card(columns):
+    for seat, report in busts_by_first_card(columns).items():
+        print(f"assento {seat} ({'quem gravou' if seat == 0 else 'oponente'})")
+        print(f"  {'carta':>5} {'mãos':>12} {'estouro':>8} {'vitórias':>9}")
+        for value, hands, busts, wins in report:
+            label = 'A' if value == 11 else str(value)
+            print(f"  {label:>5} {hands:>12,} {busts / hands:>8.2%} {wins / hands:>9.2%}")
+
+def print_sessions(columns, limit=20):
+    report = sessions(columns)
+    report.sort(key=lambda entry: entry[1], reverse=True)
+    lengths = np.array([entry[1] for entry in report]) if report else np.zeros(1)
+    print(f"{len(report):,} sessões; mãos por sessão: média {lengths.mean():.1f}, mediana {np.median(lengths):.0f}, máximo {lengths.max():,}")
+    for room, hands, first, last, played in report[:limit]:
+        print(f"  {room:<20} {hands:>10,} mãos  {(last - first) / 60:>9.1f} min  {played / hands:>6.1f} s por mão")
+
+def print_players(columns, limit=20):
+    for name, hands, wins, losses, pushes, busts in player_totals(columns)[:limit]:
+        print(f"{name:<24} {hands:>10,} mãos  {wins / hands:>7.2%} V {losses / hands:>7.2%} D {pushes / hands:>7.2%} E  estouro {busts / hands:.2%}")
+
+REPORTS = {
+    'regras': print_rules,
+    'primeira-carta': print_first_card,
+    'sessoes': print_sessions,
+    'jogadores': print_players
+}
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--dir', default=HISTORY_COLUMNS_DIR)
+    parser.add_argument('--report', choices=list(REPORTS), action='append', help="padrão: todos")
+    args = parser.parse_args()
+    
+    try:
+        columns = HistoryColumns(args.dir)
+    except (RuntimeError, OSError, ValueError) as e:
+        print(f"Erro: {e}")
+        return
+    
+    print(f"{columns.rows:,} mãos em {args.dir}")
+    for name in args.report or REPORTS:
+        start = time.perf_counter()
+        print(f"\n== {name} ==")
+        REPORTS[name](columns)
+        print(f"({time.perf_counter() - start:.2f} s)")
+
+if __name__ == "__main__":
+    main()
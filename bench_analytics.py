@@ -0,0 +1,143 @@
+#!/usr/bin/env python3
+"""
+Benchmark da exportação em colunas (history_export.py) e das análises (analytics.py)
+
+Primeiro grava um histórico real com HandHistory e mede a exportação para
+colunas em mãos por segundo. Depois gera direto as colunas de um histórico
+sintético grande (10 milhões de mãos por padrão; --rows 100000000 para o
+caso de 100 milhões, ~5.7 GB em disco) e mede cada relatório sobre os
+arquivos mapeados em memória. Cada etapa roda num processo novo (o pico de
+memória de um processo é herdado pelos filhos), então o pico medido depois
+dos relatórios é o deles, e não o da exportação ou da geração das colunas.
+
+Uso: python bench_analytics.py [--rows 10000000] [--export-hands 100000] [--dir DIR]
+"""
+import argparse
+import multiprocessing
+import os
+import random
+import resource
+import shutil
+import tempfile
+import time
+import analytics
+from bench_history import make_hand
+from hand_history import HandHistory
+from history_export import EXPORT_VERSION, NO_CARD, MAX_HAND_CARDS, SEATS, create_columns, export_history, write_metadata, require_numpy
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+GENERATE_CHUNK = 1 << 22
+
+REPORTS = {
+    'regras': analytics.outcomes_by_rules,
+    'primeira-carta': analytics.busts_by_first_card,
+    'sessoes': analytics.sessions,
+    'jogadores': analytics.player_totals
+}
+
+def peak_memory_mb():
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+def bench_export(directory, hands, seed):
+    history_dir = os.path.join(directory, 'history')
+    history = HandHistory(history_dir, queue_size=hands)
+    rng = random.Random(seed)
+    now = time.time()
+    for i in range(hands):
+        history.append(make_hand(rng, rng.randrange(1000), now - (hands - i) * 5))
+    history.close()
+    
+    start = time.perf_counter()
+    rows = export_history(history_dir, os.path.join(directory, 'exported'))
+    elapsed = time.perf_counter() - start
+    print(f"exportação            {rows:,} mãos em {elapsed:.2f} s ({rows / elapsed:,.0f} mãos/s)")
+
+def generate_columns(out_dir, rows, seed, players=5000, rooms=200000):
+    """Colunas sintéticas com a mesma forma das exportadas, geradas em blocos"""
+    rng = np.random.default_rng(seed)
+    columns = create_columns(out_dir, rows)
+    now = time.time()
+    for start in range(0, rows, GENERATE_CHUNK):
+        end = min(start + GENERATE_CHUNK, rows)
+        count = end - start
+        columns['time'][start:end] = now - (rows - np.arange(start, end)) * 0.5
+        columns['duration'][start:end] = rng.uniform(2, 30, count)
+        columns['rules'][start:end] = rng.integers(0, 3, count)
+        columns['room'][start:end] = rng.integers(0, rooms, count)
+        columns['player'][:, start:end] = rng.integers(0, players, (SEATS, count))
+        result = rng.integers(-1, 2, count)
+        columns['result'][:, start:end] = np.stack([result, -result])
+        card_count = rng.integers(2, 6, (SEATS, count))
+        columns['card_count'][:, start:end] = card_count
+        columns['hits'][:, start:end] = card_count - 2
+        columns['score'][:, start:end] = rng.integers(12, 27, (SEATS, count))
+        columns['busted'][:, start:end] = columns['score'][:, start:end] > 21
+        cards = rng.integers(0, 52, (SEATS, MAX_HAND_CARDS, count), dtype=np.uint8)
+        cards[np.arange(MAX_HAND_CARDS)[None, :, None] >= card_count[:, None, :]] = NO_CARD
+        columns['cards'][:, :, start:end] = cards
+    for column in columns.values():
+        column.flush()
+    del columns
+    
+    write_metadata(out_dir, {
+        'version': EXPORT_VERSION,
+        'rows': rows,
+        'exported': now,
+        'players': [f"jogador-{i}" for i in range(players)],
+        'rooms': [f"mesa-{i}" for i in range(rooms)],
+        'rules': ["6 baralhos, lockstep", "6 baralhos, host distribui", "1 baralhos, lockstep"]
+    })
+
+def run_reports(columns_dir):
+    """Roda os relatórios e retorna os tempos, o pico de memória antes e o pico depois (MB)"""
+    columns = analytics.HistoryColumns(columns_dir)
+    before = peak_memory_mb()
+    times = {}
+    for name, report in REPORTS.items():
+        start = time.perf_counter()
+        report(columns)
+        times[name] = time.perf_counter() - start
+    return times, before, peak_memory_mb()
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--rows', type=int, default=10000000)
+    parser.add_argument('--export-hands', type=int, default=100000)
+    parser.add_argument('--dir', help="diretório de trabalho (padrão: temporário, apagado no fim)")
+    parser.add_argument('--seed', type=int, default=1)
+    args = parser.parse_args()
+    
+    try:
+        require_numpy()
+    except RuntimeError as e:
+        print(f"Erro: {e}")
+        return
+    
+    directory = args.dir or tempfile.mkdtemp(prefix='bench_analytics-')
+    pool = multiprocessing.get_context('spawn').Pool(1, maxtasksperchild=1)
+    try:
+        if args.export_hands:
+            pool.apply(bench_export, (directory, args.export_hands, args.seed))
+        
+        columns_dir = os.path.join(directory, 'columns')
+        start = time.perf_counter()
+        pool.apply(generate_columns, (columns_dir, args.rows, args.seed))
+        size = sum(os.path.getsize(os.path.join(columns_dir, name)) for name in os.listdir(columns_dir))
+        print(f"colunas sintéticas    {args.rows:,} mãos, {size / 1e9:.2f} GB, geradas em {time.perf_counter() - start:.1f} s")
+        
+        times, before, after = pool.apply(run_reports, (columns_dir,))
+        for name, elapsed in times.items():
+            print(f"{name:<21} {elapsed:8.2f} s ({args.rows / elapsed / 1e6:,.1f} milhões de mãos/s)")
+        print(f"pico de memória       {after:.0f} MB depois dos relatórios (processo com as colunas abertas: {before:.0f} MB)")
+    finally:
+        pool.close()
+        pool.join()
+        if not args.dir:
+            shutil.rmtree(directory, ignore_errors=True)
+
+if __name__ == "__main__":
+    main()
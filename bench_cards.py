@@ -0,0 +1,174 @@
+#!/usr/bin/env python3
+"""
+Micro-benchmark da representação das cartas: pontuação e distribuição
+
+Compara a representação antiga (valor e naipe como strings, valor numérico
+calculado com testes de pertinência e int() a cada chamada) com a atual
+(índice 0-51 e tabelas pré-calculadas em card.py). A pontuação a cada carta
+compara recalcular a mão inteira com a atualização incremental do Player,
+e o sapato reaproveitado entre as rodadas é comparado com um baralho novo por mão.
+
+A última parte mede com tracemalloc a memória alocada numa mão completa
+(baralho, distribuição e decodificação da mão recebida do outro jogador).
+
+Uso: python bench_cards.py [--hands 20000] [--repeat 5]
+"""
+import argparse
+import random
+import timeit
+import tracemalloc
+from constants import SHOE_DECKS, SHOE_PENETRATION
+from card import CARDS, Deck, Shoe, DECK_SIZE, CARD_RANK, CARD_SUIT, encode_hand, decode_hand
+from player import Player
+
+class LegacyCard:
+    """A carta como era antes: strings e valor numérico recalculado"""
+    def __init__(self, value, suit):
+        self.value = value
+        self.suit = suit
+    
+    def get_numeric_value(self):
+        if self.value in ['J', 'Q', 'K']:
+            return 10
+        elif self.value == 'A':
+            return 11
+        else:
+            return int(self.value)
+
+def legacy_score(hand):
+    score = sum(card.get_numeric_value() for card in hand)
+    num_aces = sum(1 for card in hand if card.value == 'A')
+    while score > 21 and num_aces > 0:
+        score -= 10
+        num_aces -= 1
+    return score
+
+def legacy_deck(rng):
+    suits = ['Hearts', 'Diamonds', 'Clubs', 'Spades']
+    values = ['2', '3', '4', '5', '6', '7', '8', '9', '10', 'J', 'Q', 'K', 'A']
+    cards = [LegacyCard(value, suit) for suit in suits for value in values]
+    rng.shuffle(cards)
+    return cards
+
+def random_hands(count, rng):
+    """Mãos de 2 a 5 cartas, nas duas representações"""
+    hands = []
+    for _ in range(count):
+        indices = rng.sample(range(DECK_SIZE), rng.randint(2, 5))
+        hands.append((
+            [LegacyCard(CARD_RANK[index], CARD_SUIT[index]) for index in indices],
+            [CARDS[index] for index in indices]
+        ))
+    return hands
+
+def legacy_hand_cycle(rng):
+    """Uma mão no modelo antigo: 52 objetos novos por baralho e um por carta recebida"""
+    cards = legacy_deck(rng)
+    hand = [cards.pop() for _ in range(3)]
+    wire = [{'value': card.value, 'suit': card.suit} for card in hand]
+    return [LegacyCard(item['value'], item['suit']) for item in wire]
+
+def hand_cycle(rng):
+    """A mesma mão com o registro de cartas: baralho de índices e cartas compartilhadas"""
+    deck = Deck(rng)
+    hand = [deck.draw() for _ in range(3)]
+    return decode_hand(encode_hand(hand))
+
+def allocated_per_hand(cycle, rng, hands):
+    """Pico de memória alocada durante uma mão, em regime (média de várias mãos)"""
+    cycle(rng)
+    tracemalloc.start()
+    total = 0
+    for _ in range(hands):
+        tracemalloc.reset_peak()
+        baseline = tracemalloc.get_traced_memory()[0]
+        cycle(rng)
+        total += tracemalloc.get_traced_memory()[1] - baseline
+    tracemalloc.stop()
+    return total / hands
+
+def best(timer, repeat):
+    return min(timer.repeat(repeat=repeat, number=1))
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--hands', type=int, default=20000)
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--seed', type=int, default=1)
+    args = parser.parse_args()
+    
+    rng = random.Random(args.seed)
+    hands = random_hands(args.hands, rng)
+    player = Player("bench")
+    
+    def score_legacy():
+        for legacy_hand, _ in hands:
+            legacy_score(legacy_hand)
+    
+    def score_compact():
+        for _, hand in hands:
+            player.hand = hand
+            player.calculate_score()
+    
+    # Pontuação a cada carta recebida, como durante a rodada
+    def hits_legacy():
+        for legacy_hand, _ in hands:
+            dealt = []
+            for card in legacy_hand:
+                dealt.append(card)
+                legacy_score(dealt)
+    
+    def hits_compact():
+        for _, hand in hands:
+            dealt = Player("bench")
+            for card in hand:
+                dealt.add_card(card)
+    
+    # As duas representações precisam pontuar igual
+    for legacy_hand, hand in hands[:1000]:
+        player.hand = hand
+        assert legacy_score(legacy_hand) == player.calculate_score()
+        dealt = Player("bench")
+        for count, card in enumerate(hand, 1):
+            dealt.add_card(card)
+            assert legacy_score(legacy_hand[:count]) == dealt.best_total()
+    
+    deals = max(1, args.hands // 10)
+    
+    def deal_legacy():
+        for _ in range(deals):
+            cards = legacy_deck(rng)
+            for _ in range(4):
+                cards.pop()
+    
+    def deal_compact():
+        for _ in range(deals):
+            deck = Deck(rng)
+            for _ in range(4):
+                deck.draw()
+    
+    shoe = Shoe(SHOE_DECKS, SHOE_PENETRATION)
+    
+    def deal_shoe():
+        for _ in range(deals):
+            shoe.begin_round(rng)
+            for _ in range(4):
+                shoe.draw()
+    
+    print(f"{'operação':<28} {'antes':>10} {'agora':>10} {'ganho':>7}")
+    for label, count, legacy, compact in (
+        ("pontuação (por mão)", args.hands, score_legacy, score_compact),
+        ("pontuação a cada carta", args.hands, hits_legacy, hits_compact),
+        ("baralho + 4 cartas (por mão)", deals, deal_legacy, deal_compact),
+        ("sapato + 4 cartas (por mão)", deals, deal_legacy, deal_shoe),
+    ):
+        before = best(timeit.Timer(legacy), args.repeat) / count
+        after = best(timeit.Timer(compact), args.repeat) / count
+        print(f"{label:<28} {before * 1e6:>8.2f}us {after * 1e6:>8.2f}us {before / after:>6.1f}x")
+    
+    before = allocated_per_hand(legacy_hand_cycle, rng, 200)
+    after = allocated_per_hand(hand_cycle, rng, 200)
+    print(f"{'memória alocada (por mão)':<28} {before:>8.0f} B {after:>8.0f} B {before / after:>6.1f}x")
+
+if __name__ == "__main__":
+    main()
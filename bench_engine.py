@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+"""
+Benchmark do engine de regras sem interface
+
+Mede o tempo de importação do engine (num processo novo, confirmando que o
+pygame não é carregado) e quantas rodadas por segundo um processo consegue
+jogar com várias mesas simultâneas, cada jogador pedindo carta abaixo de 17.
+
+Uso: python bench_engine.py [--tables 1000] [--rounds 20]
+"""
+import argparse
+import random
+import subprocess
+import sys
+import time
+from engine import TableEngine, LOCAL_WINS, REMOTE_WINS, PUSH
+
+IMPORT_PROBE = (
+    "import sys, time\n"
+    "start = time.perf_counter()\n"
+    "import engine\n"
+    "print(time.perf_counter() - start, 'pygame' in sys.modules)\n"
+)
+
+def measure_import():
+    output = subprocess.run([sys.executable, '-c', IMPORT_PROBE], capture_output=True, text=True, check=True).stdout
+    seconds, pygame_loaded = output.split()
+    return float(seconds), pygame_loaded == 'True'
+
+def play_round(engine, seed):
+    """Uma rodada lockstep completa, com os dois assentos jogados localmente"""
+    engine.new_lockstep_round(seed, 0)
+    engine.deal_initial_cards()
+    while engine.can_act() and engine.local_player.score < 17:
+        engine.hit()
+    if engine.can_act():
+        engine.stand()
+    while engine.remote_player.status == "playing" and engine.remote_player.score < 17:
+        engine.remote_hit()
+    if engine.remote_player.status == "playing":
+        engine.remote_stand()
+    return engine.result()
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--tables', type=int, default=1000)
+    parser.add_argument('--rounds', type=int, default=20)
+    parser.add_argument('--seed', type=int, default=1)
+    args = parser.parse_args()
+    
+    seconds, pygame_loaded = measure_import()
+    print(f"import engine: {seconds * 1000:.1f} ms (pygame carregado: {'sim' if pygame_loaded else 'não'})")
+    
+    rng = random.Random(args.seed)
+    start = time.perf_counter()
+    engines = [TableEngine() for _ in range(args.tables)]
+    created = time.perf_counter() - start
+    
+    results = {LOCAL_WINS: 0, REMOTE_WINS: 0, PUSH: 0}
+    start = time.perf_counter()
+    for _ in range(args.rounds):
+        for engine in engines:
+            results[play_round(engine, rng.getrandbits(64))] += 1
+    elapsed = time.perf_counter() - start
+    
+    total = args.tables * args.rounds
+    print(f"{args.tables} mesas criadas em {created * 1000:.1f} ms")
+    print(f"{total} rodadas em {elapsed:.2f} s ({total / elapsed:,.0f} rodadas/s)")
+    print(f"local {results[LOCAL_WINS] / total:.1%}  remoto {results[REMOTE_WINS] / total:.1%}  empate {results[PUSH] / total:.1%}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+"""
+Benchmark do histórico de mãos (hand_history.py)
+
+Simula milhares de mesas terminando mãos ao mesmo tempo, como no servidor
+de salas: várias threads chamam append() e medimos quanto cada chamada
+custa para quem registra (o caminho do relay) e quantas mãos por segundo a
+thread de gravação consegue escrever. Depois compara as consultas pelo
+índice ("últimas 20 mãos", aproveitamento por dia) com a varredura do log
+inteiro.
+
+Uso: python bench_history.py [--hands 200000] [--tables 5000] [--threads 8]
+"""
+import argparse
+import json
+import os
+import random
+import shutil
+import tempfile
+import threading
+import time
+from hand_history import HandHistory, OUTCOMES, hand_day
+
+def make_hand(rng, table, started):
+    outcome = rng.choice(OUTCOMES)
+    other = {'win': 'loss', 'loss': 'win', 'push': 'push'}[outcome]
+    return {
+        't': started,
+        'duration': round(rng.uniform(2, 30), 3),
+        'room': f"mesa-{table}",
+        'seat': 'host',
+        'lockstep': True,
+        'players': [
+            {'name': f"jogador-{table % 997}", 'cards': rng.sample(range(52), 3), 'score': rng.randint(12, 21), 'status': 'standing', 'outcome': outcome},
+            {'name': f"jogador-{(table * 7 + 1) % 997}", 'cards': rng.sample(range(52), 2), 'score': rng.randint(12, 21), 'status': 'standing', 'outcome': other}
+        ],
+        'actions': [[0, 'hit', 1.2], [0, 'stand', 2.5], [1, 'stand', 3.1]]
+    }
+
+def scan_last_hands(history, player, limit):
+    """Consulta sem índice: lê todos os segmentos e filtra"""
+    found = []
+    for segment in history.segments():
+        with open(history.path(segment, '.log'), 'rb') as file:
+            for line in file:
+                hand = json.loads(line)
+                if any(entry['name'] == player for entry in hand['players']):
+                    found.append(hand)
+    found.sort(key=lambda hand: hand['t'])
+    return found[-limit:][::-1]
+
+def scan_daily(history, player):
+    days = {}
+    for segment in history.segments():
+        with open(history.path(segment, '.log'), 'rb') as file:
+            for line in file:
+                hand = json.loads(line)
+                for entry in hand['players']:
+                    if entry['name'] == player:
+                        totals = days.setdefault(hand_day(hand['t']), [0, 0, 0])
+                        totals[OUTCOMES.index(entry['outcome'])] += 1
+    return days
+
+def timed(function, repeat=5):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--hands', type=int, default=200000)
+    parser.add_argument('--tables', type=int, default=5000)
+    parser.add_argument('--threads', type=int, default=8)
+    parser.add_argument('--seed', type=int, default=1)
+    args = parser.parse_args()
+    
+    directory = tempfile.mkdtemp(prefix='bench_history-')
+    try:
+        history = HandHistory(directory, queue_size=args.hands)
+        rng = random.Random(args.seed)
+        now = time.time()
+        hands = [make_hand(rng, rng.randrange(args.tables), now - (args.hands - i) * 5) for i in range(args.hands)]
+        per_thread = [hands[i::args.threads] for i in range(args.threads)]
+        append_times = [0.0] * args.threads
+        
+        def producer(index):
+            start = time.perf_counter()
+            for hand in per_thread[index]:
+                history.append(hand)
+            append_times[index] = time.perf_counter() - start
+        
+        start = time.perf_counter()
+        threads = [threading.Thread(target=producer, args=(index,)) for index in range(args.threads)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        enqueued = time.perf_counter() - start
+        history.flush()
+        written = time.perf_counter() - start
+        
+        print(f"{args.hands:,} mãos de {args.tables:,} mesas em {args.threads} threads")
+        print(f"append (quem registra)    {sum(append_times) / args.hands * 1e6:8.2f} us por mão")
+        print(f"enfileiradas em           {enqueued:8.2f} s")
+        print(f"gravadas em               {written:8.2f} s ({args.hands / written:,.0f} mãos/s)  descartadas {history.dropped}")
+        size = sum(os.path.getsize(os.path.join(directory, name)) for name in os.listdir(directory))
+        print(f"segmentos {len(history.segments())}, {size / 1e6:.1f} MB com os índices")
+        
+        player = hands[-1]['players'][0]['name']
+        assert [hand['t'] for hand in history.last_hands(player, 20)] == [hand['t'] for hand in scan_last_hands(history, player, 20)]
+        indexed = timed(lambda: history.last_hands(player, 20))
+        scanned = timed(lambda: scan_last_hands(history, player, 20), repeat=1)
+        print(f"últimas 20 mãos           índice {indexed * 1e3:8.3f} ms  varredura {scanned * 1e3:9.1f} ms  {scanned / indexed:,.0f}x")
+        indexed = timed(lambda: history.daily_stats(player))
+        scanned = timed(lambda: scan_daily(history, player), repeat=1)
+        print(f"aproveitamento por dia    índice {indexed * 1e3:8.3f} ms  varredura {scanned * 1e3:9.1f} ms  {scanned / indexed:,.0f}x")
+        
+        history.close()
+        start = time.perf_counter()
+        HandHistory(directory).close()
+        print(f"reabertura (carrega os índices) {time.perf_counter() - start:.2f} s")
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,65 @@
+#!/usr/bin/env python3
+"""
+Benchmark dos rankings (leaderboard.py)
+
+Monta um ranking com muitos jogadores, aplica atualizações de saldo como as
+que chegam a cada mão e compara a posição de um jogador e uma página do
+ranking pela skip list com a alternativa de ordenar todos os resultados a
+cada consulta.
+
+Uso: python bench_leaderboard.py [--players 100000] [--updates 100000] [--queries 2000]
+"""
+import argparse
+import random
+import time
+from leaderboard import Leaderboard
+
+def scan_rank(scores, player):
+    """Consulta sem estrutura: ordena todos os jogadores"""
+    ordered = sorted(scores.items(), key=lambda item: (-item[1], item[0]))
+    return next(index for index, (name, _) in enumerate(ordered) if name == player) + 1
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--players', type=int, default=100000)
+    parser.add_argument('--updates', type=int, default=100000)
+    parser.add_argument('--queries', type=int, default=2000)
+    parser.add_argument('--seed', type=int, default=1)
+    args = parser.parse_args()
+    
+    rng = random.Random(args.seed)
+    names = [f"jogador-{i}" for i in range(args.players)]
+    leaderboard = Leaderboard()
+    
+    start = time.perf_counter()
+    for name in names:
+        leaderboard.update(name, 1000)
+    elapsed = time.perf_counter() - start
+    print(f"{args.players:,} jogadores inseridos em {elapsed:.2f} s ({elapsed / args.players * 1e6:.1f} us cada)")
+    
+    start = time.perf_counter()
+    for _ in range(args.updates):
+        name = names[rng.randrange(args.players)]
+        leaderboard.update(name, leaderboard.scores[name] + rng.choice((-25, -10, 10, 25)))
+    elapsed = time.perf_counter() - start
+    print(f"{args.updates:,} atualizações em {elapsed:.2f} s ({args.updates / elapsed:,.0f}/s)")
+    
+    players = [names[rng.randrange(args.players)] for _ in range(args.queries)]
+    start = time.perf_counter()
+    ranks = [leaderboard.rank(player)[0] for player in players]
+    indexed = (time.perf_counter() - start) / args.queries
+    scanned_players = players[:max(1, args.queries // 100)]
+    start = time.perf_counter()
+    scanned_ranks = [scan_rank(leaderboard.scores, player) for player in scanned_players]
+    scanned = (time.perf_counter() - start) / len(scanned_players)
+    assert scanned_ranks == ranks[:len(scanned_players)]
+    print(f"posição do jogador        skip list {indexed * 1e6:8.1f} us  ordenando {scanned * 1e3:8.1f} ms  {scanned / indexed:,.0f}x")
+    
+    start = time.perf_counter()
+    for _ in range(args.queries):
+        leaderboard.page(rng.randrange(args.players), 20)
+    paged = (time.perf_counter() - start) / args.queries
+    print(f"página de 20 jogadores    skip list {paged * 1e6:8.1f} us")
+
+if __name__ == "__main__":
+    main()
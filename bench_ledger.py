@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+"""
+Benchmark das fichas (ledger.py)
+
+Várias threads fazem o papel das mesas do servidor de salas, cada uma
+liquidando mãos entre dois jogadores. Mede o custo de settle_hand() para
+quem liquida, quantas mãos por segundo chegam ao banco com o group commit e
+com uma transação por mão (batch_size=1), e a leitura do saldo pelo cache
+contra a consulta ao SQLite.
+
+Uso: python bench_ledger.py [--hands 100000] [--tables 2000] [--threads 8] [--players 5000]
+"""
+import argparse
+import os
+import random
+import shutil
+import tempfile
+import threading
+import time
+from hand_history import OUTCOMES
+from ledger import Ledger
+
+def make_hands(rng, count, tables, players):
+    hands = []
+    for _ in range(count):
+        outcome = rng.choice(OUTCOMES)
+        other = {'win': 'loss', 'loss': 'win', 'push': 'push'}[outcome]
+        first, second = rng.sample(range(players), 2)
+        hands.append({
+            't': time.time(),
+            'room': f"mesa-{rng.randrange(tables)}",
+            'wager': rng.choice((5, 10, 25)),
+            'players': [{'name': f"jogador-{first}", 'outcome': outcome}, {'name': f"jogador-{second}", 'outcome': other}]
+        })
+    return hands
+
+def run(path, hands, threads, batch_size):
+    """Liquida as mãos em threads; retorna (ledger ainda aberto, latências em s, tempo até gravar tudo)"""
+    ledger = Ledger(path, batch_size=batch_size, queue_size=len(hands))
+    per_thread = [hands[i::threads] for i in range(threads)]
+    latencies = [[] for _ in range(threads)]
+    
+    def table(index):
+        timings = latencies[index]
+        for hand in per_thread[index]:
+            start = time.perf_counter()
+            ledger.settle_hand(hand)
+            timings.append(time.perf_counter() - start)
+    
+    start = time.perf_counter()
+    workers = [threading.Thread(target=table, args=(index,)) for index in range(threads)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    ledger.flush()
+    elapsed = time.perf_counter() - start
+    return ledger, sorted(timing for timings in latencies for timing in timings), elapsed
+
+def percentile(values, fraction):
+    return values[min(len(values) - 1, int(len(values) * fraction))]
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--hands', type=int, default=100000)
+    parser.add_argument('--tables', type=int, default=2000)
+    parser.add_argument('--threads', type=int, default=8)
+    parser.add_argument('--players', type=int, default=5000)
+    parser.add_argument('--single-hands', type=int, default=5000, help="mãos do teste com uma transação por mão")
+    parser.add_argument('--seed', type=int, default=1)
+    args = parser.parse_args()
+    
+    directory = tempfile.mkdtemp(prefix='bench_ledger-')
+    try:
+        hands = make_hands(random.Random(args.seed), args.hands, args.tables, args.players)
+        print(f"{args.hands:,} mãos de {args.tables:,} mesas em {args.threads} threads, {args.players:,} jogadores")
+        
+        ledger, latencies, elapsed = run(os.path.join(directory, 'grupo.db'), hands, args.threads, batch_size=1024)
+        print(f"group commit              {elapsed:8.2f} s ({args.hands / elapsed:,.0f} mãos/s)  {ledger.commits:,} transações")
+        print(f"settle_hand (quem liquida)  p50 {percentile(latencies, 0.5) * 1e6:7.1f} us  p99 {percentile(latencies, 0.99) * 1e6:8.1f} us")
+        
+        single = hands[:args.single_hands]
+        single_ledger, single_latencies, single_elapsed = run(os.path.join(directory, 'unitario.db'), single, args.threads, batch_size=1)
+        print(f"uma transação por mão     {single_elapsed:8.2f} s ({len(single) / single_elapsed:,.0f} mãos/s)  {single_ledger.commits:,} transações")
+        single_ledger.close()
+        
+        # O saldo no cache tem de bater com o gravado
+        names = [player['name'] for hand in hands[:1000] for player in hand['players']]
+        stored = dict(ledger.reader.execute("SELECT player, balance FROM accounts").fetchall())
+        assert all(ledger.balance(name) == stored[name] for name in names)
+        
+        start = time.perf_counter()
+        for name in names:
+            ledger.balance(name)
+        cached = (time.perf_counter() - start) / len(names)
+        start = time.perf_counter()
+        for name in names:
+            ledger.reader.execute("SELECT balance FROM accounts WHERE player = ?", (name,)).fetchone()
+        queried = (time.perf_counter() - start) / len(names)
+        print(f"saldo                     cache {cached * 1e6:6.2f} us  consulta SQLite {queried * 1e6:6.2f} us  {queried / cached:,.0f}x")
+        ledger.close()
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,44 @@
+#!/usr/bin/env python3
+"""
+Benchmark do simulador Monte Carlo em lote contra o TableEngine
+
+Joga as mesmas regras (lockstep, sapato de SHOE_DECKS baralhos, os dois
+jogadores pedindo carta abaixo de 17) uma rodada por vez pelo engine e em lote pelo simulador com NumPy,
+compara mãos por segundo e confere se as taxas concordam dentro dos
+intervalos de confiança.
+
+Uso: python bench_simulator.py [--reference-hands 50000] [--hands 5000000] [--decks 6]
+"""
+import argparse
+from constants import SHOE_DECKS
+from engine import LOCAL_WINS, REMOTE_WINS, PUSH
+from simulator import simulate, simulate_reference
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--reference-hands', type=int, default=50000)
+    parser.add_argument('--hands', type=int, default=5000000)
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--decks', type=int, default=SHOE_DECKS)
+    args = parser.parse_args()
+    
+    reference = simulate_reference(args.reference_hands, seed=args.seed, decks=args.decks)
+    print("TableEngine (uma rodada por vez)")
+    print(reference.report())
+    
+    try:
+        batched = simulate(args.hands, seed=args.seed, decks=args.decks)
+    except RuntimeError as e:
+        print(f"Erro: {e}")
+        return
+    print("\nSimulador em lote (NumPy)")
+    print(batched.report())
+    
+    print(f"\nganho: {batched.hands_per_second() / reference.hands_per_second():.0f}x")
+    for outcome in (LOCAL_WINS, REMOTE_WINS, PUSH):
+        low, high = reference.confidence_interval(outcome)
+        agrees = low <= batched.rate(outcome) <= high
+        print(f"{outcome:<7} taxa do lote dentro do IC95% da referência: {'sim' if agrees else 'não'}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,43 @@
+#!/usr/bin/env python3
+"""
+Escalonamento do torneio com o número de processos
+
+Joga o mesmo torneio com 1, 2, 4... processos (até o número de CPUs), mostra
+partidas por segundo e a eficiência em relação ao ideal linear, e confere
+que o resultado é idêntico em todas as execuções (sementes por partida).
+
+Uso: python bench_tournament.py [--matches 2000] [--rounds 5]
+"""
+import argparse
+import os
+from tournament import run_tournament
+
+def worker_counts(limit):
+    count = 1
+    while count < limit:
+        yield count
+        count *= 2
+    yield limit
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--matches', type=int, default=2000)
+    parser.add_argument('--rounds', type=int, default=5)
+    parser.add_argument('--max-workers', type=int, default=os.cpu_count())
+    args = parser.parse_args()
+    
+    print(f"{'processos':>9} {'partidas/s':>11} {'eficiência':>11}")
+    baseline = None
+    outcomes = None
+    for workers in worker_counts(args.max_workers):
+        result, wall_time = run_tournament(args.matches, args.rounds, workers=workers)
+        rate = result.matches / wall_time
+        baseline = baseline or rate
+        print(f"{workers:>9} {rate:>11,.0f} {rate / (baseline * workers):>10.0%}")
+        
+        if outcomes is not None and result.outcomes != outcomes:
+            print("Resultado diferente entre execuções: as sementes por partida não estão sendo respeitadas")
+        outcomes = result.outcomes
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,226 @@
+#!/usr/bin/env python3
+"""
+Benchmark do transporte UDP confiável contra o TCP sob perda simulada
+
+Um shim local no estilo do netem fica entre o cliente e um servidor de eco e
+aplica atraso, jitter e perda. Para o UDP o shim descarta datagramas de
+verdade. Como não dá para descartar segmentos TCP no espaço de usuário, o
+shim TCP emula o efeito de uma perda: o trecho "perdido" só é entregue após
+o RTO mínimo do TCP, e tudo o que vem depois espera por ele (entrega em
+ordem), que é o bloqueio que se quer medir.
+
+Uso: python bench_transport.py [--loss 0 0.01 0.05] [--messages 300]
+"""
+import argparse
+import heapq
+import random
+import socket
+import statistics
+import threading
+import time
+from protocol import MessageBuffer, encode_message
+from transport import TcpTransport
+from udp_transport import UdpTransport
+
+TCP_MIN_RTO = 0.2  # RTO mínimo do TCP no Linux
+ECHO_PORT = 5700
+SHIM_PORT = 5701
+
+class Scheduler:
+    """Entrega itens em instantes futuros, na ordem dos prazos"""
+    def __init__(self, deliver):
+        self.deliver = deliver
+        self.queue = []
+        self.counter = 0
+        self.condition = threading.Condition()
+        self.running = True
+        thread = threading.Thread(target=self.loop)
+        thread.daemon = True
+        thread.start()
+    
+    def schedule(self, when, item):
+        with self.condition:
+            self.counter += 1
+            heapq.heappush(self.queue, (when, self.counter, item))
+            self.condition.notify()
+    
+    def loop(self):
+        while self.running:
+            with self.condition:
+                while self.running and (not self.queue or self.queue[0][0] > time.time()):
+                    timeout = self.queue[0][0] - time.time() if self.queue else None
+                    self.condition.wait(timeout)
+                if not self.running:
+                    return
+                item = heapq.heappop(self.queue)[2]
+            self.deliver(item)
+    
+    def stop(self):
+        with self.condition:
+            self.running = False
+            self.condition.notify()
+
+class UdpNetemShim:
+    """Encaminha datagramas entre o cliente e o servidor com atraso, jitter e perda"""
+    def __init__(self, port, upstream, delay, jitter, loss):
+        self.delay, self.jitter, self.loss = delay, jitter, loss
+        self.upstream = upstream
+        self.client_addr = None
+        self.front = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.front.bind(('127.0.0.1', port))
+        self.back = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.back.bind(('127.0.0.1', 0))
+        self.scheduler = Scheduler(lambda item: item[0].sendto(item[1], item[2]))
+        for source, target in ((self.front, self.back), (self.back, self.front)):
+            thread = threading.Thread(target=self.forward, args=(source, target))
+            thread.daemon = True
+            thread.start()
+    
+    def forward(self, source, target):
+        while True:
+            try:
+                datagram, addr = source.recvfrom(2048)
+            except OSError:
+                return
+            if source is self.front:
+                self.client_addr = addr
+                destination = self.upstream
+            else:
+                destination = self.client_addr
+            if random.random() < self.loss:
+                continue
+            when = time.time() + self.delay + random.uniform(0, self.jitter)
+            self.scheduler.schedule(when, (target, datagram, destination))
+    
+    def close(self):
+        self.scheduler.stop()
+        self.front.close()
+        self.back.close()
+
+class TcpNetemShim:
+    """Proxy TCP que emula atraso, jitter e o custo de perdas (RTO + entrega em ordem)"""
+    def __init__(self, port, upstream, delay, jitter, loss):
+        self.delay, self.jitter, self.loss = delay, jitter, loss
+        self.upstream = upstream
+        self.listener = TcpTransport().listen(port, host='127.0.0.1')
+        thread = threading.Thread(target=self.accept_loop)
+        thread.daemon = True
+        thread.start()
+    
+    def accept_loop(self):
+        try:
+            client, _ = self.listener.accept()
+        except OSError:
+            return
+        server = TcpTransport().connect(*self.upstream)
+        for source, target in ((client, server), (server, client)):
+            thread = threading.Thread(target=self.forward, args=(source, target))
+            thread.daemon = True
+            thread.start()
+    
+    def forward(self, source, target):
+        scheduler = Scheduler(lambda data: target.sendall(data))
+        last_delivery = 0
+        while True:
+            try:
+                data = source.recv(4096)
+            except OSError:
+                break
+            if not data:
+                break
+            when = time.time() + self.delay + random.uniform(0, self.jitter)
+            if random.random() < self.loss:
+                when += TCP_MIN_RTO
+            # O TCP entrega em ordem: nada passa à frente de um trecho atrasado
+            last_delivery = max(when, last_delivery)
+            scheduler.schedule(last_delivery, data)
+        scheduler.stop()
+    
+    def close(self):
+        self.listener.close()
+
+def echo_server(transport, port, ready):
+    listener = transport.listen(port, host='127.0.0.1')
+    ready.set()
+    connection, _ = listener.accept()
+    connection.settimeout(None)
+    while True:
+        try:
+            data = connection.recv(4096)
+        except OSError:
+            break
+        if not data:
+            break
+        connection.sendall(data)
+    listener.close()
+
+def run(transport, shim_class, loss, messages, interval, delay, jitter, port_offset):
+    echo_port, shim_port = ECHO_PORT + port_offset, SHIM_PORT + port_offset
+    ready = threading.Event()
+    thread = threading.Thread(target=echo_server, args=(transport, echo_port, ready))
+    thread.daemon = True
+    thread.start()
+    ready.wait()
+    shim = shim_class(shim_port, ('127.0.0.1', echo_port), delay, jitter, loss)
+    
+    connection = transport.connect('127.0.0.1', shim_port, timeout=5)
+    connection.settimeout(0.5)
+    sent_at = {}
+    latencies = []
+    buffer = MessageBuffer()
+    
+    def receiver():
+        while len(latencies) < messages:
+            try:
+                data = connection.recv(4096)
+            except socket.timeout:
+                continue
+            except OSError:
+                return
+            if not data:
+                return
+            for message in buffer.feed(data):
+                latencies.append(time.time() - sent_at[message['i']])
+    
+    receive_thread = threading.Thread(target=receiver)
+    receive_thread.daemon = True
+    receive_thread.start()
+    
+    for i in range(messages):
+        sent_at[i] = time.time()
+        connection.sendall(encode_message({'type': 'hit', 'i': i}))
+        time.sleep(interval)
+    receive_thread.join(timeout=10)
+    
+    connection.close()
+    shim.close()
+    return latencies
+
+def percentile(values, fraction):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--loss', type=float, nargs='+', default=[0.0, 0.01, 0.05])
+    parser.add_argument('--messages', type=int, default=300)
+    parser.add_argument('--interval', type=float, default=0.005)
+    parser.add_argument('--delay', type=float, default=0.01, help='atraso em cada sentido (s)')
+    parser.add_argument('--jitter', type=float, default=0.002)
+    args = parser.parse_args()
+    
+    print(f"{'transporte':<10} {'perda':>6} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'máx ms':>8} {'entregues':>10}")
+    offset = 0
+    for loss in args.loss:
+        for name, transport, shim_class in (('tcp', TcpTransport(), TcpNetemShim), ('udp', UdpTransport(), UdpNetemShim)):
+            offset += 2
+            latencies = run(transport, shim_class, loss, args.messages, args.interval, args.delay, args.jitter, offset)
+            if not latencies:
+                print(f"{name:<10} {loss:>6.0%} sem entregas")
+                continue
+            ms = [value * 1000 for value in latencies]
+            print(f"{name:<10} {loss:>6.0%} {statistics.median(ms):>8.1f} {percentile(ms, 0.95):>8.1f} "
+                  f"{percentile(ms, 0.99):>8.1f} {max(ms):>8.1f} {len(ms):>6}/{args.messages}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,225 @@
+"""
+Oponente bot: partidas sem um segundo jogador humano e clientes de teste de carga
+
+O bot é uma mesa de verdade (table.Table) do outro lado da conexão: as
+mensagens do jogador chegam a ele pelo NetworkManager, no mesmo
+Table.handle_message de uma partida em rede, e ele joga pelos mesmos hit()
+e stand(). Quem decide é uma política (limite fixo ou estratégia básica) e
+o BotDriver espera um tempo de "pensar" antes de cada ação, para a partida
+ter o ritmo de uma pessoa.
+
+BotOpponent liga a mesa do jogador à mesa do bot por uma MatchLink em
+memória (headless), esvaziada a cada quadro pelo jogo. SwarmBot é o mesmo
+bot com o próprio RoomClient, para o bot_swarm.py encher um servidor de
+salas de partidas pelo relay.
+"""
+import random
+import secrets
+import time
+from constants import GameState, BOT_STAND_ON, BOT_THINK_DELAY, BOT_NAME
+from headless import HeadlessApp, MatchLink, LinkedNetwork, ThresholdPolicy
+from room_client import RoomClient
+from strategy import StrategyPolicy
+from table import Table
+
+THRESHOLD = 'threshold'
+STRATEGY = 'strategy'
+POLICIES = (THRESHOLD, STRATEGY)
+
+def make_policy(name, strategy=None, stand_on=BOT_STAND_ON):
+    """
+    Política do bot pelo nome (POLICIES)
+    A estratégia básica precisa das tabelas (strategy.load_or_build); sem
+    elas, ainda sendo calculadas, o bot joga pelo limite.
+    """
+    if name not in POLICIES:
+        raise ValueError(f"Política de bot desconhecida: {name}")
+    if name == STRATEGY and strategy is not None:
+        return StrategyPolicy(strategy)
+    return ThresholdPolicy(stand_on)
+
+class BotDriver:
+    """
+    Faz o bot de uma mesa jogar pela política, com o tempo de pensar
+    think_delay é (mínimo, máximo) em segundos: cada decisão espera um
+    sorteio nesse intervalo a partir do momento em que o bot pode agir;
+    (0, 0) age na hora. update() é chamado periodicamente (a cada quadro do
+    jogo ou a cada tique do enxame).
+    """
+    def __init__(self, table, policy, think_delay=BOT_THINK_DELAY, rng=None):
+        self.table = table
+        self.policy = policy
+        self.think_delay = think_delay
+        self.rng = rng or random.Random()
+        self.act_at = None
+        self.actions = 0
+    
+    def think_time(self):
+        return self.rng.uniform(*self.think_delay)
+    
+    def update(self, now=None):
+        """Age se o tempo de pensar já passou; retorna True se o bot agiu"""
+        engine = self.table.engine
+        if not engine.can_act():
+            self.act_at = None
+            return False
+        
+        now = time.monotonic() if now is None else now
+        if self.act_at is None:
+            self.act_at = now + self.think_time()
+        if now < self.act_at:
+            return False
+        
+        self.act_at = None
+        # Decide e age sob o lock das mensagens recebidas, para não agir no
+        # meio de uma mensagem aplicada pela thread de recebimento (a
+        # distribuição da rodada nova, por exemplo)
+        with self.table.network.incoming_lock:
+            if not engine.can_act():
+                return False
+            if self.policy.wants_hit(engine):
+                self.table.hit()
+            else:
+                self.table.stand()
+        self.actions += 1
+        return True
+
+class BotOpponent:
+    """
+    Bot do outro lado de uma mesa do jogo, no mesmo processo
+    A mesa do jogador é o host e a do bot (num HeadlessApp, sem histórico
+    nem fichas) entra como cliente com o handshake; as duas trocam mensagens
+    por uma MatchLink, que update() esvazia antes e depois de o bot agir.
+    Tudo roda na thread de quem chama update(), sem sockets nem threads.
+    """
+    def __init__(self, table, policy, think_delay=BOT_THINK_DELAY, name=BOT_NAME):
+        self.table = table
+        self.link = MatchLink()
+        self.app = HeadlessApp()
+        self.app.player_name = name
+        # O lockstep exige o mesmo sapato (baralhos e corte) dos dois lados
+        self.app.shoe_factory = table.app.shoe_factory
+        self.bot_table = Table(self.app, table.room_id, table.name)
+        self.driver = BotDriver(self.bot_table, policy, think_delay)
+        
+        for side, is_host in ((table, True), (self.bot_table, False)):
+            side.network = LinkedNetwork(side)
+            side.network.connect(is_host, None, side.nonce_rng(is_host))
+            side.game_state = GameState.WAITING
+        table.network.peer_socket = self.link.endpoint(self.bot_table.network)
+        self.bot_table.network.peer_socket = self.link.endpoint(table.network)
+    
+    def start(self):
+        """Handshake do bot; a primeira rodada começa quando a semente é revelada"""
+        self.table.reset_view()
+        self.bot_table.network.send_message(self.bot_table.network.build_handshake())
+        self.link.pump()
+    
+    def is_open(self):
+        return self.table.is_open()
+    
+    def update(self, now=None):
+        """Entrega as mensagens pendentes e deixa o bot agir; com a mesa do jogador fechada, fecha a do bot"""
+        if not self.table.is_open():
+            # O que ainda estiver na fila (o host_left da saída) não interessa ao bot
+            self.bot_table.network.close_connection()
+            return
+        self.link.pump()
+        if self.driver.update(now):
+            self.link.pump()
+
+class SwarmBot(HeadlessApp):
+    """
+    Cliente de teste de carga: um bot com o próprio RoomClient, que cria ou
+    entra numa sala do servidor e joga pelo relay como um jogador de verdade
+    O host da sala informa as mãos ao servidor (report_hand), então o
+    enxame também exercita o histórico, as fichas e o ranking do servidor.
+    O host reinicia a rodada até completar rounds e então sai da mesa.
+    """
+    def __init__(self, name, server_host, server_port, policy, rounds, think_delay=(0, 0), transport=None, rng=None):
+        super().__init__()
+        self.player_name = name
+        self.game_transport = transport
+        self.policy = policy
+        self.rounds = rounds
+        self.think_delay = think_delay
+        self.rng = rng or random.Random()
+        self.table = None
+        self.driver = None
+        self.failure = None
+        
+        # Rodadas terminadas (contadas pelo host) e a duração de cada uma
+        self.completed = 0
+        self.round_times = []
+        self.restart_at = None
+        
+        self.room_client = RoomClient(server_host, server_port, transport)
+        self.room_client.set_callback(self.handle_room_server_message)
+        self.room_client.set_identity(name, secrets.token_hex(16))
+    
+    def connect(self):
+        return self.room_client.connect()
+    
+    def create_room(self, room_name):
+        return self.room_client.create_room(room_name, '127.0.0.1')
+    
+    def join_room(self, room_id):
+        return self.room_client.join_room(room_id)
+    
+    def handle_room_server_message(self, message):
+        command = message.get('command')
+        if command == 'room_created':
+            self.open_table(True, message)
+        elif command == 'join_success':
+            self.open_table(False, message)
+        elif command == 'join_failed':
+            self.failure = f"falha ao entrar na sala: {message.get('reason')}"
+        elif command == 'relay_data':
+            self.tables.route_relay(message.get('room_id'), message.get('data', {}))
+    
+    def open_table(self, is_host, message):
+        # Sem o endereço do host o cliente não tenta o caminho direto: o teste mede o relay do servidor
+        table = self.tables.open(message.get('room_id'), message.get('room_name'))
+        table.initialize(is_host, None, message.get('use_relay', True))
+        self.driver = BotDriver(table, self.policy, self.think_delay, self.rng)
+        self.table = table
+    
+    @property
+    def finished(self):
+        return self.failure is not None or (self.table is not None and not self.table.is_open())
+    
+    def update(self, now):
+        """Um tique do enxame: o bot age e o host conta a rodada, reinicia ou encerra a partida"""
+        table = self.table
+        if table is None:
+            return
+        if not table.is_open():
+            # A conexão da mesa encerrada é fechada à parte, sem segurar os outros bots
+            self.tables.prune()
+            return
+        self.driver.update(now)
+        if not table.is_host:
+            return
+        
+        if table.game_state != GameState.GAME_OVER:
+            return
+        if self.restart_at is None:
+            # Rodada terminada: conta e agenda o reinício (a próxima pode
+            # terminar no mesmo tique em que o bot age, então o agendamento
+            # é desfeito no reinício, não ao ver a rodada em andamento)
+            self.completed += 1
+            self.round_times.append(time.time() - table.engine.round_started)
+            self.restart_at = now + self.driver.think_time()
+        if self.completed >= self.rounds:
+            # Como o Table.leave, mas sem esperar pelo fechamento da conexão
+            table.network.send_message({'type': 'host_left'})
+            self.room_client.leave_room(table.room_id)
+            table.game_state = GameState.ROOM_LIST
+            self.tables.prune()
+        elif now >= self.restart_at:
+            self.restart_at = None
+            table.restart_game()
+    
+    def close(self):
+        self.tables.close_all()
+        self.room_client.disconnect()
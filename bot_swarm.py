@@ -0,0 +1,146 @@
+#!/usr/bin/env python3
+"""
+Teste de carga do servidor de salas com um enxame de bots
+
+Cada par de bot.SwarmBot abre duas conexões com o servidor, como dois jogos:
+um cria a sala, o outro entra nela e os dois jogam rounds rodadas pelo
+relay, com o host informando cada mão ao servidor. Todos os bots agem num
+só laço (um tique a cada --tick segundos); a rede de cada um roda nas
+threads do seu RoomClient, como no jogo. Mede as mãos por segundo e a
+duração das rodadas.
+
+Com --embedded o servidor roda neste processo (sem histórico nem fichas);
+sem ele, os bots se conectam a um servidor já iniciado (start_room_server.py).
+
+Uso: python bot_swarm.py [--pairs 50] [--rounds 20] [--host 127.0.0.1] [--port 5001] [--policy threshold] [--think 0 0]
+"""
+import argparse
+import contextlib
+import io
+import random
+import time
+from constants import ROOM_SERVER_PORT, SHOE_DECKS, STRATEGY_OPPONENT_STAND
+from bot import POLICIES, STRATEGY, SwarmBot, make_policy
+from room_server import start_embedded_room_server
+from strategy import load_or_build
+from transport import TcpTransport
+
+def wait_for(condition, timeout, tick=0.01):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        if time.monotonic() > deadline:
+            return False
+        time.sleep(tick)
+    return True
+
+def percentile(values, fraction):
+    return values[min(len(values) - 1, int(len(values) * fraction))]
+
+def run_swarm(server_host, server_port, pairs, rounds, policy, think_delay=(0, 0),
+              transport=None, tick=0.005, timeout=60, seed=0):
+    """
+    Joga pairs partidas simultâneas e retorna (bots, segundos até todos
+    estarem sentados, segundos até a última partida terminar), contados a
+    partir da criação das salas
+    Bots que não se conectaram, não entraram na sala ou não terminaram
+    dentro de timeout ficam com failure preenchido.
+    """
+    rng = random.Random(seed)
+    bots = []
+    for index in range(pairs * 2):
+        bot = SwarmBot(f"bot-{index:04d}", server_host, server_port, policy, rounds,
+                       think_delay, transport, random.Random(rng.getrandbits(64)))
+        if not bot.connect():
+            bot.failure = "sem conexão com o servidor de salas"
+        bots.append(bot)
+    hosts, guests = bots[0::2], bots[1::2]
+    
+    start = time.perf_counter()
+    for index, host in enumerate(hosts):
+        if not host.failure:
+            host.create_room(f"enxame-{index}")
+    for host, guest in zip(hosts, guests):
+        if host.failure or not wait_for(lambda: host.table is not None, timeout):
+            host.failure = host.failure or "a sala não foi criada"
+            guest.failure = "sem sala para entrar"
+            continue
+        if not guest.failure:
+            guest.join_room(host.table.room_id)
+    
+    seated = None
+    deadline = time.monotonic() + timeout
+    while True:
+        now = time.monotonic()
+        for bot in bots:
+            bot.update(now)
+        if seated is None and all(bot.table is not None or bot.failure for bot in bots):
+            seated = time.perf_counter() - start
+        if all(bot.finished for bot in bots):
+            break
+        if now > deadline:
+            for bot in bots:
+                if not bot.finished:
+                    bot.failure = "a partida não terminou a tempo"
+            break
+        time.sleep(tick)
+    elapsed = time.perf_counter() - start
+    
+    for bot in bots:
+        bot.close()
+    return bots, seated or elapsed, elapsed
+
+def report(bots, seated, elapsed):
+    hosts = bots[0::2]
+    hands = sum(host.completed for host in hosts)
+    round_times = sorted(duration for host in hosts for duration in host.round_times)
+    failures = [bot for bot in bots if bot.failure]
+    playing = max(elapsed - seated, 1e-9)
+    lines = [
+        f"{len(bots)} bots em {len(hosts)} mesas, sentados em {seated:.2f} s",
+        f"{hands:,} mãos em {playing:.2f} s ({hands / playing:,.1f} mãos/s)"
+    ]
+    if round_times:
+        lines.append(f"duração da rodada  p50 {percentile(round_times, 0.5) * 1e3:8.1f} ms  p99 {percentile(round_times, 0.99) * 1e3:8.1f} ms")
+    lines.append(f"falhas             {len(failures)}")
+    for bot in failures[:10]:
+        lines.append(f"  {bot.player_name}: {bot.failure}")
+    return "\n".join(lines)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--pairs', type=int, default=50)
+    parser.add_argument('--rounds', type=int, default=20)
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=ROOM_SERVER_PORT)
+    parser.add_argument('--embedded', action='store_true', help="inicia o servidor de salas neste processo")
+    parser.add_argument('--policy', choices=POLICIES, default='threshold')
+    parser.add_argument('--think', type=float, nargs=2, default=(0.0, 0.0), metavar=('MIN', 'MAX'),
+                        help="tempo de pensar de cada ação, em segundos")
+    parser.add_argument('--tick', type=float, default=0.005)
+    parser.add_argument('--timeout', type=float, default=120)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--verbose', action='store_true', help="mostra as mensagens de conexão das mesas")
+    args = parser.parse_args()
+    
+    strategy = load_or_build(SHOE_DECKS, STRATEGY_OPPONENT_STAND) if args.policy == STRATEGY else None
+    policy = make_policy(args.policy, strategy)
+    
+    server = None
+    if args.embedded:
+        server = start_embedded_room_server(TcpTransport(), args.port)
+        if server is None:
+            return
+    
+    print(f"{args.pairs} partidas de {args.rounds} rodadas contra {args.host}:{args.port} ({policy!r})")
+    # As mensagens de conexão de cada mesa só atrapalham com centenas de bots
+    output = contextlib.nullcontext() if args.verbose else contextlib.redirect_stdout(io.StringIO())
+    with output:
+        bots, seated, elapsed = run_swarm(args.host, args.port, args.pairs, args.rounds, policy, tuple(args.think),
+                                  tick=args.tick, timeout=args.timeout, seed=args.seed)
+    print(report(bots, seated, elapsed))
+    
+    if server:
+        server.stop()
+
+if __name__ == "__main__":
+    main()
@@ -1,29 +1,129 @@
 import random
 
+# Representação compacta: cada carta é um inteiro 0-51 (naipe * 13 + posto),
+# na mesma ordem em que o baralho é montado antes de embaralhar
+SUITS = ('Hearts', 'Diamonds', 'Clubs', 'Spades')
+RANKS = ('2', '3', '4', '5', '6', '7', '8', '9', '10', 'J', 'Q', 'K', 'A')
+DECK_SIZE = len(SUITS) * len(RANKS)
+
+# Tabelas indexadas pelo inteiro da carta
+CARD_RANK = tuple(RANKS[index % len(RANKS)] for index in range(DECK_SIZE))
+CARD_SUIT = tuple(SUITS[index // len(RANKS)] for index in range(DECK_SIZE))
+CARD_VALUE = tuple(11 if rank == 'A' else 10 if rank in ('J', 'Q', 'K') else int(rank) for rank in CARD_RANK)
+CARD_IS_ACE = tuple(rank == 'A' for rank in CARD_RANK)
+# Valor com o ás contando 1 (total "duro"), usado na pontuação incremental
+CARD_HARD_VALUE = tuple(1 if is_ace else value for value, is_ace in zip(CARD_VALUE, CARD_IS_ACE))
+# Contribuição da carta para a composição da mão: 5 bits por valor duro (1-10),
+# então a soma identifica a mão pela quantidade de cartas de cada valor
+COMPOSITION_BITS = 5
+CARD_COMPOSITION = tuple(1 << (COMPOSITION_BITS * (value - 1)) for value in CARD_HARD_VALUE)
+CARD_INDEX = {(CARD_RANK[index], CARD_SUIT[index]): index for index in range(DECK_SIZE)}
+
+# Sprite de cada carta, preenchido pela interface (cards.py) ao carregar o
+# baralho; o engine e o servidor não precisam dele
+CARD_SPRITES = [None] * DECK_SIZE
+
 class Card:
-    def __init__(self, value, suit):
-        self.value = value
-        self.suit = suit
-        
+    """
+    Carta identificada pelo índice 0-51; value e suit ficam para a interface
+    As cartas são imutáveis e existe uma instância por índice (CARDS): baralhos
+    guardam só índices e a decodificação da rede devolve as instâncias
+    compartilhadas, então jogar uma mão não cria objetos de carta.
+    """
+    __slots__ = ('index', 'value', 'suit')
+    
+    def __init__(self, value, suit, index=None):
+        object.__setattr__(self, 'index', CARD_INDEX[(value, suit)] if index is None else index)
+        object.__setattr__(self, 'value', value)
+        object.__setattr__(self, 'suit', suit)
+    
+    def __setattr__(self, name, value):
+        raise AttributeError("Cartas são imutáveis")
+    
+    @property
+    def sprite(self):
+        return CARD_SPRITES[self.index]
+    
     def get_numeric_value(self):
-        if self.value in ['J', 'Q', 'K']:
-            return 10
-        elif self.value == 'A':
-            return 11  # In this simple version, Ace is always 11
-        else:
-            return int(self.value)
+        return CARD_VALUE[self.index]  # In this simple version, Ace is always 11
     
     def __str__(self):
         return f"{self.value} of {self.suit}"
 
+# Registro das 52 cartas do processo, indexado pelo inteiro da carta
+CARDS = tuple(Card(CARD_RANK[index], CARD_SUIT[index], index) for index in range(DECK_SIZE))
+
+def encode_hand(hand):
+    """Mão no formato da rede: lista de índices"""
+    return [card.index for card in hand]
+
+def decode_hand(data):
+    """Mão recebida da rede (índices, ou {'value', 'suit'} de versões antigas), com as cartas do registro"""
+    return [CARDS[CARD_INDEX[(item['value'], item['suit'])]] if isinstance(item, dict) else CARDS[item] for item in data]
+
 class Deck:
-    def __init__(self):
-        suits = ['Hearts', 'Diamonds', 'Clubs', 'Spades']
-        values = ['2', '3', '4', '5', '6', '7', '8', '9', '10', 'J', 'Q', 'K', 'A']
-        self.cards = [Card(value, suit) for suit in suits for value in values]
-        random.shuffle(self.cards)
+    """Baralho como sequência de índices; draw() devolve as cartas do registro"""
+    def __init__(self, rng=None):
+        self.cards = bytearray(range(DECK_SIZE))
+        # rng permite embaralhar de forma determinística (modo lockstep);
+        # a permutação é a mesma de quando o baralho era uma lista de cartas
+        (rng or random).shuffle(self.cards)
     
     def draw(self):
         if len(self.cards) > 0:
-            return self.cards.pop()
-        return None 
\ No newline at end of file
+            return CARDS[self.cards.pop()]
+        return None
+
+# Cartas que ficam depois do corte: o máximo que uma rodada de dois jogadores
+# consome (11 cartas por mão sem passar de 21), então uma rodada iniciada
+# antes do corte nunca esgota o sapato
+ROUND_RESERVE = 22
+
+class Shoe:
+    """
+    Sapato com um ou mais baralhos, reaproveitado entre as rodadas
+    cards é o array pré-alocado de índices (decks x 52) e position o cursor
+    da próxima carta. Quando o cursor passa do corte (penetration), o sapato
+    é embaralhado no lugar no início da rodada seguinte; penetration=0
+    embaralha a cada rodada, como um baralho novo. rng (random.Random) é o
+    gerador dos embaralhamentos sem semente própria, normalmente o da mesa.
+    """
+    def __init__(self, decks=1, penetration=0.75, rng=None):
+        self.decks = decks
+        self.rng = rng or random
+        self.ordered = bytes(range(DECK_SIZE)) * decks
+        self.cards = bytearray(self.ordered)
+        self.cut = max(0, min(int(len(self.cards) * penetration), len(self.cards) - ROUND_RESERVE))
+        # Começa "esgotado": a primeira rodada embaralha
+        self.position = len(self.cards)
+        self.shuffles = 0
+    
+    def shuffle(self, rng=None):
+        # Sempre a partir da ordem de fábrica: o resultado depende só do
+        # gerador, então os dois lados do lockstep chegam ao mesmo sapato
+        # mesmo que um deles já tenha embaralhado antes
+        self.cards[:] = self.ordered
+        (rng or self.rng).shuffle(self.cards)
+        self.position = 0
+        self.shuffles += 1
+    
+    def needs_shuffle(self):
+        return self.position > 0 and self.position >= self.cut
+    
+    def begin_round(self, rng=None):
+        """Embaralha se o corte já passou; retorna True se embaralhou"""
+        if self.needs_shuffle():
+            self.shuffle(rng)
+            return True
+        return False
+    
+    def remaining(self):
+        return len(self.cards) - self.position
+    
+    def draw(self):
+        if self.position >= len(self.cards):
+            # Só acontece sem o corte entre as rodadas (modo sem lockstep)
+            self.shuffle()
+        card = CARDS[self.cards[self.position]]
+        self.position += 1
+        return card
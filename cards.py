@@ -1,26 +1,6 @@
 import pygame
-import random
-
-class CardSprite:
-    """
-    Classe para representar uma carta do baralho com imagem sprite
-    Mantém compatibilidade com a classe Card original
-    """
-    def __init__(self, value, suit, sprite):
-        self.value = value
-        self.suit = suit
-        self.sprite = sprite
-        
-    def get_numeric_value(self):
-        if self.value in ['J', 'Q', 'K']:
-            return 10
-        elif self.value == 'A':
-            return 11  # Ás vale 11 (versão simplificada)
-        else:
-            return int(self.value)
-    
-    def __str__(self):
-        return f"{self.value} of {self.suit}"
+from constants import SHOE_DECKS, SHOE_PENETRATION
+from card import Shoe, DECK_SIZE, CARD_RANK, CARD_SUIT, CARD_SPRITES
 
 class SpriteSheet:
     """
@@ -83,46 +63,33 @@ class SpriteSheet:
         """Retorna a sprite do verso da carta"""
         return self.card_sprites['Hearts']['back']  # Usando o verso vermelho
 
-class SpriteDeck:
-    """
-    Classe para representar um baralho usando as sprites
-    Mantém compatibilidade com a classe Deck original
-    """
-    def __init__(self, sprite_sheet):
-        # Inicializa o sprite_sheet se não for fornecido
-        if isinstance(sprite_sheet, str):
-            self.sprite_sheet = SpriteSheet(sprite_sheet)
-        else:
-            self.sprite_sheet = sprite_sheet
-            
-        # Cria o baralho com as mesmas regras da classe Deck original
-        suits = ['Hearts', 'Diamonds', 'Clubs', 'Spades']
-        values = ['2', '3', '4', '5', '6', '7', '8', '9', '10', 'J', 'Q', 'K', 'A']
-        
-        # Cria as cartas com sprites
-        self.cards = []
-        for suit in suits:
-            for value in values:
-                sprite = self.sprite_sheet.get_sprite(suit, value)
-                self.cards.append(CardSprite(value, suit, sprite))
+# Imagem do baralho, carregada uma única vez por processo
+_sprite_sheet = None
+
+def get_sprite_sheet():
+    """Retorna o sprite sheet compartilhado (carrega o PNG na primeira chamada)"""
+    global _sprite_sheet
+    if _sprite_sheet is None:
+        _sprite_sheet = SpriteSheet("assets/cards.png")
         
-        # Embaralha as cartas
-        random.shuffle(self.cards)
-    
-    def draw(self):
-        """Remove e retorna a carta do topo do baralho"""
-        if len(self.cards) > 0:
-            return self.cards.pop()
-        return None
+        # Cada carta do registro passa a apontar para a sua sprite
+        for index in range(DECK_SIZE):
+            CARD_SPRITES[index] = _sprite_sheet.get_sprite(CARD_SUIT[index], CARD_RANK[index])
+    return _sprite_sheet
 
-# Função para criar um baralho com sprites
-def create_sprite_deck():
-    """Cria e retorna um baralho com sprites"""
-    sprite_sheet = SpriteSheet("assets/cards.png")
-    return SpriteDeck(sprite_sheet)
+# Função para criar o sapato com sprites
+def create_sprite_shoe(rng=None):
+    """
+    Cria o sapato das mesas (SHOE_DECKS baralhos) cujas cartas têm sprite
+    O sapato é o mesmo card.Shoe (índices para o registro de cartas); só
+    garante que as sprites do registro já foram carregadas. rng é o gerador
+    da mesa.
+    """
+    get_sprite_sheet()
+    return Shoe(SHOE_DECKS, SHOE_PENETRATION, rng)
 
 # Exemplo de uso:
-# deck = create_sprite_deck()
-# card = deck.draw()
+# shoe = create_sprite_shoe()
+# shoe.begin_round()
+# card = shoe.draw()
 # print(card)  # Exibe o nome da carta
-# screen.blit(card.sprite, (x, y))  # Renderiza a sprite na tela 
\ No newline at end of file
@@ -16,10 +16,111 @@ GOLD = (255, 215, 0)
 GRAY = (128, 128, 128)
 DARK_GREEN = (0, 100, 0)
 
+# Direct P2P port (also used to upgrade relay sessions to a direct path)
+GAME_PORT = 5000
+
+# LAN discovery: UDP broadcast port, announcement period, minimum interval
+# between answers to the same peer, and how long a silent table stays listed
+LAN_DISCOVERY_PORT = 5002
+LAN_ANNOUNCE_INTERVAL = 2
+LAN_RESPONSE_MIN_INTERVAL = 0.5
+LAN_TABLE_TTL = 6
+
 # Room server configuration
 ROOM_SERVER_HOST = '69.62.103.94'
 ROOM_SERVER_PORT = 5001
 
+# Optional UDP transport for game messages (direct and relayed)
+UDP_ENABLED = False
+UDP_MIN_RTO = 0.05
+UDP_MAX_RETRIES = 8
+UDP_TICK = 0.02
+ORDERED_MESSAGE_TYPES = ('game_state', 'restart_game')
+
+# Multi-table play: thumbnails drawn for the tables not being shown
+MAX_TABLE_THUMBNAILS = 6
+THUMBNAIL_SIZE = (190, 66)
+
+# Run the room server inside the game process (single-machine play and tests)
+EMBEDDED_ROOM_SERVER = False
+
+# Lockstep: host and client derive the same shoe from a shared seed and only
+# exchange hit/stand intents during a hand
+LOCKSTEP_ENABLED = True
+
+# Shoe reused across rounds: number of decks and how deep the cut card sits.
+# Both players must use the same values, since lockstep derives the shoe on
+# each side from the shared seed
+SHOE_DECKS = 6
+SHOE_PENETRATION = 0.75
+
+# Strategy hints: the opponent model (hits below this total) and where the
+# precomputed EV tables are cached
+STRATEGY_OPPONENT_STAND = 17
+STRATEGY_CACHE_DIR = "cache"
+
+# Reproducible matches: a fixed seed makes every table derive its RNG (shoe
+# shuffles and lockstep nonces) from it and the room id; None draws a fresh
+# seed per table. Recording writes each table's seed, messages and actions
+# to RECORDINGS_DIR for replay.py (fixed seeds make the nonces predictable,
+# so keep MATCH_SEED for debugging and benchmarks)
+MATCH_SEED = None
+RECORD_MATCHES = False
+RECORDINGS_DIR = "recordings"
+
+# Player name shown to opponents and used in the hand history (None uses the
+# computer's name)
+PLAYER_NAME = None
+
+# File holding the key that proves the player name to the room server (created
+# on first run; the server binds a name to the first key it sees)
+PLAYER_KEY_PATH = "player.key"
+
+# Hand history: segmented log directory, segment size and how many finished
+# hands may wait for the background writer before new ones are dropped
+HISTORY_DIR = "history"
+HISTORY_SEGMENT_BYTES = 4 * 1024 * 1024
+HISTORY_QUEUE_SIZE = 10000
+
+# Columnar export of the hand history (history_export.py, read by analytics.py)
+HISTORY_COLUMNS_DIR = "history_columns"
+
+# Chips: SQLite ledger file, chips a new player starts with, the stake of each
+# hand and how many settlements may wait for the background writer (settling
+# blocks when it is full) and how many are group-committed per transaction
+LEDGER_PATH = "ledger.db"
+LEDGER_STARTING_BALANCE = 1000
+TABLE_STAKE = 10
+LEDGER_QUEUE_SIZE = 10000
+LEDGER_BATCH_SIZE = 1024
+
+# Bot opponent for offline play: decision policy ('strategy' follows the
+# strategy tables, 'threshold' hits below BOT_STAND_ON), the (min, max)
+# seconds it thinks before each action and the name the player sees
+BOT_POLICY = 'strategy'
+BOT_STAND_ON = 17
+BOT_THINK_DELAY = (0.6, 1.4)
+BOT_NAME = "Bot"
+
+# Session resume: how long a dropped player may take to come back, the
+# reconnect backoff bounds and how many unacknowledged (or out of order)
+# messages are kept before the match is ended instead of dropping any
+RECONNECT_GRACE_PERIOD = 30
+RECONNECT_BASE_DELAY = 0.5
+RECONNECT_MAX_DELAY = 8
+OUTBOX_SIZE = 256
+
+# Relay to direct path upgrade: probe period, how much faster the other path
+# must be before migrating, and how long to wait for the direct connection
+PATH_PROBE_INTERVAL = 2
+PATH_SWITCH_RATIO = 0.8
+PATH_MAX_LOSS = 0.3
+DIRECT_CONNECT_TIMEOUT = 3
+
+# Idle heartbeat (and latency probe) to the room server
+SERVER_HEARTBEAT_INTERVAL = 5
+ROOM_REQUEST_TIMEOUT = 5
+
 class GameState(Enum):
     MENU = 0
     WAITING = 1
@@ -28,4 +129,5 @@ class GameState(Enum):
     JOIN_SCREEN = 4
     ROOM_LIST = 5
     CREATE_ROOM = 6
-    SETTINGS = 7 
\ No newline at end of file
+    SETTINGS = 7 
+    LEADERBOARD = 8
\ No newline at end of file
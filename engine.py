@@ -0,0 +1,214 @@
+"""
+Regras de uma mesa de blackjack, sem pygame nem rede
+
+O TableEngine guarda o estado da mesa (baralho, jogadores, fase da partida),
+aplica as ações dos dois jogadores e calcula o resultado. A interface
+(table.Table e BlackjackGame) só traduz cliques e mensagens em chamadas ao
+engine, então servidor, bots, simuladores e benchmarks podem rodar milhares
+de mesas importando apenas este módulo.
+"""
+import random
+import time
+from constants import GameState
+from card import Shoe
+from player import Player
+from lockstep import SeatDeck
+
+# Resultados da partida, do ponto de vista do jogador local
+LOCAL_WINS = 'local'
+REMOTE_WINS = 'remote'
+PUSH = 'push'
+
+class TableEngine:
+    """
+    Estado e regras de uma mesa com dois jogadores (local e remoto)
+    As fases são as do GameState: WAITING até a primeira distribuição,
+    PLAYING durante a rodada e GAME_OVER quando alguém estoura ou os dois
+    param. O sapato (card.Shoe) é criado por shoe_factory() na primeira
+    rodada e reaproveitado nas seguintes; a interface usa o sapato com sprites.
+    rng é o gerador da mesa: os embaralhamentos fora do lockstep saem dele,
+    então uma mesa com semente fixa repete as mesmas cartas.
+    A rodada guarda o instante de início, as ações (quem, qual, segundos
+    desde o início) e, no lockstep, o round_id derivado da semente;
+    on_round_over(engine), se definido, é chamado quando a rodada termina,
+    para o histórico de mãos.
+    """
+    def __init__(self, shoe_factory=Shoe, rng=None):
+        self.shoe_factory = shoe_factory
+        self.rng = rng or random.Random()
+        self.state = GameState.WAITING
+        self.shoe = None
+        self.deck = None
+        
+        # No lockstep o sapato só pode ser reaproveitado se foi embaralhado pela
+        # semente combinada, ou seja, se é igual nos dois lados
+        self.shoe_synced = False
+        self.local_player = Player("You")
+        self.remote_player = Player("Opponent")
+        
+        # No modo lockstep cada jogador compra do seu assento no baralho compartilhado
+        self.local_deck = None
+        self.remote_deck = None
+        
+        self.round_started = time.time()
+        self.round_id = None
+        self.actions = []
+        self.on_round_over = None
+    
+    def reset_players(self):
+        self.local_player = Player("You")
+        self.remote_player = Player("Opponent")
+        self.round_started = time.time()
+        self.round_id = None
+        self.actions = []
+    
+    def log_action(self, seat, action):
+        self.actions.append((seat, action, round(time.time() - self.round_started, 3)))
+    
+    def get_shoe(self):
+        if self.shoe is None:
+            self.shoe = self.shoe_factory(rng=self.rng)
+        return self.shoe
+    
+    def close_round(self):
+        """Avança o cursor do sapato para depois das cartas compradas pelos assentos na rodada lockstep"""
+        if self.local_deck is not None:
+            self.shoe.position = max(self.local_deck.position, self.remote_deck.position) - 1
+        self.local_deck = None
+        self.remote_deck = None
+    
+    def new_round(self, rng=None):
+        """Nova rodada com o sapato próprio (o host distribui as cartas do oponente)"""
+        shoe = self.get_shoe()
+        self.close_round()
+        shoe.begin_round(rng)
+        self.shoe_synced = False
+        self.deck = shoe
+        self.reset_players()
+        self.state = GameState.PLAYING
+    
+    def new_lockstep_round(self, seed, seat):
+        """
+        Nova rodada a partir da semente combinada; cada lado compra do seu assento
+        O sapato continua de onde a rodada anterior parou e é embaralhado pela
+        semente quando passa do corte; os dois lados fazem as mesmas compras,
+        então os sapatos continuam iguais.
+        """
+        shoe = self.get_shoe()
+        self.close_round()
+        if not self.shoe_synced or shoe.needs_shuffle():
+            shoe.shuffle(random.Random(seed))
+            self.shoe_synced = True
+        self.deck = shoe
+        self.local_deck = SeatDeck(shoe.cards, seat, start=shoe.position)
+        self.remote_deck = SeatDeck(shoe.cards, 1 - seat, start=shoe.position)
+        self.reset_players()
+        # Identificador da rodada, igual nos dois lados (o servidor de salas
+        # só liquida a mão que os dois informarem com o mesmo)
+        self.round_id = f"{seed:016x}"
+        self.state = GameState.PLAYING
+    
+    @property
+    def lockstep(self):
+        return self.local_deck is not None
+    
+    def deal_initial_cards(self, deal_remote=False):
+        """
+        Duas cartas para cada jogador
+        No lockstep as cartas do oponente saem do assento dele; sem lockstep
+        só quem tem o baralho da mesa (deal_remote) distribui para o oponente.
+        """
+        for _ in range(2):
+            if self.lockstep:
+                self.local_player.hit(self.local_deck)
+                self.remote_player.hit(self.remote_deck)
+            else:
+                self.local_player.hit(self.deck)
+                if deal_remote:
+                    self.remote_player.hit(self.deck)
+    
+    def can_act(self):
+        """
+        O jogador local ainda pode pedir carta ou parar
+        Só depois da distribuição: no reinício do lockstep a rodada fica em
+        PLAYING sem cartas até a semente ser revelada.
+        """
+        return self.state == GameState.PLAYING and self.local_player.status == "playing" and bool(self.local_player.hand)
+    
+    def hit(self):
+        """Carta para o jogador local; retorna a carta ou None se a ação não era válida"""
+        if not self.can_act():
+            return None
+        card = self.local_player.hit(self.local_deck if self.lockstep else self.deck)
+        self.log_action(0, 'hit')
+        self.check_game_over()
+        return card
+    
+    def stand(self):
+        """O jogador local para; retorna False se a ação não era válida"""
+        if not self.can_act():
+            return False
+        self.local_player.stand()
+        self.log_action(0, 'stand')
+        self.check_game_over()
+        return True
+    
+    def remote_hit(self):
+        """Carta para o oponente a partir do assento dele (lockstep)"""
+        card = self.remote_player.hit(self.remote_deck)
+        self.log_action(1, 'hit')
+        self.check_game_over()
+        return card
+    
+    def discard_remote_hit(self):
+        """
+        Carta que o oponente comprou na rodada anterior, com a ação chegando
+        depois do reinício: a mão dele já foi descartada, mas o assento dele
+        no sapato avança como avançou do outro lado
+        """
+        if self.remote_deck is not None:
+            self.remote_deck.draw()
+    
+    def remote_stand(self):
+        self.remote_player.stand()
+        self.log_action(1, 'stand')
+        self.check_game_over()
+    
+    def set_remote_hand(self, cards, status):
+        """Substitui a mão do oponente pelo estado recebido do outro lado"""
+        self.remote_player.set_hand(cards)
+        self.remote_player.status = status
+        self.check_game_over()
+    
+    def check_game_over(self):
+        """Finaliza a partida se alguém estourou ou os dois já pararam"""
+        if self.state != GameState.PLAYING:
+            return
+        if self.remote_player.status == "busted" or self.local_player.status == "busted":
+            self.state = GameState.GAME_OVER
+        elif self.local_player.status != "playing" and self.remote_player.status != "playing":
+            self.state = GameState.GAME_OVER
+        else:
+            return
+        if self.on_round_over:
+            self.on_round_over(self)
+    
+    def result(self, local_first=True):
+        """
+        Resultado da partida: LOCAL_WINS, REMOTE_WINS ou PUSH
+        Se os dois estouraram perde quem joga primeiro, como no simulador,
+        em que o remoto nem joga depois do estouro do local. local_first diz
+        se é o jogador local; numa mesa em rede é o host, para os dois lados
+        chegarem ao mesmo resultado.
+        """
+        local_busted = self.local_player.status == "busted"
+        remote_busted = self.remote_player.status == "busted"
+        if local_busted and (local_first or not remote_busted):
+            return REMOTE_WINS
+        elif remote_busted:
+            return LOCAL_WINS
+        elif self.local_player.score > self.remote_player.score:
+            return LOCAL_WINS
+        elif self.remote_player.score > self.local_player.score:
+            return REMOTE_WINS
+        return PUSH
@@ -1,10 +1,41 @@
 import pygame
 from constants import GameState
+from bot import STRATEGY, THRESHOLD
 
 class EventHandler:
     def __init__(self, game):
         self.game = game
     
+    def handle_table_events(self, event):
+        """
+        Multi-mesa: TAB alterna entre as mesas abertas (e volta para elas a
+        partir do lobby), L abre a lista de salas sem sair da mesa e um clique
+        numa miniatura exibe aquela mesa. Retorna True se o evento foi consumido.
+        """
+        tables = self.game.tables
+        if not len(tables):
+            return False
+        viewing = self.game.viewing_table
+        
+        if event.type == pygame.KEYDOWN and event.key == pygame.K_TAB:
+            if viewing:
+                tables.cycle(-1 if event.mod & pygame.KMOD_SHIFT else 1)
+            else:
+                self.game.show_table()
+            return True
+        
+        if viewing and event.type == pygame.KEYDOWN and event.key == pygame.K_l:
+            self.game.game_state = GameState.ROOM_LIST
+            self.game.room_client.list_rooms()
+            return True
+        
+        if viewing and event.type == pygame.MOUSEBUTTONDOWN:
+            for room_id, rect in self.game.renderer.thumbnail_rects.items():
+                if rect.collidepoint(event.pos):
+                    tables.activate(room_id)
+                    return True
+        return False
+    
     def handle_menu_events(self, event):
         if event.type == pygame.MOUSEBUTTONDOWN:
             mouse_pos = pygame.mouse.get_pos()
@@ -15,6 +46,8 @@ class EventHandler:
             elif self.game.menu.join_button.collidepoint(mouse_pos):
                 self.game.game_state = GameState.ROOM_LIST
                 self.game.room_client.list_rooms()
+            elif self.game.menu.bot_button.collidepoint(mouse_pos):
+                self.game.start_bot_game()
             elif self.game.menu.settings_button.collidepoint(mouse_pos):
                 self.game.game_state = GameState.SETTINGS
             elif self.game.menu.exit_button.collidepoint(mouse_pos):
@@ -31,6 +64,12 @@ class EventHandler:
             elif self.game.settings.sound_off_button.collidepoint(mouse_pos):
                 self.game.settings.sound_enabled = False
             
+            # Política do bot
+            elif self.game.settings.bot_strategy_button.collidepoint(mouse_pos):
+                self.game.settings.bot_policy = STRATEGY
+            elif self.game.settings.bot_threshold_button.collidepoint(mouse_pos):
+                self.game.settings.bot_policy = THRESHOLD
+            
             # Iniciar arrasto do slider de volume
             elif self.game.settings.slider_rect.collidepoint(mouse_pos) or self.game.settings.slider_button_rect.collidepoint(mouse_pos):
                 self.game.settings.dragging_slider = True
@@ -92,39 +131,38 @@ class EventHandler:
         if event.type == pygame.MOUSEBUTTONDOWN:
             mouse_pos = pygame.mouse.get_pos()
             if self.game.menu.back_button.collidepoint(mouse_pos):
-                if self.game.room_client.is_host and self.game.room_client.room_id:
-                    self.game.room_client.delete_room(self.game.room_client.room_id)
-                
-                self.game.network.close_connection()
-                self.game.game_state = GameState.ROOM_LIST
-                self.game.room_client.list_rooms()
+                self.game.leave_table()
     
     def handle_playing_events(self, event):
-        if event.type == pygame.MOUSEBUTTONDOWN and self.game.local_player.status == "playing":
+        if event.type == pygame.KEYDOWN and event.key == pygame.K_F3:
+            self.game.renderer.toggle_network_hud()
+        elif event.type == pygame.KEYDOWN and event.key == pygame.K_h:
+            self.game.renderer.toggle_hint()
+        
+        if event.type == pygame.MOUSEBUTTONDOWN and self.game.tables.active.local_player.status == "playing":
             mouse_pos = pygame.mouse.get_pos()
             if self.game.renderer.hit_button.collidepoint(mouse_pos):
                 self.game.hit()
             elif self.game.renderer.stand_button.collidepoint(mouse_pos):
                 self.game.stand()
+            elif self.game.renderer.hint_button.collidepoint(mouse_pos):
+                self.game.renderer.toggle_hint()
     
     def handle_game_over_events(self, event):
         if event.type == pygame.KEYDOWN:
-            if event.key == pygame.K_r:  # Restart
+            if event.key == pygame.K_F3:  # HUD de rede
+                self.game.renderer.toggle_network_hud()
+            elif event.key == pygame.K_r:  # Restart
                 # Reset game
                 self.game.restart_game()
             elif event.key == pygame.K_q or event.key == pygame.K_m:  # Quit/Menu
-                if self.game.room_client.is_host and self.game.room_client.room_id:
-                    self.game.room_client.delete_room(self.game.room_client.room_id)
-                
-                self.game.network.close_connection()
-                self.game.game_state = GameState.ROOM_LIST
-                self.game.room_client.list_rooms()
+                self.game.leave_table()
         
         elif event.type == pygame.MOUSEBUTTONDOWN:
             mouse_pos = pygame.mouse.get_pos()
             
             # Verifica se é o host antes de processar os cliques nos botões
-            is_host = self.game.network.is_host if hasattr(self.game.network, 'is_host') else False
+            is_host = self.game.tables.active.is_host
             
             if is_host:
                 # Botão Nova Partida
@@ -132,16 +170,6 @@ class EventHandler:
                     # Reinicia o jogo
                     self.game.restart_game()
                 
-                # Botão Sair da Mesa
+                # Botão Sair da Mesa: avisa o cliente antes de fechar a conexão
                 elif hasattr(self.game.renderer, 'exit_room_button') and self.game.renderer.exit_room_button.collidepoint(mouse_pos):
-                    # Envia mensagem para o cliente antes de fechar a conexão
-                    self.game.network.send_message({'type': 'host_left'})
-                    
-                    # Deleta a sala se for host
-                    if self.game.room_client.room_id:
-                        self.game.room_client.delete_room(self.game.room_client.room_id)
-                    
-                    # Fecha a conexão e volta ao menu de salas
-                    self.game.network.close_connection()
-                    self.game.game_state = GameState.ROOM_LIST
-                    self.game.room_client.list_rooms() 
\ No newline at end of file
+                    self.game.leave_table(notify_peer=True)
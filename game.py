@@ -1,21 +1,30 @@
 import pygame
 import sys
 import socket
+import sqlite3
+import uuid
+import threading
 from constants import *
-from card import Deck, Card
-from cards import create_sprite_deck
-from player import Player
 from menu import Menu
 from settings import Settings
-from network import NetworkManager
+from table import TableManager, TABLE_STATES
+from cards import create_sprite_shoe
 from renderer import GameRenderer
 from event_handler import EventHandler
-from room_client import RoomClient
+from room_client import RoomClient, load_player_key
+from room_server import start_embedded_room_server
+from transport import TcpTransport
+from udp_transport import UdpTransport
 from room_menu import RoomMenu
+from lan_discovery import LanDiscovery
 from sound_manager import SoundManager
+from strategy import load_or_build
+from hand_history import HandHistory
+from ledger import Ledger
+from bot import BotOpponent, make_policy
 
 class BlackjackGame:
-    def __init__(self):
+    def __init__(self, transport=None, embedded_server=EMBEDDED_ROOM_SERVER):
         pygame.init()
         self.screen = pygame.display.set_mode((SCREEN_WIDTH, SCREEN_HEIGHT))
         pygame.display.set_caption("P2P Blackjack")
@@ -23,114 +32,151 @@ class BlackjackGame:
         self.font = pygame.font.SysFont(None, 36)
         self.small_font = pygame.font.SysFont(None, 24)
         
-        self.game_state = GameState.MENU
+        # Telas do lobby (menu, salas, configurações); as telas da partida
+        # vêm da mesa ativa, veja a propriedade game_state
+        self.screen_state = GameState.MENU
+        self.viewing_table = False
         self.menu = Menu(self.screen, self.font, self.small_font)
         self.room_menu = RoomMenu(self.screen, self.font, self.small_font)
         self.settings = Settings(self.screen, self.font, self.small_font)
         
-        # Game components will be initialized when starting a game
-        self.deck = None
-        self.local_player = None
-        self.remote_player = None
+        # Transporte das conexões (TCP; um LoopbackTransport compartilhado
+        # permite rodar várias instâncias do jogo no mesmo processo)
+        self.transport = transport or TcpTransport()
+        
+        # As mensagens da partida podem ir por UDP; o servidor de salas continua em TCP
+        self.game_transport = self.transport
+        if UDP_ENABLED and not self.transport.in_process:
+            self.game_transport = UdpTransport()
+        
+        # Nome do jogador para o oponente e o histórico de mãos
+        self.player_name = PLAYER_NAME or socket.gethostname()
+        try:
+            self.hand_history = HandHistory(HISTORY_DIR)
+        except (OSError, ValueError) as e:
+            print(f"Histórico de mãos indisponível: {e}")
+            self.hand_history = None
+        
+        # Fichas do jogador, persistidas entre as sessões
+        try:
+            self.ledger = Ledger(LEDGER_PATH)
+            # O saldo aparece na tela a cada quadro: fica no cache desde já
+            self.ledger.preload(self.player_name)
+        except (OSError, sqlite3.Error) as e:
+            print(f"Fichas indisponíveis: {e}")
+            self.ledger = None
+        
+        # Sapato das mesas: com as sprites das cartas carregadas
+        self.shoe_factory = create_sprite_shoe
+        
+        # Mesas abertas: cada uma com a sua partida e conexão com o outro jogador
+        self.tables = TableManager(self)
+        
+        # Oponentes bot das mesas offline, atualizados a cada quadro
+        self.bots = []
         
         # Initialize subsystems
-        self.network = NetworkManager(self)
         self.renderer = GameRenderer(self.screen, self.font, self.small_font)
         self.event_handler = EventHandler(self)
         self.sound_manager = SoundManager(self.settings)
         
+        # Servidor de salas embutido: roda neste processo, no mesmo transporte
+        server_host = ROOM_SERVER_HOST
+        self.embedded_server = None
+        if embedded_server:
+            self.embedded_server = start_embedded_room_server(self.transport, ROOM_SERVER_PORT)
+            server_host = '127.0.0.1'
+        
         # Room client para comunicação com o servidor de salas
-        self.room_client = RoomClient(ROOM_SERVER_HOST, ROOM_SERVER_PORT)
+        self.room_client = RoomClient(server_host, ROOM_SERVER_PORT, self.transport)
         self.room_client.set_callback(self.handle_room_server_message)
+        self.room_client.set_identity(self.player_name, load_player_key())
         
         # Tenta conectar ao servidor de salas
         try:
             self.room_client.connect()
         except:
             print("Não foi possível conectar ao servidor de salas")
-    
-    def initialize_game(self, is_host, peer_address=None, room_id=None, use_relay=False):
-        # Usa o SpriteDeck em vez do Deck padrão
-        self.deck = create_sprite_deck()
-        self.local_player = Player("You")
-        self.remote_player = Player("Opponent")
-        
-        # Reseta o estado do jogo no renderer
-        self.renderer.reset_game_state()
         
-        # Networking setup - agora com suporte a relay
-        self.network.setup_network(is_host, peer_address, room_id, use_relay)
+        # Tabelas de estratégia da dica: do cache ou calculadas em segundo plano
+        # na primeira execução (a dica aparece quando ficarem prontas)
+        self.strategy = None
+        strategy_thread = threading.Thread(target=self.load_strategy)
+        strategy_thread.daemon = True
+        strategy_thread.start()
         
-        if is_host:
-            if use_relay:
-                self.game_state = GameState.WAITING
-            else:
-                self.game_state = GameState.WAITING
+        # Descoberta de mesas na rede local, funciona mesmo sem o servidor de salas
+        self.lan_rooms_version = -1
+        self.lan_discovery = LanDiscovery(self.tables.lan_table)
+        if not self.transport.in_process:
+            self.lan_discovery.start()
+    
+    def initialize_game(self, is_host, peer_address=None, room_id=None, use_relay=False, name=None):
+        """Abre uma mesa (ou volta para ela, se já estiver aberta) e passa a exibi-la"""
+        table = self.tables.get(room_id)
+        if table is None:
+            table = self.tables.open(room_id or uuid.uuid4().hex[:8], name)
+            table.initialize(is_host, peer_address, use_relay)
+        self.tables.activate(table.room_id)
+        self.viewing_table = True
+    
+    def start_bot_game(self):
+        """Partida offline contra o bot: a mesa do jogador hospeda e o bot entra pelo handshake"""
+        # Sem as tabelas de estratégia (ainda sendo calculadas) o bot joga pelo limite
+        policy = make_policy(self.settings.bot_policy, self.strategy)
+        table = self.tables.open(f"bot-{uuid.uuid4().hex[:8]}", BOT_NAME)
+        bot = BotOpponent(table, policy)
+        self.bots.append(bot)
+        self.tables.activate(table.room_id)
+        self.viewing_table = True
+        bot.start()
+    
+    def update_bots(self):
+        """Entrega as mensagens das mesas contra o bot e deixa os bots agirem"""
+        for bot in self.bots:
+            bot.update()
+        self.bots = [bot for bot in self.bots if bot.is_open()]
+    
+    @property
+    def game_state(self):
+        """Estado da tela: o da mesa ativa enquanto ela é exibida, senão o das telas do lobby"""
+        table = self.tables.active
+        if self.viewing_table and table:
+            return table.game_state
+        return self.screen_state
+    
+    @game_state.setter
+    def game_state(self, state):
+        table = self.tables.active
+        if state in TABLE_STATES and table:
+            table.game_state = state
+            self.viewing_table = True
         else:
-            # Client immediately tries to connect
-            self.game_state = GameState.PLAYING
+            self.screen_state = state
+            self.viewing_table = False
     
-    def deal_initial_cards(self):
-        # Deal two cards to each player
-        for _ in range(2):
-            self.local_player.hit(self.deck)
-            # Apenas o host distribui cartas para o jogador remoto
-            if hasattr(self.network, 'is_host') and self.network.is_host:
-                self.remote_player.hit(self.deck)
-        
-        # Send initial state to the other player
-        self.network.send_game_state(self.local_player)
+    def show_table(self, room_id=None):
+        """Volta a exibir uma mesa aberta (a ativa, se nenhuma for informada)"""
+        if room_id is not None:
+            self.tables.activate(room_id)
+        if self.tables.active:
+            self.viewing_table = True
     
-    def handle_message(self, message):
-        if message.get('type') == 'game_state':
-            # Update remote player's hand and status
-            remote_hand = message.get('hand', [])
-            
-            # Recria as cartas a partir dos dados recebidos
-            # Precisamos usar Card em vez de CardSprite porque não temos a sprite do lado do cliente
-            self.remote_player.hand = []
-            for card_data in remote_hand:
-                card_value = card_data['value']
-                card_suit = card_data['suit']
-                
-                # Cria uma carta normal (Card) para cada carta recebida
-                card = Card(card_value, card_suit)
-                self.remote_player.hand.append(card)
-            
-            self.remote_player.status = message.get('status', 'playing')
-            self.remote_player.calculate_score()
-            
-            # Check if game is over - finaliza a partida imediatamente se o jogador remoto estourar
-            if self.remote_player.status == "busted":
-                self.game_state = GameState.GAME_OVER
-            elif self.local_player.status != "playing" and self.remote_player.status != "playing":
-                self.game_state = GameState.GAME_OVER
-        
-        elif message.get('type') == 'restart_game':
-            # O host iniciou um novo jogo, então reiniciamos também
-            # A diferença é que não enviamos mensagem de reinício de volta (para evitar loop)
-            self.deck = create_sprite_deck()
-            self.local_player = Player("You")
-            self.remote_player = Player("Opponent")
-            
-            # Reseta o estado do jogo no renderer
-            self.renderer.reset_game_state()
-            
-            # Atualiza o estado do jogo
-            self.game_state = GameState.PLAYING
-            
-            # Distribui as cartas iniciais para o jogador local
-            self.deal_initial_cards()
-            
-            # Não precisamos distribuir as cartas para o jogador remoto,
-            # pois o host fará isso e enviará via game_state
-
-        elif message.get('type') == 'host_left':
-            # O host saiu da mesa, então também devemos voltar para a lista de salas
-            print("O host saiu da mesa. Retornando para a lista de salas.")
-            self.network.close_connection()
-            self.game_state = GameState.ROOM_LIST
-            self.room_client.list_rooms()
+    def leave_table(self, notify_peer=False):
+        """Sai da mesa ativa e volta para a lista de salas"""
+        table = self.tables.active
+        if table:
+            table.leave(notify_peer)
+        self.game_state = GameState.ROOM_LIST
+        self.room_client.list_rooms()
+    
+    def update_tables(self):
+        """Fecha as mesas cuja partida acabou; se era a exibida, mostra a tela em que ela terminou"""
+        viewing = self.tables.active if self.viewing_table else None
+        for table in self.tables.prune():
+            if table is viewing:
+                self.screen_state = table.game_state
+                self.viewing_table = False
     
     def handle_room_server_message(self, message):
         """Processa mensagens do servidor de salas"""
@@ -141,15 +187,14 @@ class BlackjackGame:
             self.room_menu.update_rooms(message.get('rooms', []))
         
         elif command == 'room_created':
-            # Sala criada com sucesso, guardar o ID
+            # Sala criada com sucesso (a cadeira fica registrada no RoomClient)
             room_id = message.get('room_id')
-            self.room_client.set_room_id(room_id)
             
             # Verificar se deve usar relay
             use_relay = message.get('use_relay', True)
             
-            # Iniciar jogo como host
-            self.initialize_game(is_host=True, room_id=room_id, use_relay=use_relay)
+            # Abrir a mesa como host
+            self.initialize_game(is_host=True, room_id=room_id, use_relay=use_relay, name=message.get('room_name'))
         
         elif command == 'join_success':
             # Conseguiu entrar na sala
@@ -159,8 +204,8 @@ class BlackjackGame:
             # Verificar se deve usar relay
             use_relay = message.get('use_relay', True)
             
-            # Iniciar jogo como cliente
-            self.initialize_game(is_host=False, peer_address=host_ip, room_id=room_id, use_relay=use_relay)
+            # Abrir a mesa como cliente
+            self.initialize_game(is_host=False, peer_address=host_ip, room_id=room_id, use_relay=use_relay, name=message.get('room_name'))
         
         elif command == 'join_failed':
             # Falha ao entrar na sala, mostrar mensagem de erro
@@ -170,67 +215,41 @@ class BlackjackGame:
             # Atualizar lista de salas
             self.room_client.list_rooms()
         
+        elif command == 'session_resumed':
+            # Reconectamos ao servidor de salas: retomar a sessão com o outro jogador da mesa
+            table = self.tables.get(message.get('room_id'))
+            if table:
+                table.network.resume_relay()
+        
+        elif command == 'resume_failed':
+            # A cadeira não estava mais reservada, a partida foi perdida
+            print(f"Não foi possível retomar a sessão: {message.get('reason')}")
+            table = self.tables.get(message.get('room_id'))
+            if table and table.network.use_relay:
+                table.network.close_connection()
+                table.game_state = GameState.ROOM_LIST
+                self.room_client.list_rooms()
+        
+        elif command == 'leaderboard':
+            # Página do ranking pedida pela tela do ranking
+            self.room_menu.update_leaderboard(message)
+        
         elif command == 'relay_data':
-            # Dados recebidos através do servidor de relay
+            # Dados recebidos através do servidor de relay, para a mesa da sala
             relay_data = message.get('data', {})
-            
-            # Processar os dados recebidos via relay
-            self.network.handle_relay_message(relay_data)
+            self.tables.route_relay(message.get('room_id'), relay_data)
     
     def hit(self):
-        if self.game_state == GameState.PLAYING and self.local_player.status == "playing":
-            # Reproduz o som da carta sendo puxada
-            self.sound_manager.play_card_sound()
-            
-            # Adiciona uma nova carta à mão do jogador
-            self.local_player.hit(self.deck)
-            self.network.send_message({'type': 'hit'})
-            self.network.send_game_state(self.local_player)
-            
-            # Check if busted - finaliza a partida imediatamente se o jogador local estourar
-            if self.local_player.status == "busted":
-                self.game_state = GameState.GAME_OVER
+        if self.tables.active:
+            self.tables.active.hit()
     
     def stand(self):
-        if self.game_state == GameState.PLAYING and self.local_player.status == "playing":
-            self.local_player.stand()
-            self.network.send_message({'type': 'stand'})
-            self.network.send_game_state(self.local_player)
-            
-            # Check if game is over
-            if self.remote_player.status != "playing":
-                self.game_state = GameState.GAME_OVER
-    
-    def determine_winner(self):
-        if self.local_player.status == "busted":
-            return "Oponente venceu!"
-        elif self.remote_player.status == "busted":
-            return "Você venceu!"
-        elif self.local_player.score > self.remote_player.score:
-            return "Você venceu!"
-        elif self.remote_player.score > self.local_player.score:
-            return "Oponente venceu!"
-        else:
-            return "Empate!"
+        if self.tables.active:
+            self.tables.active.stand()
     
     def restart_game(self):
-        # Usa o SpriteDeck em vez do Deck padrão
-        self.deck = create_sprite_deck()
-        self.local_player = Player("You")
-        self.remote_player = Player("Opponent")
-        
-        # Reseta o estado do jogo no renderer
-        self.renderer.reset_game_state()
-        
-        # Atualiza o estado do jogo
-        self.game_state = GameState.PLAYING
-        
-        # Envia mensagem para o oponente informando que o jogo foi reiniciado
-        if hasattr(self.network, 'is_host') and self.network.is_host:
-            self.network.send_message({'type': 'restart_game'})
-        
-        # Distribui as cartas iniciais
-        self.deal_initial_cards()
+        if self.tables.active:
+            self.tables.active.restart_game()
     
     def handle_menu_update(self):
         """Atualiza o jogo baseado nas ações do menu"""
@@ -244,6 +263,11 @@ class BlackjackGame:
         if action == "refresh":
             self.room_client.list_rooms()
         
+        elif action == "leaderboard":
+            self.game_state = GameState.LEADERBOARD
+            self.room_menu.open_leaderboard()
+            self.request_leaderboard()
+        
         elif action == "create_room":
             self.game_state = GameState.CREATE_ROOM
             self.room_menu.room_name_input = ""
@@ -251,12 +275,54 @@ class BlackjackGame:
         
         elif action == "join_room":
             selected_room = self.room_menu.get_selected_room()
-            if selected_room:
-                self.room_client.join_room(selected_room['id'])
+            if selected_room and selected_room.get('lan') and (selected_room.get('lan_only') or not self.room_client.connected):
+                # Mesa encontrada só na rede local: conexão direta com o host
+                self.initialize_game(is_host=False, peer_address=selected_room['host'], room_id=selected_room['id'])
+            elif selected_room and self.tables.get(selected_room['id']):
+                # Já estamos sentados nessa mesa: apenas volta para ela
+                self.show_table(selected_room['id'])
+            elif selected_room:
+                # A resposta chega pelo callback; o Future só trata a falta de resposta
+                self.room_client.join_room(selected_room['id']).add_done_callback(self.handle_join_timeout)
         
         elif action == "back":
             self.game_state = GameState.MENU
     
+    def handle_leaderboard_action(self, action):
+        """Processa ações da tela do ranking"""
+        if action == "switch_board":
+            self.room_menu.switch_leaderboard()
+            self.request_leaderboard()
+        
+        elif action in ("previous_page", "next_page"):
+            if self.room_menu.turn_leaderboard_page(-1 if action == "previous_page" else 1):
+                self.request_leaderboard()
+        
+        elif action == "back":
+            self.game_state = GameState.ROOM_LIST
+    
+    def request_leaderboard(self):
+        """Pede ao servidor a página atual do ranking, com a posição do jogador; a resposta chega pelo callback"""
+        menu = self.room_menu
+        if not self.room_client.connected:
+            menu.open_leaderboard("Servidor de salas indisponível")
+            return
+        future = self.room_client.get_leaderboard(menu.leaderboard_board, menu.leaderboard_offset, menu.leaderboard_page_size, self.player_name)
+        future.add_done_callback(self.handle_leaderboard_timeout)
+    
+    def handle_leaderboard_timeout(self, future):
+        if future.exception() is not None and self.room_menu.leaderboard is None:
+            self.room_menu.leaderboard_status = "Servidor de salas indisponível"
+    
+    def handle_join_timeout(self, future):
+        """Volta para a lista de salas se o servidor não respondeu ao pedido de entrada"""
+        error = future.exception()
+        if error is None:
+            return
+        print(f"Falha ao entrar na sala: {error}")
+        if self.game_state == GameState.ROOM_LIST:
+            self.room_client.list_rooms()
+    
     def handle_create_room_action(self, action):
         """Processa ações da tela de criação de sala"""
         if action == "confirm_create":
@@ -264,11 +330,44 @@ class BlackjackGame:
             if room_name:
                 # Usar o IP atual como o IP do host
                 host_ip = socket.gethostbyname(socket.gethostname())
-                self.room_client.create_room(room_name, host_ip)
+                if self.room_client.connected:
+                    self.room_client.create_room(room_name, host_ip)
+                else:
+                    # Sem servidor de salas: mesa local, anunciada apenas na rede local
+                    self.initialize_game(is_host=True, room_id=uuid.uuid4().hex[:8], name=room_name)
         
         elif action == "back":
             self.game_state = GameState.ROOM_LIST
     
+    def network_stats(self):
+        """
+        Estatísticas de rede da partida (caminhos até o outro jogador e até o servidor)
+        Retorna None com o HUD fechado, para não montar o dicionário a cada quadro.
+        """
+        if not self.renderer.show_network_hud:
+            return None
+        stats = self.tables.active.network.get_stats()
+        if self.room_client.connected:
+            stats['server'] = self.room_client.server_stats.snapshot()
+        return stats
+    
+    def load_strategy(self):
+        self.strategy = load_or_build(SHOE_DECKS, STRATEGY_OPPONENT_STAND)
+    
+    def strategy_hint(self, table):
+        """Dica para a mesa exibida: consulta direta à tabela, None com a dica fechada ou sem ação possível"""
+        if not self.renderer.show_hint or self.strategy is None or not table.engine.can_act():
+            return None
+        return self.strategy.hint(table.local_player)
+    
+    def update_lan_rooms(self):
+        """Consulta a rede local e atualiza a lista de salas quando o cache muda"""
+        self.lan_discovery.query()
+        tables = self.lan_discovery.get_tables()
+        if self.lan_discovery.version != self.lan_rooms_version:
+            self.lan_rooms_version = self.lan_discovery.version
+            self.room_menu.update_lan_rooms(tables)
+    
     def run(self):
         running = True
         while running:
@@ -276,6 +375,10 @@ class BlackjackGame:
                 if event.type == pygame.QUIT:
                     running = False
                 
+                # Troca entre as mesas abertas, em qualquer tela
+                if self.event_handler.handle_table_events(event):
+                    continue
+                
                 # Menu screen events
                 if self.game_state == GameState.MENU:
                     self.event_handler.handle_menu_events(event)
@@ -290,6 +393,12 @@ class BlackjackGame:
                     if action:
                         self.handle_room_list_action(action)
                 
+                # Leaderboard events
+                elif self.game_state == GameState.LEADERBOARD:
+                    action = self.room_menu.handle_leaderboard_event(event)
+                    if action:
+                        self.handle_leaderboard_action(action)
+                
                 # Create room events
                 elif self.game_state == GameState.CREATE_ROOM:
                     action = self.room_menu.handle_create_room_event(event)
@@ -312,6 +421,17 @@ class BlackjackGame:
                 elif self.game_state == GameState.GAME_OVER:
                     self.event_handler.handle_game_over_events(event)
             
+            # Os bots jogam antes do desenho, com o estado já atualizado
+            self.update_bots()
+            
+            # Fecha as mesas encerradas; a mesa ativa é a desenhada neste quadro
+            self.update_tables()
+            table = self.tables.active
+            
+            # Mesas da rede local aparecem junto com as do servidor
+            if self.game_state == GameState.ROOM_LIST:
+                self.update_lan_rooms()
+            
             # Verifica mudanças de estado para iniciar/parar música
             self.check_game_state_for_music()
             
@@ -327,26 +447,38 @@ class BlackjackGame:
                 self.room_menu.draw_room_list()
             elif self.game_state == GameState.CREATE_ROOM:
                 self.room_menu.draw_create_room()
+            elif self.game_state == GameState.LEADERBOARD:
+                self.room_menu.draw_leaderboard()
             elif self.game_state == GameState.JOIN_SCREEN:
                 self.menu.draw_join_screen()
             elif self.game_state == GameState.WAITING:
                 self.renderer.draw_waiting_screen(self.menu)
             elif self.game_state == GameState.PLAYING:
-                self.renderer.draw_game(self.local_player, self.remote_player)
+                self.renderer.draw_game(table.local_player, table.remote_player, self.network_stats(), self.strategy_hint(table), table.bank())
             elif self.game_state == GameState.GAME_OVER:
                 # Desenha o jogo primeiro (para mostrar as cartas)
-                self.renderer.draw_game(self.local_player, self.remote_player)
+                self.renderer.draw_game(table.local_player, table.remote_player, self.network_stats(), bank=table.bank())
                 # Depois desenha o painel de fim de jogo, passando se é host ou não
-                is_host = self.network.is_host if hasattr(self.network, 'is_host') else False
-                self.renderer.draw_game_over(self.determine_winner(), is_host)
+                self.renderer.draw_game_over(table.determine_winner(), table.is_host)
+            
+            # As outras mesas abertas aparecem como miniaturas
+            if self.viewing_table:
+                self.renderer.draw_table_thumbnails(self.tables, self.tables.active_id)
             
             pygame.display.flip()
             self.clock.tick(FPS)
         
         # Limpeza ao encerrar
         self.sound_manager.stop_music()
-        self.network.close_connection()
+        self.tables.close_all()
+        if self.hand_history:
+            self.hand_history.close()
+        if self.ledger:
+            self.ledger.close()
         self.room_client.disconnect()
+        self.lan_discovery.stop()
+        if self.embedded_server:
+            self.embedded_server.stop()
         pygame.quit()
         sys.exit()
     
@@ -0,0 +1,352 @@
+#!/usr/bin/env python3
+"""
+Histórico de mãos em log segmentado, com índice por jogador e por dia
+
+Cada mão terminada vira um evento (jogadores, cartas, ações, resultado e
+tempos) acrescentado ao segmento atual (NNNNNNNN.log, uma linha JSON por
+mão). Ao lado de cada segmento fica o índice (NNNNNNNN.idx) com o instante,
+a posição e o tamanho de cada mão e o resultado de cada jogador, que é
+carregado na abertura: as consultas ("últimas N mãos do jogador",
+"aproveitamento por dia") usam só o índice em memória e leem do log apenas
+as mãos pedidas.
+
+append() só enfileira: a escrita é feita em lotes por uma thread própria,
+então quem registra (a mesa no jogo, o relay no servidor de salas) nunca
+espera pelo disco. Com a fila cheia as mãos são descartadas e contadas.
+
+Uso: python hand_history.py --player NOME [--dir history] [--last 10] [--daily]
+"""
+import argparse
+import bisect
+import json
+import math
+import os
+import queue
+import threading
+import time
+from constants import HISTORY_DIR, HISTORY_SEGMENT_BYTES, HISTORY_QUEUE_SIZE
+
+WIN = 'win'
+LOSS = 'loss'
+PUSH = 'push'
+OUTCOMES = (WIN, LOSS, PUSH)
+
+def hand_day(timestamp):
+    return time.strftime('%Y-%m-%d', time.localtime(timestamp))
+
+def list_segments(directory):
+    """Números dos segmentos do diretório, em ordem"""
+    numbers = []
+    for name in os.listdir(directory):
+        stem, extension = os.path.splitext(name)
+        if extension == '.log' and stem.isdigit():
+            numbers.append(int(stem))
+    return sorted(numbers)
+
+def segment_path(directory, segment, extension='.log'):
+    return os.path.join(directory, f"{segment:08d}{extension}")
+
+def valid_timestamp(timestamp):
+    """Instante finito e dentro do que time.localtime aceita (hand_day não pode falhar)"""
+    if isinstance(timestamp, bool) or not isinstance(timestamp, (int, float)) or not math.isfinite(timestamp):
+        return False
+    try:
+        hand_day(timestamp)
+    except (OverflowError, OSError, ValueError):
+        return False
+    return True
+
+def validate_players(players):
+    """Lista de jogadores com nome e resultado, como no evento e no índice"""
+    if not isinstance(players, list) or not players:
+        return False
+    return all(
+        isinstance(player, dict) and isinstance(player.get('name'), str) and player.get('outcome') in OUTCOMES
+        for player in players
+    )
+
+def validate_hand(hand):
+    """Confere os campos que o índice usa; mãos vindas da rede podem ser qualquer coisa"""
+    return isinstance(hand, dict) and valid_timestamp(hand.get('t')) and validate_players(hand.get('players'))
+
+class HandHistory:
+    """
+    Log de mãos num diretório; o segmento atual troca ao passar de segment_bytes
+    O índice em memória guarda, por jogador, as mãos em ordem de tempo
+    (instante, segmento, posição, tamanho) e os totais de vitórias, derrotas
+    e empates por dia.
+    """
+    def __init__(self, directory=HISTORY_DIR, segment_bytes=HISTORY_SEGMENT_BYTES,
+                 queue_size=HISTORY_QUEUE_SIZE, batch_size=256):
+        self.directory = directory
+        self.segment_bytes = segment_bytes
+        self.batch_size = batch_size
+        self.lock = threading.Lock()
+        self.by_player = {}  # {nome: [(instante, segmento, posição, tamanho)]}
+        self.daily = {}  # {nome: {dia: [vitórias, derrotas, empates]}}
+        self.hands = 0
+        self.dropped = 0
+        
+        os.makedirs(directory, exist_ok=True)
+        segments = self.segments()
+        for segment in segments:
+            self.load_segment(segment)
+        self.segment = segments[-1] if segments else 0
+        self.open_segment()
+        
+        self.queue = queue.Queue(maxsize=queue_size)
+        self.writer_thread = threading.Thread(target=self.writer_loop)
+        self.writer_thread.daemon = True
+        self.writer_thread.start()
+    
+    def segments(self):
+        return list_segments(self.directory)
+    
+    def path(self, segment, extension):
+        return segment_path(self.directory, segment, extension)
+    
+    def open_segment(self):
+        self.data_file = open(self.path(self.segment, '.log'), 'ab')
+        self.index_file = open(self.path(self.segment, '.idx'), 'ab')
+        self.offset = self.data_file.tell()
+    
+    def rotate(self):
+        self.data_file.close()
+        self.index_file.close()
+        self.segment += 1
+        self.open_segment()
+    
+    def load_segment(self, segment):
+        """
+        Carrega o índice do segmento; mãos gravadas no log mas não no índice
+        (encerramento entre as duas escritas) são indexadas de novo a partir
+        do log. Os dois arquivos são cortados na primeira linha incompleta ou
+        corrompida, para a próxima abertura não encontrar o mesmo problema.
+        """
+        indexed_end = 0
+        index_end = 0
+        index_path = self.path(segment, '.idx')
+        if os.path.exists(index_path):
+            with open(index_path, 'rb') as file:
+                for line in file:
+                    try:
+                        if not line.endswith(b'\n'):
+                            raise ValueError("linha incompleta")
+                        timestamp, offset, length, players = json.loads(line)
+                        if not valid_timestamp(timestamp) or not isinstance(offset, int) or not isinstance(length, int):
+                            raise ValueError("entrada inválida")
+                        if not validate_players([{'name': name, 'outcome': outcome} for name, outcome in players]):
+                            raise ValueError("jogadores inválidos")
+                    except (ValueError, TypeError):
+                        break
+                    self.index_entry(timestamp, segment, offset, length, players)
+                    indexed_end = offset + length
+                    index_end += len(line)
+            if index_end < os.path.getsize(index_path):
+                with open(index_path, 'r+b') as file:
+                    file.truncate(index_end)
+        
+        data_path = self.path(segment, '.log')
+        with open(data_path, 'rb') as file:
+            file.seek(indexed_end)
+            tail = file.read()
+        
+        entries = []
+        offset = indexed_end
+        for line in tail.splitlines(keepends=True):
+            try:
+                if not line.endswith(b'\n'):
+                    raise ValueError("linha incompleta")
+                hand = json.loads(line)
+                if not validate_hand(hand):
+                    raise ValueError("mão inválida")
+                entries.append(self.entry_for(hand, offset, len(line)))
+            except ValueError:
+                break
+            offset += len(line)
+        if offset < indexed_end + len(tail):
+            with open(data_path, 'r+b') as file:
+                file.truncate(offset)
+        if not entries:
+            return
+        
+        with open(index_path, 'ab') as file:
+            file.write(b''.join(self.encode_entry(entry) for entry in entries))
+        for timestamp, offset, length, players in entries:
+            self.index_entry(timestamp, segment, offset, length, players)
+    
+    def entry_for(self, hand, offset, length):
+        players = [[player['name'], player['outcome']] for player in hand['players']]
+        return (hand['t'], offset, length, players)
+    
+    def encode_entry(self, entry):
+        return (json.dumps(entry, separators=(',', ':')) + '\n').encode('utf-8')
+    
+    def index_entry(self, timestamp, segment, offset, length, players):
+        location = (timestamp, segment, offset, length)
+        day = hand_day(timestamp)
+        for name, outcome in players:
+            hands = self.by_player.setdefault(name, [])
+            if hands and hands[-1][0] > timestamp:
+                bisect.insort(hands, location)
+            else:
+                hands.append(location)
+            totals = self.daily.setdefault(name, {}).setdefault(day, [0, 0, 0])
+            totals[OUTCOMES.index(outcome)] += 1
+        self.hands += 1
+    
+    def append(self, hand):
+        """Enfileira a mão para gravação; retorna False se ela for inválida ou a fila estiver cheia"""
+        if not validate_hand(hand):
+            return False
+        try:
+            self.queue.put_nowait(hand)
+        except queue.Full:
+            self.dropped += 1
+            return False
+        return True
+    
+    def writer_loop(self):
+        while True:
+            hand = self.queue.get()
+            batch = [hand]
+            while hand is not None and len(batch) < self.batch_size:
+                try:
+                    hand = self.queue.get_nowait()
+                except queue.Empty:
+                    break
+                batch.append(hand)
+            
+            hands = [hand for hand in batch if hand is not None]
+            try:
+                if hands:
+                    self.write_batch(hands)
+            except Exception as e:
+                # A thread não pode morrer: sem ela o histórico para e flush() nunca volta
+                print(f"Erro ao gravar o histórico de mãos: {e}")
+            finally:
+                for _ in batch:
+                    self.queue.task_done()
+            if batch[-1] is None:
+                return
+    
+    def write_batch(self, hands):
+        """Uma escrita no log e uma no índice para o lote inteiro"""
+        lines = []
+        entries = []
+        offset = self.offset
+        for hand in hands:
+            # Uma mão inválida é descartada sozinha, sem levar o lote junto
+            try:
+                if not validate_hand(hand):
+                    raise ValueError("mão inválida")
+                line = (json.dumps(hand, separators=(',', ':')) + '\n').encode('utf-8')
+            except (TypeError, ValueError):
+                self.dropped += 1
+                continue
+            lines.append(line)
+            entries.append(self.entry_for(hand, offset, len(line)))
+            offset += len(line)
+        if not lines:
+            return
+        
+        self.data_file.write(b''.join(lines))
+        self.data_file.flush()
+        self.index_file.write(b''.join(self.encode_entry(entry) for entry in entries))
+        self.index_file.flush()
+        
+        with self.lock:
+            for timestamp, entry_offset, length, players in entries:
+                self.index_entry(timestamp, self.segment, entry_offset, length, players)
+        self.offset = offset
+        if self.offset >= self.segment_bytes:
+            self.rotate()
+    
+    def flush(self):
+        """Espera a gravação de tudo o que já foi enfileirado"""
+        self.queue.join()
+    
+    def close(self):
+        self.queue.put(None)
+        self.writer_thread.join()
+        self.data_file.close()
+        self.index_file.close()
+    
+    def read_hands(self, locations):
+        """Lê as mãos do log, abrindo cada segmento uma vez"""
+        hands = []
+        files = {}
+        try:
+            for _, segment, offset, length in locations:
+                file = files.get(segment)
+                if file is None:
+                    file = files[segment] = open(self.path(segment, '.log'), 'rb')
+                file.seek(offset)
+                hands.append(json.loads(file.read(length)))
+        finally:
+            for file in files.values():
+                file.close()
+        return hands
+    
+    def last_hands(self, player, limit=10, before=None):
+        """Últimas limit mãos do jogador (mais recentes primeiro), opcionalmente antes do instante before"""
+        with self.lock:
+            locations = self.by_player.get(player, [])
+            end = len(locations) if before is None else bisect.bisect_left(locations, (before,))
+            selected = locations[max(0, end - limit):end]
+        return self.read_hands(reversed(selected))
+    
+    def hands_between(self, player, start, end):
+        """Mãos do jogador com instante em [start, end)"""
+        with self.lock:
+            locations = self.by_player.get(player, [])
+            selected = locations[bisect.bisect_left(locations, (start,)):bisect.bisect_left(locations, (end,))]
+        return self.read_hands(selected)
+    
+    def daily_stats(self, player):
+        """[(dia, mãos, vitórias, derrotas, empates, aproveitamento)] em ordem de dia"""
+        with self.lock:
+            days = sorted((day, list(totals)) for day, totals in self.daily.get(player, {}).items())
+        stats = []
+        for day, (wins, losses, pushes) in days:
+            hands = wins + losses + pushes
+            stats.append((day, hands, wins, losses, pushes, wins / hands))
+        return stats
+    
+    def totals(self, player):
+        """(mãos, vitórias, derrotas, empates) do jogador em todo o histórico"""
+        wins = losses = pushes = 0
+        with self.lock:
+            for day_wins, day_losses, day_pushes in self.daily.get(player, {}).values():
+                wins += day_wins
+                losses += day_losses
+                pushes += day_pushes
+        return (wins + losses + pushes, wins, losses, pushes)
+    
+    def players(self):
+        with self.lock:
+            return list(self.by_player)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--dir', default=HISTORY_DIR)
+    parser.add_argument('--player')
+    parser.add_argument('--last', type=int, default=10)
+    parser.add_argument('--daily', action='store_true', help="aproveitamento por dia")
+    args = parser.parse_args()
+    
+    history = HandHistory(args.dir)
+    if not args.player:
+        print(f"{history.hands} mãos; jogadores: {', '.join(sorted(history.players())) or '-'}")
+    elif args.daily:
+        for day, hands, wins, losses, pushes, rate in history.daily_stats(args.player):
+            print(f"{day}  {hands:>5} mãos  {wins:>4} V {losses:>4} D {pushes:>4} E  {rate:.1%}")
+    else:
+        for hand in history.last_hands(args.player, args.last):
+            when = time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(hand['t']))
+            players = "  x  ".join(f"{player['name']} {player.get('score', '?')} ({player['outcome']})" for player in hand['players'])
+            print(f"{when}  {players}")
+    history.close()
+
+if __name__ == "__main__":
+    main()
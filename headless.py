@@ -0,0 +1,213 @@
+"""
+Partidas sem interface entre dois bots, no mesmo processo
+
+Cada lado é uma table.Table de verdade com o seu NetworkManager: as
+mensagens passam pelo mesmo caminho do jogo (numeração do outbox,
+enquadramento JSON, troca de semente, intenções do lockstep, game_state e
+restart_game), mas a "conexão" é uma fila em memória esvaziada pela
+própria partida, sem sockets nem threads. Serve para o torneio, para testes
+de regressão e para medir o fluxo de mensagens.
+"""
+import random
+import time
+from collections import deque
+from functools import partial
+from constants import GameState, SHOE_DECKS, SHOE_PENETRATION
+from card import Shoe
+from engine import LOCAL_WINS, REMOTE_WINS, PUSH
+from network import NetworkManager
+from table import Table, TableManager
+
+# Resultado da mesa do cliente equivalente a cada resultado do host
+MIRRORED = {LOCAL_WINS: REMOTE_WINS, REMOTE_WINS: LOCAL_WINS, PUSH: PUSH}
+
+class ThresholdPolicy:
+    """Bot que pede carta abaixo de stand_on, como a banca do blackjack tradicional"""
+    def __init__(self, stand_on=17):
+        self.stand_on = stand_on
+    
+    def wants_hit(self, engine):
+        return engine.local_player.score < self.stand_on
+    
+    def __repr__(self):
+        return f"ThresholdPolicy({self.stand_on})"
+
+class SilentSoundManager:
+    """Som das mesas sem interface"""
+    def play_card_sound(self):
+        pass
+
+class HeadlessApp:
+    """O que as mesas usam do BlackjackGame, sem pygame, servidor de salas ou renderer"""
+    def __init__(self):
+        self.game_transport = None
+        self.player_name = "bot"
+        self.room_client = None
+        self.hand_history = None
+        self.ledger = None
+        self.shoe_factory = partial(Shoe, SHOE_DECKS, SHOE_PENETRATION)
+        self.sound_manager = SilentSoundManager()
+        self.tables = TableManager(self)
+
+class MatchLink:
+    """
+    Conexão em memória entre dois NetworkManager
+    Os bytes enviados por um lado entram numa fila única; pump() os entrega
+    ao outro lado na ordem de envio, pelo mesmo buffer e processamento do
+    receive_messages.
+    """
+    def __init__(self):
+        self.queue = deque()
+        self.messages = 0
+    
+    def endpoint(self, receiver):
+        return LinkEndpoint(self, receiver)
+    
+    def pump(self):
+        """Entrega tudo o que estiver na fila (inclusive as respostas geradas no caminho)"""
+        delivered = 0
+        while self.queue:
+            receiver, data = self.queue.popleft()
+            for message in receiver.recv_buffer.feed(data):
+                receiver.process_incoming(message)
+                delivered += 1
+        self.messages += delivered
+        return delivered
+
+class LinkEndpoint:
+    """Ponta da MatchLink usada como peer_socket; sendall entrega ao outro lado"""
+    def __init__(self, link, receiver):
+        self.link = link
+        self.receiver = receiver
+    
+    def sendall(self, data):
+        self.link.queue.append((self.receiver, data))
+    
+    def shutdown(self, how=None):
+        pass
+    
+    def close(self):
+        pass
+
+class LinkedNetwork(NetworkManager):
+    """
+    NetworkManager de uma mesa sem interface, ligado ao outro lado pela MatchLink
+    Só existe um caminho (a fila em memória), então não há monitor de
+    caminhos nem threads para encerrar.
+    """
+    def connect(self, is_host, endpoint, nonce_rng):
+        self.is_host = is_host
+        self.running = True
+        self.is_connected = True
+        self.peer_socket = endpoint
+        self.nonce_rng = nonce_rng
+    
+    def start_path_monitor(self):
+        pass
+    
+    def close_connection(self):
+        self.running = False
+        self.is_connected = False
+        self.peer_socket = None
+
+class MatchResult:
+    """Contagem das rodadas de uma ou mais partidas, do ponto de vista do host"""
+    def __init__(self):
+        self.matches = 0
+        self.rounds = 0
+        self.outcomes = {LOCAL_WINS: 0, REMOTE_WINS: 0, PUSH: 0}
+        self.disagreements = 0  # Rodadas em que as duas mesas chegaram a resultados diferentes
+        self.stalled = 0  # Rodadas que pararam sem terminar
+        self.messages = 0
+        self.elapsed = 0.0
+    
+    def add(self, other):
+        self.matches += other.matches
+        self.rounds += other.rounds
+        for outcome in self.outcomes:
+            self.outcomes[outcome] += other.outcomes[outcome]
+        self.disagreements += other.disagreements
+        self.stalled += other.stalled
+        self.messages += other.messages
+        self.elapsed += other.elapsed
+    
+    def rate(self, outcome):
+        return self.outcomes[outcome] / self.rounds if self.rounds else 0.0
+
+class HeadlessMatch:
+    """
+    Partida entre dois bots: o host abre a mesa, o cliente entra com o
+    handshake e as rodadas seguem até rounds, reiniciadas pelo host
+    seed define os nonces dos dois lados, então a mesma semente repete as
+    mesmas cartas e as mesmas decisões.
+    """
+    def __init__(self, seed, host_policy, client_policy, app=None):
+        self.app = app or HeadlessApp()
+        self.link = MatchLink()
+        rng = random.Random(seed)
+        self.host = self.open_table(f"match-{seed}", True, random.Random(rng.getrandbits(64)))
+        self.client = self.open_table(f"match-{seed}", False, random.Random(rng.getrandbits(64)))
+        self.host.network.peer_socket = self.link.endpoint(self.client.network)
+        self.client.network.peer_socket = self.link.endpoint(self.host.network)
+        self.policies = {self.host: host_policy, self.client: client_policy}
+    
+    def open_table(self, room_id, is_host, nonce_rng):
+        table = Table(self.app, room_id, seed=nonce_rng.getrandbits(64))
+        table.network = LinkedNetwork(table)
+        table.network.connect(is_host, None, nonce_rng)
+        table.game_state = GameState.WAITING
+        return table
+    
+    def start(self):
+        """Handshake do cliente; a primeira rodada começa quando a semente é revelada"""
+        self.client.network.send_message(self.client.network.build_handshake())
+        self.link.pump()
+    
+    def play_round(self):
+        """
+        Joga a rodada atual até o fim, com os bots agindo enquanto puderem
+        Retorna o resultado do host, ou None se a rodada travou
+        """
+        while True:
+            acted = False
+            for table, policy in self.policies.items():
+                if table.engine.can_act():
+                    if policy.wants_hit(table.engine):
+                        table.hit()
+                    else:
+                        table.stand()
+                    acted = True
+            delivered = self.link.pump()
+            if self.host.game_state == GameState.GAME_OVER and self.client.game_state == GameState.GAME_OVER:
+                return self.host.result()
+            if not acted and not delivered:
+                return None
+    
+    def play(self, rounds):
+        """Joga rounds rodadas e retorna a MatchResult"""
+        start = time.perf_counter()
+        result = MatchResult()
+        result.matches = 1
+        self.start()
+        for number in range(rounds):
+            if number:
+                self.host.restart_game()
+                self.link.pump()
+            outcome = self.play_round()
+            if outcome is None:
+                result.stalled += 1
+                break
+            result.rounds += 1
+            result.outcomes[outcome] += 1
+            if self.client.result() != MIRRORED[outcome]:
+                result.disagreements += 1
+        self.host.network.close_connection()
+        self.client.network.close_connection()
+        result.messages = self.link.messages
+        result.elapsed = time.perf_counter() - start
+        return result
+
+def play_match(seed, rounds=5, host_policy=None, client_policy=None):
+    """Atalho para uma partida completa com os bots informados (limite 17 por padrão)"""
+    match = HeadlessMatch(seed, host_policy or ThresholdPolicy(), client_policy or ThresholdPolicy())
+    return match.play(rounds)
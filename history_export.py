@@ -0,0 +1,241 @@
+#!/usr/bin/env python3
+"""
+Exportação do histórico de mãos para colunas NumPy (.npy mapeáveis em memória)
+
+O log do hand_history.py é bom para acrescentar e consultar poucas mãos;
+para análises sobre milhões de mãos ele vira um diretório de colunas, uma
+por arquivo .npy, que analytics.py abre com mmap_mode='r' e percorre em
+blocos sem carregar tudo na memória. As colunas por jogador têm o assento
+na primeira dimensão (0 = quem gravou a mão, 1 = o oponente) e as cartas
+têm a posição na mão na segunda, então cada coluna usada por um relatório
+(ex.: primeira carta do assento 0) é contígua no arquivo.
+
+Cartas são uint8 (índice 0-51, NO_CARD nas posições vazias) e resultados
+int8 (+1 vitória, -1 derrota, 0 empate). Jogadores, mesas e regras viram
+inteiros; os nomes ficam em columns.json. Usamos .npy em vez de .npz porque
+os membros de um .npz não podem ser mapeados em memória.
+
+O NumPy é opcional para o resto do jogo: só a exportação e as análises precisam dele.
+
+Uso: python history_export.py [--dir history] [--out history_columns]
+"""
+import argparse
+import json
+import math
+import os
+import time
+from constants import HISTORY_DIR, HISTORY_COLUMNS_DIR
+from hand_history import OUTCOMES, list_segments, segment_path, validate_hand
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+EXPORT_VERSION = 1
+SEATS = 2
+MAX_HAND_CARDS = 11  # Mais cartas que isso passam de 21
+NO_CARD = 255
+CHUNK_ROWS = 65536
+
+RESULT_CODES = {'win': 1, 'loss': -1, 'push': 0}
+
+# Colunas: (tipo, forma antes da dimensão das mãos)
+COLUMNS = {
+    'time': ('f8', ()),  # Início da mão, segundos desde a época
+    'duration': ('f4', ()),
+    'rules': ('u1', ()),  # Índice em metadata['rules']
+    'room': ('i4', ()),  # Índice em metadata['rooms'] (sessão de uma mesa)
+    'player': ('i4', (SEATS,)),  # Índice em metadata['players']
+    'result': ('i1', (SEATS,)),
+    'score': ('u1', (SEATS,)),
+    'busted': ('u1', (SEATS,)),
+    'hits': ('u1', (SEATS,)),
+    'card_count': ('u1', (SEATS,)),
+    'cards': ('u1', (SEATS, MAX_HAND_CARDS))
+}
+
+def require_numpy():
+    if np is None:
+        raise RuntimeError("A exportação precisa do NumPy: pip install numpy")
+
+def rules_name(hand):
+    decks = hand.get('decks')
+    mode = "lockstep" if hand.get('lockstep') else "host distribui"
+    return f"{decks} baralhos, {mode}" if decks else mode
+
+def count_hands(directory):
+    """Limite superior de mãos do histórico: linhas completas dos logs"""
+    total = 0
+    for segment in list_segments(directory):
+        with open(segment_path(directory, segment), 'rb') as file:
+            while True:
+                block = file.read(1 << 20)
+                if not block:
+                    break
+                total += block.count(b'\n')
+    return total
+
+def iterate_hands(directory):
+    """Mãos do histórico na ordem de gravação; linhas inválidas são puladas"""
+    for segment in list_segments(directory):
+        with open(segment_path(directory, segment), 'rb') as file:
+            for line in file:
+                try:
+                    hand = json.loads(line)
+                except ValueError:
+                    continue
+                if validate_hand(hand) and len(hand['players']) == SEATS:
+                    yield hand
+
+def create_columns(out_dir, rows):
+    """Arquivos .npy das colunas, já com o tamanho final, abertos para escrita"""
+    os.makedirs(out_dir, exist_ok=True)
+    columns = {}
+    for name, (dtype, shape) in COLUMNS.items():
+        columns[name] = np.lib.format.open_memmap(
+            os.path.join(out_dir, f"{name}.npy"), mode='w+', dtype=np.dtype(dtype), shape=shape + (rows,)
+        )
+    return columns
+
+def write_metadata(out_dir, metadata):
+    with open(os.path.join(out_dir, 'columns.json'), 'w') as file:
+        json.dump(metadata, file)
+
+class ChunkBuilder:
+    """Acumula um bloco de mãos em listas e grava cada coluna de uma vez"""
+    def __init__(self, ids):
+        self.ids = ids  # {'players': {nome: id}, 'rooms': {...}, 'rules': {...}}
+        self.clear()
+    
+    def clear(self):
+        self.time = []
+        self.duration = []
+        self.rules = []
+        self.room = []
+        self.player = []
+        self.result = []
+        self.score = []
+        self.busted = []
+        self.hits = []
+        self.card_count = []
+        self.cards = bytearray()
+    
+    def __len__(self):
+        return len(self.time)
+    
+    def identify(self, kind, name):
+        ids = self.ids[kind]
+        if name not in ids:
+            ids[name] = len(ids)
+        return ids[name]
+    
+    def add(self, hand):
+        """
+        Acrescenta a mão ao bloco; retorna False, sem acrescentar nada, se
+        algum campo não puder ser convertido (validate_hand só confere os
+        campos do índice, e as mãos do servidor vêm da rede)
+        """
+        try:
+            duration = float(hand.get('duration') or 0.0)
+            if not math.isfinite(duration):
+                raise ValueError("duração não finita")
+            hits = [0] * SEATS
+            for action in hand.get('actions') or ():
+                if len(action) >= 2 and action[1] == 'hit' and action[0] in (0, 1):
+                    hits[action[0]] += 1
+            seats = []
+            for seat, player in enumerate(hand['players']):
+                cards = [card for card in player.get('cards') or () if isinstance(card, int) and 0 <= card < 52][:MAX_HAND_CARDS]
+                score = min(max(int(player.get('score') or 0), 0), 255)
+                seats.append((player['name'], RESULT_CODES[player['outcome']], score, player.get('status') == 'busted', min(hits[seat], 255), cards))
+        except (KeyError, TypeError, ValueError, OverflowError):
+            return False
+        
+        self.time.append(hand['t'])
+        self.duration.append(min(max(duration, 0.0), 1e9))
+        self.rules.append(self.identify('rules', rules_name(hand)))
+        self.room.append(self.identify('rooms', str(hand.get('room'))))
+        for name, result, score, busted, seat_hits, cards in seats:
+            self.player.append(self.identify('players', name))
+            self.result.append(result)
+            self.score.append(score)
+            self.busted.append(busted)
+            self.hits.append(seat_hits)
+            self.card_count.append(len(cards))
+            self.cards += bytes(cards) + bytes((NO_CARD,)) * (MAX_HAND_CARDS - len(cards))
+        return True
+    
+    def flush(self, columns, start):
+        """Grava o bloco nas linhas start.. das colunas e retorna o número de linhas gravadas"""
+        count = len(self)
+        end = start + count
+        columns['time'][start:end] = self.time
+        columns['duration'][start:end] = self.duration
+        columns['rules'][start:end] = self.rules
+        columns['room'][start:end] = self.room
+        for name in ('player', 'result', 'score', 'busted', 'hits', 'card_count'):
+            # As listas por jogador estão em ordem (mão, assento)
+            values = np.array(getattr(self, name), dtype=columns[name].dtype).reshape(count, SEATS)
+            columns[name][:, start:end] = values.T
+        cards = np.frombuffer(bytes(self.cards), dtype=np.uint8).reshape(count, SEATS, MAX_HAND_CARDS)
+        columns['cards'][:, :, start:end] = cards.transpose(1, 2, 0)
+        self.clear()
+        return count
+
+def export_history(history_dir, out_dir, progress=None):
+    """
+    Exporta o histórico para colunas em out_dir e retorna o número de mãos
+    Os arquivos são criados com o número de linhas dos logs e preenchidos em
+    blocos de CHUNK_ROWS; as linhas válidas ficam em metadata['rows'] e as
+    mãos com campos que não puderam ser convertidos são puladas.
+    """
+    require_numpy()
+    capacity = count_hands(history_dir)
+    columns = create_columns(out_dir, capacity)
+    ids = {'players': {}, 'rooms': {}, 'rules': {}}
+    builder = ChunkBuilder(ids)
+    rows = 0
+    for hand in iterate_hands(history_dir):
+        if not builder.add(hand):
+            continue
+        if len(builder) >= CHUNK_ROWS:
+            rows += builder.flush(columns, rows)
+            if progress:
+                progress(rows, capacity)
+    if len(builder):
+        rows += builder.flush(columns, rows)
+    for column in columns.values():
+        column.flush()
+    
+    write_metadata(out_dir, {
+        'version': EXPORT_VERSION,
+        'rows': rows,
+        'exported': time.time(),
+        'players': list(ids['players']),
+        'rooms': list(ids['rooms']),
+        'rules': list(ids['rules']),
+        'outcomes': list(OUTCOMES)
+    })
+    return rows
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--dir', default=HISTORY_DIR)
+    parser.add_argument('--out', default=HISTORY_COLUMNS_DIR)
+    args = parser.parse_args()
+    
+    def progress(rows, capacity):
+        print(f"\r{rows:,}/{capacity:,} mãos", end='', flush=True)
+    
+    start = time.perf_counter()
+    try:
+        rows = export_history(args.dir, args.out, progress)
+    except (RuntimeError, OSError) as e:
+        print(f"Erro: {e}")
+        return
+    elapsed = time.perf_counter() - start
+    print(f"\r{rows:,} mãos exportadas para {args.out} em {elapsed:.2f} s ({rows / elapsed if elapsed else 0:,.0f} mãos/s)")
+
+if __name__ == "__main__":
+    main()
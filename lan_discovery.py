@@ -0,0 +1,181 @@
+import socket
+import threading
+import json
+import time
+import uuid
+from constants import LAN_DISCOVERY_PORT, LAN_ANNOUNCE_INTERVAL, LAN_RESPONSE_MIN_INTERVAL, LAN_TABLE_TTL
+
+class LanDiscovery:
+    """
+    Descoberta de mesas na rede local via broadcast UDP
+    Quem hospeda anuncia a mesa periodicamente e responde às consultas de
+    quem está na lista de salas; as mesas descobertas ficam em cache e são
+    descartadas quando param de ser anunciadas (TTL).
+    """
+    def __init__(self, table_provider=None, port=LAN_DISCOVERY_PORT):
+        self.port = port
+        self.socket = None
+        self.running = False
+        self.instance_id = uuid.uuid4().hex[:8]
+        
+        # Função que retorna a mesa hospedada localmente ({'id', 'name', 'port'}) ou None
+        self.table_provider = table_provider
+        
+        # Cache das mesas descobertas: {id: {'room': dict, 'expires': timestamp}}
+        self.tables = {}
+        self.lock = threading.Lock()
+        self.version = 0  # Incrementa sempre que o cache muda
+        
+        # Controle de frequência das respostas e consultas
+        self.last_response = {}  # {endereço: timestamp}
+        self.last_query = 0
+    
+    def start(self):
+        """Abre o socket UDP e inicia as threads de anúncio e recebimento"""
+        try:
+            self.socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+            self.socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+            if hasattr(socket, 'SO_REUSEPORT'):
+                # Permite mais de um cliente escutando na mesma máquina
+                self.socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEPORT, 1)
+            self.socket.setsockopt(socket.SOL_SOCKET, socket.SO_BROADCAST, 1)
+            self.socket.bind(('', self.port))
+            self.socket.settimeout(1.0)
+        except OSError as e:
+            print(f"Descoberta na rede local indisponível: {e}")
+            self.socket = None
+            return False
+        
+        self.running = True
+        
+        receive_thread = threading.Thread(target=self.receive_loop)
+        receive_thread.daemon = True
+        receive_thread.start()
+        
+        announce_thread = threading.Thread(target=self.announce_loop)
+        announce_thread.daemon = True
+        announce_thread.start()
+        return True
+    
+    def stop(self):
+        self.running = False
+        if self.socket:
+            try:
+                self.socket.close()
+            except:
+                pass
+            self.socket = None
+    
+    def query(self):
+        """Pergunta às mesas da rede local quem está hospedando (no máximo 1x por segundo)"""
+        now = time.time()
+        if now - self.last_query < 1.0:
+            return
+        self.last_query = now
+        self.send({'type': 'lan_query', 'from': self.instance_id, 't0': now}, ('<broadcast>', self.port))
+    
+    def get_tables(self):
+        """Retorna as mesas descobertas ainda válidas, descartando as expiradas"""
+        now = time.time()
+        with self.lock:
+            expired = [table_id for table_id, entry in self.tables.items() if entry['expires'] < now]
+            for table_id in expired:
+                del self.tables[table_id]
+            if expired:
+                self.version += 1
+            return [dict(entry['room']) for entry in self.tables.values()]
+    
+    def send(self, message, address):
+        if not self.socket:
+            return
+        try:
+            self.socket.sendto(json.dumps(message).encode('utf-8'), address)
+        except OSError as e:
+            print(f"Erro ao enviar anúncio na rede local: {e}")
+    
+    def local_table(self):
+        return self.table_provider() if self.table_provider else None
+    
+    def announce_loop(self):
+        """Anuncia a mesa hospedada em intervalos fixos enquanto ela existir"""
+        while self.running:
+            table = self.local_table()
+            if table:
+                self.send(self.build_announcement(table), ('<broadcast>', self.port))
+            time.sleep(LAN_ANNOUNCE_INTERVAL)
+    
+    def build_announcement(self, table, query=None):
+        announcement = {'type': 'lan_table', 'from': self.instance_id, 'table': table}
+        if query is not None:
+            # Resposta a uma consulta: ecoa o timestamp para quem perguntou
+            announcement['to'] = query.get('from')
+            announcement['t0'] = query.get('t0')
+        return announcement
+    
+    def receive_loop(self):
+        while self.running and self.socket:
+            try:
+                data, addr = self.socket.recvfrom(2048)
+            except socket.timeout:
+                continue
+            except OSError:
+                break
+            
+            try:
+                message = json.loads(data.decode('utf-8'))
+            except (UnicodeDecodeError, json.JSONDecodeError):
+                continue
+            
+            # Ignora os próprios anúncios recebidos pelo broadcast
+            if message.get('from') == self.instance_id:
+                continue
+            
+            if message.get('type') == 'lan_query':
+                self.answer_query(message, addr)
+            elif message.get('type') == 'lan_table':
+                self.register_table(message, addr)
+    
+    def answer_query(self, message, addr):
+        """
+        Responde a uma consulta, ecoando o timestamp para medir a latência
+        A resposta também vai por broadcast: vários clientes na mesma máquina
+        compartilham a porta e só um deles receberia uma resposta unicast.
+        """
+        table = self.local_table()
+        if not table:
+            return
+        
+        now = time.time()
+        if now - self.last_response.get(addr, 0) < LAN_RESPONSE_MIN_INTERVAL:
+            return
+        if len(self.last_response) > 256:
+            self.last_response.clear()
+        self.last_response[addr] = now
+        
+        self.send(self.build_announcement(table, message), ('<broadcast>', self.port))
+    
+    def register_table(self, message, addr):
+        table = message.get('table') or {}
+        table_id = table.get('id')
+        if not table_id:
+            return
+        
+        with self.lock:
+            entry = self.tables.get(table_id)
+            room = entry['room'] if entry else {}
+            room.update({
+                'id': table_id,
+                'name': table.get('name', 'Mesa na rede local'),
+                'host': addr[0],
+                'port': table.get('port'),
+                'lan': True
+            })
+            
+            # Respostas às nossas consultas trazem o timestamp de envio: RTT medido
+            answered = message.get('to') == self.instance_id and message.get('t0')
+            if answered:
+                room['latency_ms'] = round((time.time() - message['t0']) * 1000, 1)
+            
+            self.tables[table_id] = {'room': room, 'expires': time.time() + LAN_TABLE_TTL}
+            if not entry or answered:
+                self.version += 1
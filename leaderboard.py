@@ -0,0 +1,225 @@
+"""
+Classificações dos jogadores mantidas incrementalmente
+
+Cada classificação é uma skip list indexável: além dos ponteiros, cada nó
+guarda quantas posições cada salto pula, então inserir, remover, achar a
+posição de um jogador e ir direto para a posição k custam O(log n), sem
+reordenar nem percorrer os resultados. Uma página do ranking é a posição
+inicial mais uma caminhada pelo nível de baixo.
+
+O servidor de salas só enfileira as atualizações (saldo novo, mais uma
+vitória); uma thread própria as aplica, para que a liquidação das mãos não
+dispute o lock das classificações com quem consulta.
+"""
+import queue
+import random
+import threading
+
+CHIPS = 'chips'
+WINS = 'wins'
+BOARDS = (CHIPS, WINS)
+
+MAX_LEVEL = 32
+
+class SkipNode:
+    __slots__ = ('key', 'next', 'width')
+    
+    def __init__(self, key, level):
+        self.key = key
+        self.next = [None] * level
+        self.width = [1] * level  # Posições puladas por next[i] (até o fim da lista se next[i] for None)
+
+class RankedSkipList:
+    """Chaves ordenadas com posição (rank) e acesso por posição em O(log n)"""
+    def __init__(self, rng=None):
+        self.rng = rng or random.Random()
+        self.head = SkipNode(None, MAX_LEVEL)
+        self.level = 1
+        self.size = 0
+    
+    def __len__(self):
+        return self.size
+    
+    def random_level(self):
+        """Nível do nó novo: cada nível a mais com probabilidade 1/2"""
+        bits = self.rng.getrandbits(MAX_LEVEL - 1)
+        level = 1
+        while bits & 1:
+            level += 1
+            bits >>= 1
+        return level
+    
+    def predecessors(self, key):
+        """Último nó antes de key em cada nível e a sua posição (a cabeça está na posição 0)"""
+        chain = [self.head] * self.level
+        positions = [0] * self.level
+        node = self.head
+        position = 0
+        for i in reversed(range(self.level)):
+            while node.next[i] is not None and node.next[i].key < key:
+                position += node.width[i]
+                node = node.next[i]
+            chain[i] = node
+            positions[i] = position
+        return chain, positions
+    
+    def insert(self, key):
+        chain, positions = self.predecessors(key)
+        level = self.random_level()
+        if level > self.level:
+            # Nos níveis novos a cabeça pula direto para o fim da lista
+            for i in range(self.level, level):
+                self.head.width[i] = self.size + 1
+                chain.append(self.head)
+                positions.append(0)
+            self.level = level
+        
+        node = SkipNode(key, level)
+        position = positions[0]
+        for i in range(level):
+            previous = chain[i]
+            node.next[i] = previous.next[i]
+            previous.next[i] = node
+            node.width[i] = previous.width[i] - (position - positions[i])
+            previous.width[i] = position - positions[i] + 1
+        for i in range(level, self.level):
+            chain[i].width[i] += 1
+        self.size += 1
+    
+    def remove(self, key):
+        chain, _ = self.predecessors(key)
+        node = chain[0].next[0]
+        if node is None or node.key != key:
+            raise KeyError(key)
+        for i in range(len(node.next)):
+            previous = chain[i]
+            previous.width[i] += node.width[i] - 1
+            previous.next[i] = node.next[i]
+        for i in range(len(node.next), self.level):
+            chain[i].width[i] -= 1
+        self.size -= 1
+    
+    def rank(self, key):
+        """Posição de key a partir de 0 (KeyError se não estiver na lista)"""
+        chain, positions = self.predecessors(key)
+        node = chain[0].next[0]
+        if node is None or node.key != key:
+            raise KeyError(key)
+        return positions[0]
+    
+    def node_at(self, index):
+        target = index + 1
+        node = self.head
+        position = 0
+        for i in reversed(range(self.level)):
+            while node.next[i] is not None and position + node.width[i] <= target:
+                position += node.width[i]
+                node = node.next[i]
+        return node
+    
+    def slice(self, start, count):
+        """Até count chaves a partir da posição start"""
+        if start < 0 or start >= self.size or count <= 0:
+            return []
+        node = self.node_at(start)
+        keys = []
+        while node is not None and len(keys) < count:
+            keys.append(node.key)
+            node = node.next[0]
+        return keys
+
+class Leaderboard:
+    """Jogadores por pontuação, maior primeiro; o empate é desfeito pelo nome"""
+    def __init__(self):
+        self.entries = RankedSkipList()
+        self.scores = {}  # {nome: pontuação}
+    
+    def __len__(self):
+        return len(self.entries)
+    
+    def update(self, player, score):
+        old = self.scores.get(player)
+        if old == score:
+            return
+        if old is not None:
+            self.entries.remove((-old, player))
+        self.entries.insert((-score, player))
+        self.scores[player] = score
+    
+    def add(self, player, delta):
+        self.update(player, self.scores.get(player, 0) + delta)
+    
+    def rank(self, player):
+        """(posição a partir de 1, pontuação), ou None para quem não está no ranking"""
+        score = self.scores.get(player)
+        if score is None:
+            return None
+        return (self.entries.rank((-score, player)) + 1, score)
+    
+    def page(self, offset, limit):
+        """[(posição, nome, pontuação)] a partir da posição offset + 1"""
+        return [(offset + index + 1, player, -score) for index, (score, player) in enumerate(self.entries.slice(offset, limit))]
+
+class LeaderboardService:
+    """
+    Classificações do servidor de salas (BOARDS), atualizadas por uma thread
+    submit()/add() só enfileiram; page() e rank() leem sob o lock, em O(log n).
+    """
+    def __init__(self):
+        self.boards = {board: Leaderboard() for board in BOARDS}
+        self.lock = threading.Lock()
+        self.queue = queue.Queue()
+        self.updater_thread = threading.Thread(target=self.update_loop)
+        self.updater_thread.daemon = True
+        self.updater_thread.start()
+    
+    def submit(self, board, player, score):
+        """Nova pontuação do jogador"""
+        self.queue.put((board, player, score, False))
+    
+    def add(self, board, player, delta):
+        """Soma delta à pontuação do jogador"""
+        self.queue.put((board, player, delta, True))
+    
+    def update_loop(self):
+        while True:
+            update = self.queue.get()
+            updates = [update]
+            while update is not None:
+                try:
+                    update = self.queue.get_nowait()
+                except queue.Empty:
+                    break
+                updates.append(update)
+            
+            with self.lock:
+                for update in updates:
+                    if update is None:
+                        continue
+                    board, player, value, relative = update
+                    if relative:
+                        self.boards[board].add(player, value)
+                    else:
+                        self.boards[board].update(player, value)
+            for _ in updates:
+                self.queue.task_done()
+            if updates[-1] is None:
+                return
+    
+    def flush(self):
+        """Espera a aplicação de tudo o que já foi enfileirado"""
+        self.queue.join()
+    
+    def close(self):
+        self.queue.put(None)
+        self.updater_thread.join()
+    
+    def page(self, board, offset=0, limit=10):
+        """(total de jogadores, [(posição, nome, pontuação)])"""
+        with self.lock:
+            leaderboard = self.boards[board]
+            return len(leaderboard), leaderboard.page(offset, limit)
+    
+    def rank(self, board, player):
+        with self.lock:
+            return self.boards[board].rank(player)
@@ -0,0 +1,270 @@
+#!/usr/bin/env python3
+"""
+Fichas dos jogadores: apostas, pagamentos e saldo persistente em SQLite
+
+Cada mão terminada é liquidada: o vencedor recebe a aposta, o perdedor paga
+e no empate ninguém paga. O saldo de cada jogador fica num cache em memória
+atualizado na hora (write-through), então as leituras (o saldo na tela, o
+comando balance do servidor de salas) não tocam no banco; a gravação vai
+para uma fila e uma thread própria grava tudo o que estiver acumulado numa
+única transação (group commit), com o banco em modo WAL para as leituras
+não esperarem pela escrita.
+
+Os lançamentos ficam em entries (um por jogador por mão, com o saldo
+resultante) e o saldo em accounts, atualizado por diferença. Como os saldos
+vivem no cache do processo, cada arquivo deve ter um único dono (o jogo usa
+ledger.db e o servidor de salas server_ledger.db): dois processos no mesmo
+arquivo veriam saldos velhos um do outro.
+
+players guarda, para o servidor de salas, o hash da chave de cada nome: o
+primeiro a sentar com um nome fica com ele (claim).
+
+Uso: python ledger.py [--db ledger.db] [--player NOME] [--last 10]
+"""
+import argparse
+import hmac
+import os
+import queue
+import sqlite3
+import threading
+import time
+from constants import LEDGER_PATH, LEDGER_STARTING_BALANCE, LEDGER_QUEUE_SIZE, LEDGER_BATCH_SIZE
+from hand_history import WIN, LOSS, PUSH
+
+DEPOSIT = 'deposit'
+
+# Quanto da aposta cada resultado paga
+PAYOUTS = {WIN: 1, LOSS: -1, PUSH: 0}
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS accounts (
+    player TEXT PRIMARY KEY,
+    balance INTEGER NOT NULL,
+    hands INTEGER NOT NULL,
+    updated REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS entries (
+    id INTEGER PRIMARY KEY,
+    t REAL NOT NULL,
+    player TEXT NOT NULL,
+    room TEXT,
+    wager INTEGER NOT NULL,
+    outcome TEXT NOT NULL,
+    amount INTEGER NOT NULL,
+    balance INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS entries_player ON entries (player, id);
+CREATE TABLE IF NOT EXISTS players (
+    player TEXT PRIMARY KEY,
+    key TEXT NOT NULL,
+    created REAL NOT NULL
+);
+"""
+
+INSERT_ENTRY = "INSERT INTO entries (t, player, room, wager, outcome, amount, balance) VALUES (?, ?, ?, ?, ?, ?, ?)"
+
+UPDATE_ACCOUNT = """
+INSERT INTO accounts (player, balance, hands, updated) VALUES (?, ?, ?, ?)
+ON CONFLICT (player) DO UPDATE SET
+    balance = balance + excluded.balance,
+    hands = hands + excluded.hands,
+    updated = excluded.updated
+"""
+
+def open_database(path):
+    connection = sqlite3.connect(path, check_same_thread=False)
+    connection.execute("PRAGMA journal_mode=WAL")
+    connection.execute("PRAGMA synchronous=NORMAL")
+    connection.execute("PRAGMA busy_timeout=5000")
+    return connection
+
+class Ledger:
+    """
+    Saldos e lançamentos num banco SQLite (path)
+    Jogadores novos começam com starting_balance fichas (um lançamento de
+    depósito na primeira mão liquidada). settle_hand() atualiza o cache e só
+    enfileira os lançamentos; com a fila cheia ele espera a gravação, porque
+    fichas não podem ser descartadas como as mãos do histórico.
+    """
+    def __init__(self, path=LEDGER_PATH, starting_balance=LEDGER_STARTING_BALANCE,
+                 queue_size=LEDGER_QUEUE_SIZE, batch_size=LEDGER_BATCH_SIZE):
+        self.path = path
+        self.starting_balance = starting_balance
+        self.batch_size = batch_size
+        self.lock = threading.Lock()
+        self.balances = {}  # {nome: saldo}, o cache write-through
+        self.unopened = set()  # Jogadores no cache cujo depósito inicial ainda não foi lançado
+        self.settled = 0
+        self.commits = 0
+        
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        
+        # Uma conexão para a thread de gravação e outra para as leituras fora do cache
+        self.connection = open_database(path)
+        self.connection.executescript(SCHEMA)
+        self.reader = open_database(path)
+        
+        self.queue = queue.Queue(maxsize=queue_size)
+        self.writer_thread = threading.Thread(target=self.writer_loop)
+        self.writer_thread.daemon = True
+        self.writer_thread.start()
+    
+    def account(self, player):
+        """Saldo do jogador pelo cache, carregando do banco na primeira vez (chamar com o lock adquirido)"""
+        balance = self.balances.get(player)
+        if balance is None:
+            row = self.reader.execute("SELECT balance FROM accounts WHERE player = ?", (player,)).fetchone()
+            if row:
+                balance = row[0]
+            else:
+                balance = self.starting_balance
+                self.unopened.add(player)
+            self.balances[player] = balance
+        return balance
+    
+    def balance(self, player):
+        """Saldo do jogador; só lê, sem abrir conta nem guardar no cache quem ainda não jogou"""
+        with self.lock:
+            balance = self.balances.get(player)
+            if balance is not None:
+                return balance
+            row = self.reader.execute("SELECT balance FROM accounts WHERE player = ?", (player,)).fetchone()
+        return row[0] if row else self.starting_balance
+    
+    def preload(self, player):
+        """Carrega o saldo no cache antes das mãos do jogador (o servidor chama ao sentar)"""
+        with self.lock:
+            self.account(player)
+    
+    def claim(self, player, key_digest):
+        """
+        Confere o hash da chave do nome; o primeiro hash visto para um nome
+        fica com ele. Retorna True se a chave é a do nome.
+        """
+        with self.lock:
+            row = self.reader.execute("SELECT key FROM players WHERE player = ?", (player,)).fetchone()
+            if row is None:
+                with self.reader:
+                    self.reader.execute("INSERT INTO players (player, key, created) VALUES (?, ?, ?)", (player, key_digest, time.time()))
+                return True
+        return hmac.compare_digest(row[0], key_digest)
+    
+    def settle_hand(self, hand, players=None):
+        """
+        Liquida uma mão do histórico (hand_history) para os jogadores
+        informados (padrão: todos os da mão) e retorna os novos saldos
+        Ninguém aposta mais do que tem: a aposta vale o menor entre
+        hand['wager'] e os saldos dos jogadores liquidados, então no servidor
+        (que liquida os dois) o vencedor recebe o que o perdedor paga.
+        """
+        wager = hand.get('wager')
+        if not isinstance(wager, int) or wager < 0:
+            return []
+        players = hand['players'] if players is None else players
+        now = time.time()
+        rows = []
+        balances = []
+        with self.lock:
+            for player in players:
+                wager = min(wager, self.account(player['name']))
+            for player in players:
+                name = player['name']
+                if name in self.unopened:
+                    self.unopened.discard(name)
+                    rows.append((now, name, None, 0, DEPOSIT, self.starting_balance, self.starting_balance))
+                amount = wager * PAYOUTS[player['outcome']]
+                balance = self.balances[name] = self.balances[name] + amount
+                rows.append((hand.get('t', now), name, hand.get('room'), wager, player['outcome'], amount, balance))
+                balances.append(balance)
+        self.queue.put(rows)
+        return balances
+    
+    def writer_loop(self):
+        while True:
+            rows = self.queue.get()
+            batch = [rows]
+            while rows is not None and len(batch) < self.batch_size:
+                try:
+                    rows = self.queue.get_nowait()
+                except queue.Empty:
+                    break
+                batch.append(rows)
+            
+            entries = [row for rows in batch if rows is not None for row in rows]
+            if entries:
+                try:
+                    self.write_batch(entries)
+                except sqlite3.Error as e:
+                    print(f"Erro ao gravar as fichas: {e}")
+            for _ in batch:
+                self.queue.task_done()
+            if batch[-1] is None:
+                return
+    
+    def write_batch(self, entries):
+        """Todos os lançamentos acumulados numa transação, com uma atualização por conta"""
+        accounts = {}
+        for t, name, room, wager, outcome, amount, balance in entries:
+            total = accounts.setdefault(name, [0, 0, t])
+            total[0] += amount
+            total[1] += outcome != DEPOSIT
+            total[2] = max(total[2], t)
+        
+        with self.connection:
+            self.connection.executemany(INSERT_ENTRY, entries)
+            self.connection.executemany(UPDATE_ACCOUNT, [(name, amount, hands, updated) for name, (amount, hands, updated) in accounts.items()])
+        self.settled += sum(1 for entry in entries if entry[4] != DEPOSIT)
+        self.commits += 1
+    
+    def flush(self):
+        """Espera a gravação de tudo o que já foi liquidado"""
+        self.queue.join()
+    
+    def close(self):
+        self.queue.put(None)
+        self.writer_thread.join()
+        self.connection.close()
+        self.reader.close()
+    
+    def statement(self, player, limit=10):
+        """Últimos lançamentos gravados do jogador, mais recentes primeiro: [(t, mesa, aposta, resultado, valor, saldo)]"""
+        with self.lock:
+            return self.reader.execute(
+                "SELECT t, room, wager, outcome, amount, balance FROM entries WHERE player = ? ORDER BY id DESC LIMIT ?",
+                (player, limit)
+            ).fetchall()
+    
+    def accounts(self, limit=20):
+        """Contas gravadas com os maiores saldos: [(nome, saldo, mãos)]; limit=None retorna todas"""
+        with self.lock:
+            return self.reader.execute(
+                "SELECT player, balance, hands FROM accounts ORDER BY balance DESC LIMIT ?", (-1 if limit is None else limit,)
+            ).fetchall()
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--db', default=LEDGER_PATH)
+    parser.add_argument('--player')
+    parser.add_argument('--last', type=int, default=10)
+    args = parser.parse_args()
+    
+    try:
+        ledger = Ledger(args.db)
+    except sqlite3.Error as e:
+        print(f"Erro: {e}")
+        return
+    
+    if not args.player:
+        for name, balance, hands in ledger.accounts(args.last):
+            print(f"{name:<24} {balance:>10,} fichas  {hands:>8,} mãos")
+    else:
+        print(f"{args.player}: {ledger.balance(args.player):,} fichas")
+        for t, room, wager, outcome, amount, balance in ledger.statement(args.player, args.last):
+            when = time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(t))
+            print(f"{when}  {room or '-':<10} {outcome:<8} aposta {wager:>6,}  {amount:>+8,}  saldo {balance:>10,}")
+    ledger.close()
+
+if __name__ == "__main__":
+    main()
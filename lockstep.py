@@ -0,0 +1,80 @@
+import hashlib
+import os
+import zlib
+from card import CARDS
+
+class SeedExchange:
+    """
+    Troca de semente por commit-reveal entre host e cliente
+    Cada lado gera um nonce secreto; quem inicia a troca publica apenas o hash
+    (commit) do seu nonce, o outro responde com o próprio nonce e, por fim, o
+    primeiro revela o seu. Nenhum dos dois consegue escolher a semente final.
+    """
+    def __init__(self, is_host, rng=None):
+        self.is_host = is_host
+        # rng (random.Random) torna o nonce reproduzível, para partidas sem
+        # interface com semente fixa; sem ele o nonce vem do sistema
+        self.local_nonce = rng.getrandbits(128).to_bytes(16, 'big').hex() if rng else os.urandom(16).hex()
+        self.peer_commitment = None
+        self.peer_nonce = None
+    
+    def commitment(self):
+        """Retorna o commit (hash) do nonce local"""
+        return commit(self.local_nonce)
+    
+    def set_peer_commitment(self, commitment):
+        """Guarda o commit recebido do outro jogador"""
+        self.peer_commitment = commitment
+    
+    def set_peer_nonce(self, nonce):
+        """
+        Guarda o nonce revelado pelo outro jogador
+        Retorna False se o nonce não corresponder ao commit recebido antes
+        """
+        if not nonce:
+            return False
+        if self.peer_commitment is not None and commit(nonce) != self.peer_commitment:
+            return False
+        self.peer_nonce = nonce
+        return True
+    
+    def is_complete(self):
+        return self.peer_nonce is not None
+    
+    def seed(self):
+        """Deriva a semente compartilhada (mesmo valor nos dois lados)"""
+        if self.is_host:
+            return derive_seed(self.local_nonce, self.peer_nonce)
+        return derive_seed(self.peer_nonce, self.local_nonce)
+
+class SeatDeck:
+    """
+    Visão de um assento sobre o baralho compartilhado
+    Host e cliente consomem posições intercaladas do mesmo baralho, então a
+    ordem em que as ações chegam pela rede não altera as cartas de cada um.
+    cards são os índices do sapato (Shoe.cards) e start a posição em que a
+    rodada começa.
+    """
+    def __init__(self, cards, seat, seats=2, start=0):
+        self.cards = cards
+        self.seats = seats
+        self.position = start + seat
+    
+    def draw(self):
+        """Retorna a próxima carta deste assento"""
+        if self.position >= len(self.cards):
+            return None
+        card = CARDS[self.cards[self.position]]
+        self.position += self.seats
+        return card
+
+def commit(nonce):
+    return hashlib.sha256(nonce.encode('utf-8')).hexdigest()
+
+def derive_seed(host_nonce, client_nonce):
+    digest = hashlib.sha256(f"{host_nonce}:{client_nonce}".encode('utf-8')).digest()
+    return int.from_bytes(digest[:8], 'big')
+
+def hand_digest(hand):
+    """Hash curto da mão, usado para detectar dessincronização entre os lados"""
+    return zlib.crc32(bytes(card.index for card in hand)) & 0xFFFF
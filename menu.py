@@ -27,21 +27,29 @@ class Menu:
         # Posições dos botões ajustadas para serem semelhantes à imagem
         self.start_button = pygame.Rect(
             button_x - button_width // 2,
-            SCREEN_HEIGHT // 2 - 80,
+            SCREEN_HEIGHT // 2 - 120,
             button_width, 
             button_height
         )
         
         self.join_button = pygame.Rect(
             button_x - button_width // 2,
-            SCREEN_HEIGHT // 2,
+            SCREEN_HEIGHT // 2 - 50,
+            button_width, 
+            button_height
+        )
+        
+        # Partida offline contra o bot
+        self.bot_button = pygame.Rect(
+            button_x - button_width // 2,
+            SCREEN_HEIGHT // 2 + 20,
             button_width, 
             button_height
         )
         
         self.settings_button = pygame.Rect(
             button_x - button_width // 2,
-            SCREEN_HEIGHT // 2 + 80,
+            SCREEN_HEIGHT // 2 + 90,
             button_width, 
             button_height
         )
@@ -102,6 +110,13 @@ class Menu:
         join_text_rect = join_text.get_rect(center=self.join_button.center)
         self.screen.blit(join_text, join_text_rect)
         
+        # Botão "Jogar com o Bot" (partida offline)
+        pygame.draw.rect(self.screen, GOLD, self.bot_button, border_radius=8)
+        pygame.draw.rect(self.screen, BLACK, self.bot_button, 4, border_radius=10)  # Contorno preto
+        bot_text = self.custom_font.render("Jogar com o Bot", True, BLACK)
+        bot_text_rect = bot_text.get_rect(center=self.bot_button.center)
+        self.screen.blit(bot_text, bot_text_rect)
+        
         # Botão "Ajeitar o Jogo" (Sem função)
         pygame.draw.rect(self.screen, GOLD, self.settings_button, border_radius=8)
         pygame.draw.rect(self.screen, BLACK, self.settings_button, 4, border_radius=10)  # Contorno preto
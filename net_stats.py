@@ -0,0 +1,98 @@
+import time
+from collections import deque
+
+class LinkStats:
+    """
+    Estatísticas de um caminho de rede (relay, direto ou servidor de salas)
+    RTT e jitter seguem o SRTT/RTTVAR do TCP (médias móveis exponenciais),
+    para que uma amostra isolada não faça o jogo trocar de caminho. A perda
+    é a fração de probes sem resposta nas últimas LOSS_WINDOW tentativas e o
+    offset de relógio é estimado como no NTP, usando a amostra de menor RTT.
+    """
+    ALPHA = 0.125
+    BETA = 0.25
+    LOSS_WINDOW = 20
+    PROBE_TIMEOUT = 5.0
+    OFFSET_WINDOW = 8
+    
+    def __init__(self, name):
+        self.name = name
+        self.reset()
+    
+    def reset(self):
+        self.srtt = None
+        self.rttvar = None
+        self.samples = 0
+        self.pending = {}  # {id do probe: instante de envio}
+        self.next_probe_id = 0
+        self.loss_window = deque(maxlen=self.LOSS_WINDOW)
+        self.offset_samples = deque(maxlen=self.OFFSET_WINDOW)  # [(rtt, offset)]
+    
+    def new_probe(self):
+        """Registra o envio de um probe e retorna (id, t0) para incluir na mensagem"""
+        now = time.time()
+        
+        # Probes antigos sem resposta contam como perdidos
+        for probe_id, sent_at in list(self.pending.items()):
+            if now - sent_at > self.PROBE_TIMEOUT:
+                del self.pending[probe_id]
+                self.loss_window.append(False)
+        
+        self.next_probe_id += 1
+        self.pending[self.next_probe_id] = now
+        return self.next_probe_id, now
+    
+    def probe_answered(self, probe_id, t0, t1=None, t2=None):
+        """
+        Registra a resposta de um probe
+        t1/t2 são os instantes de recepção e resposta no relógio do outro lado
+        """
+        t3 = time.time()
+        if self.pending.pop(probe_id, None) is not None:
+            self.loss_window.append(True)
+        
+        rtt = t3 - t0
+        if t1 is not None and t2 is not None:
+            # Desconta o tempo de processamento do outro lado
+            rtt -= (t2 - t1)
+            self.offset_samples.append((rtt, ((t1 - t0) + (t2 - t3)) / 2))
+        self.add_rtt_sample(max(rtt, 0.0))
+    
+    def add_rtt_sample(self, rtt):
+        """Registra uma amostra de RTT (em segundos)"""
+        if self.srtt is None:
+            self.srtt = rtt
+            self.rttvar = rtt / 2
+        else:
+            self.rttvar += self.BETA * (abs(self.srtt - rtt) - self.rttvar)
+            self.srtt += self.ALPHA * (rtt - self.srtt)
+        self.samples += 1
+    
+    def loss_rate(self):
+        if not self.loss_window:
+            return 0.0
+        return 1.0 - sum(self.loss_window) / len(self.loss_window)
+    
+    def clock_offset(self):
+        """Diferença estimada entre o relógio do outro lado e o local (segundos)"""
+        if not self.offset_samples:
+            return None
+        return min(self.offset_samples)[1]
+    
+    def rto(self, minimum=0.2):
+        """Timeout de retransmissão sugerido (SRTT + 4 * RTTVAR), como no TCP"""
+        if self.srtt is None:
+            return None
+        return max(minimum, self.srtt + 4 * self.rttvar)
+    
+    def snapshot(self):
+        """Resumo das estatísticas em milissegundos, para o HUD e outras decisões"""
+        offset = self.clock_offset()
+        return {
+            'name': self.name,
+            'rtt_ms': None if self.srtt is None else self.srtt * 1000,
+            'jitter_ms': None if self.rttvar is None else self.rttvar * 1000,
+            'loss': self.loss_rate(),
+            'offset_ms': None if offset is None else offset * 1000,
+            'samples': self.samples
+        }
@@ -1,13 +1,21 @@
 import socket
 import threading
-import json
 import time
-from constants import GameState
-from card import Card
+import uuid
+from collections import deque
+from constants import *
+from card import encode_hand, decode_hand
+from lockstep import SeedExchange, hand_digest
+from protocol import MessageBuffer, ProtocolError, encode_message, reconnect_delays
+from net_stats import LinkStats
+from transport import TcpTransport
 
 class NetworkManager:
-    def __init__(self, game):
+    def __init__(self, game, transport=None):
         self.game = game
+        
+        # Transporte das conexões diretas (TCP por padrão; em memória nos testes)
+        self.transport = transport or TcpTransport()
         self.socket = None
         self.peer_socket = None
         self.is_connected = False
@@ -19,6 +27,44 @@ class NetworkManager:
         self.room_id = None
         self.use_relay = False
         self.relay_connected = False
+        
+        # Estado do modo lockstep (troca de semente e sequência das ações)
+        self.lockstep = LOCKSTEP_ENABLED
+        self.lockstep_active = False
+        self.seed_exchange = None
+        self.nonce_rng = None  # random.Random para nonces reproduzíveis (semente da mesa)
+        self.recorder = None  # recorder.MatchRecorder da mesa, se a partida estiver sendo gravada
+        self.peer_name = None  # Nome do outro jogador, recebido no handshake
+        self.send_seq = 0
+        self.recv_seq = 0
+        
+        # Sessão: token emitido no handshake e outbox numerado, usado para
+        # reenviar o que o outro lado perdeu quando a conexão cai e volta
+        self.session_token = None
+        self.reconnecting = False
+        self.reconnect_deadline = 0
+        self.reconnect_lock = threading.Lock()
+        # Os dois limites (OUTBOX_SIZE) não descartam nada: estourados, a
+        # partida é encerrada, já que o resume não preencheria o buraco
+        self.outbox = deque()
+        self.out_seq = 0
+        self.last_received_seq = 0
+        self.acked_seq = 0  # Última sequência recebida já confirmada ao outro lado
+        self.recv_buffer = MessageBuffer()
+        self.reorder_buffer = {}
+        self.incoming_lock = threading.RLock()
+        
+        # Caminhos de envio: no modo relay tentamos abrir também uma conexão
+        # direta e migramos para ela se a latência medida for menor
+        self.active_path = 'direct'
+        self.direct_ready = False
+        self.path_stats = {'relay': LinkStats('relay'), 'direct': LinkStats('direct')}
+        self.monitor_thread = None
+        
+        # Relay UDP pelo servidor de salas (só com transporte UDP); enquanto
+        # não estiver pronto o relay continua pela conexão TCP do RoomClient
+        self.relay_socket = None
+        self.relay_buffer = MessageBuffer()
     
     def setup_network(self, is_host, peer_address=None, room_id=None, use_relay=False):
         # Garantir que não há conexões anteriores ativas
@@ -31,42 +77,43 @@ class NetworkManager:
         self.room_id = room_id
         self.use_relay = use_relay
         self.relay_connected = False
+        self.lockstep_active = False
+        self.seed_exchange = None
+        self.peer_name = None
+        self.reset_session()
+        self.active_path = 'relay' if use_relay else 'direct'
+        self.direct_ready = False
+        for stats in self.path_stats.values():
+            stats.reset()
         
-        # Se estiver usando relay, não precisamos criar conexão P2P direta
+        # A partida começa pelo relay; a conexão direta é tentada em segundo plano
         if use_relay:
             print(f"Usando relay para comunicação via servidor de salas (Room ID: {room_id})")
             
             # Configurar como conectado já que a comunicação será pelo servidor
             self.is_connected = True
             
+            self.open_udp_relay()
+            
             if is_host:
                 print("Aguardando conexão do cliente via relay...")
                 self.game.game_state = GameState.WAITING
+                self.listen_for_direct_path()
             else:
                 print("Conectado ao host via relay!")
                 self.game.game_state = GameState.WAITING  # Cliente também espera confirmação
                 
                 # Enviar handshake
-                handshake_msg = {'type': 'handshake', 'client': 'ready'}
-                self.send_message(handshake_msg)
+                self.send_message(self.build_handshake())
             
             return True
         
         # Se não usar relay, continua com a lógica normal de P2P
         try:
-            self.socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-            self.socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
-            
-            # Definir timeout para operações de socket
-            if is_host:
-                self.socket.settimeout(60)  # Timeout mais longo para hospedagem
-            else:
-                self.socket.settimeout(10)  # Timeout curto para conexão cliente
-            
             if is_host:
                 try:
-                    self.socket.bind(('0.0.0.0', 5000))
-                    self.socket.listen(1)
+                    self.socket = self.transport.listen(GAME_PORT)
+                    self.socket.settimeout(60)  # Timeout mais longo para hospedagem
                     print("Waiting for opponent to connect...")
                     
                     # Iniciar thread de aceitação de conexão
@@ -84,7 +131,7 @@ class NetworkManager:
                 if peer_address:
                     try:
                         print(f"Tentando conectar ao host: {peer_address}")
-                        self.socket.connect((peer_address, 5000))
+                        self.socket = self.transport.connect(peer_address, GAME_PORT, timeout=10)
                         self.peer_socket = self.socket
                         self.is_connected = True
                         print("Connected to host!")
@@ -94,8 +141,7 @@ class NetworkManager:
                         
                         # Enviar handshake
                         try:
-                            handshake_msg = {'type': 'handshake', 'client': 'ready'}
-                            self.send_message(handshake_msg)
+                            self.send_message(self.build_handshake())
                         except Exception as e:
                             print(f"Erro no handshake: {e}")
                             self.close_connection()
@@ -134,8 +180,12 @@ class NetworkManager:
             if not self.running or not self.socket:
                 return
                 
-            # Configurar o socket para aceitar conexões
-            self.socket.settimeout(None)  # sem timeout para accept()
+            # Configurar o socket para aceitar conexões; durante uma reconexão
+            # o host espera no máximo até o fim do período de tolerância
+            if self.reconnecting:
+                self.socket.settimeout(max(0.1, self.reconnect_deadline - time.time()))
+            else:
+                self.socket.settimeout(None)  # sem timeout para accept()
             
             # Tentar aceitar conexão
             print("Aguardando conexão do cliente...")
@@ -151,39 +201,23 @@ class NetworkManager:
                 
             # Configurar o socket do cliente
             client_socket.settimeout(5.0)
+            client_socket.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
             self.peer_socket = client_socket
+            self.recv_buffer.clear()
             self.is_connected = True
             print(f"Client connected from {addr}")
             
-            # Aguardar mensagem de handshake antes de iniciar o jogo
-            try:
-                data = client_socket.recv(1024)
-                if data:
-                    handshake = json.loads(data.decode('utf-8'))
-                    if handshake.get('type') == 'handshake' and handshake.get('client') == 'ready':
-                        print("Handshake recebido com sucesso")
-                        # Enviar confirmação de handshake para o cliente
-                        self.send_message({'type': 'handshake_ack', 'host': 'ready'})
-                        # Agora sim iniciar o jogo
-                        self.game.game_state = GameState.PLAYING
-                        # Distribuir cartas iniciais
-                        self.game.deal_initial_cards()
-                    else:
-                        print("Handshake inválido")
-                        return
-            except Exception as e:
-                print(f"Erro no handshake: {e}")
-                return
-            
-            # Iniciar thread de recebimento de mensagens
+            # O handshake (nova partida) ou o resume (reconexão) chega como
+            # primeira mensagem e é tratado pela thread de recebimento
             self.receive_thread = threading.Thread(target=self.receive_messages)
             self.receive_thread.daemon = True
             self.receive_thread.start()
             
         except socket.timeout:
-            print("Accept timed out, still waiting...")
-            if self.running:
-                pass
+            if self.reconnecting:
+                self.give_up_reconnect()
+            else:
+                print("Accept timed out, still waiting...")
         except OSError as e:
             print(f"Error in wait_for_connection: {e}")
             if self.running and self.socket:
@@ -195,6 +229,20 @@ class NetworkManager:
     
     def handle_relay_message(self, message_data):
         """Processa mensagens recebidas via relay"""
+        if self.recorder:
+            self.recorder.message(message_data, relay=True)
+        
+        # Mensagens de controle (retomada de sessão, medição dos caminhos)
+        if self.handle_control_message(message_data, 'relay'):
+            return
+        
+        # Descarta duplicatas e entrega na ordem de envio, mesmo que parte
+        # das mensagens tenha chegado pela conexão direta
+        with self.incoming_lock:
+            for message in self.sequence_incoming(message_data):
+                self.dispatch_relay_message(message)
+    
+    def dispatch_relay_message(self, message_data):
         # Verificar tipo de mensagem de relay
         if message_data.get('type') == 'client_connected' and self.is_host:
             print("Cliente conectado via relay!")
@@ -209,16 +257,20 @@ class NetworkManager:
             if self.is_host and message_data.get('client') == 'ready':
                 print("Handshake cliente recebido via relay")
                 self.relay_connected = True
-                # Enviar confirmação de handshake para o cliente
-                self.send_message({'type': 'handshake_ack', 'host': 'ready'})
-                # Mudar para a tela de jogo e iniciar
-                self.game.game_state = GameState.PLAYING
-                self.game.deal_initial_cards()
+                self.accept_handshake(message_data)
+        
+        elif message_data.get('type') in ('handshake_ack', 'seed_nonce', 'seed_reveal', 'resync_request', 'deck_check', 'deck_resync'):
+            # Mensagens de protocolo (troca de semente do lockstep)
+            self.game.handle_message(message_data)
         
         elif message_data.get('type') == 'game_state':
             # Estado do jogo do outro jogador (mão, status)
             self.game.handle_message(message_data)
         
+        elif message_data.get('type') == 'peer_away':
+            # O servidor segura a cadeira do outro jogador por um tempo
+            print("O outro jogador caiu, aguardando reconexão...")
+        
         elif message_data.get('type') == 'host_left' or message_data.get('type') == 'client_left':
             print("O outro jogador desconectou")
             self.is_connected = False
@@ -234,11 +286,36 @@ class NetworkManager:
             self.game.handle_message(message_data)
     
     def send_message(self, message):
-        if not self.is_connected:
+        if not self.is_connected and not self.reconnecting:
             return False
-            
+        
+        if len(self.outbox) >= OUTBOX_SIZE:
+            self.abandon_session("Outbox cheio, o outro jogador não confirma as mensagens")
+            return False
+        
+        # Numera a mensagem e guarda no outbox até o outro lado confirmar
+        self.out_seq += 1
+        message = dict(message, _seq=self.out_seq, _ack=self.last_received_seq)
+        self.outbox.append(message)
+        self.acked_seq = self.last_received_seq
+        
+        # Durante a reconexão a mensagem fica no outbox e é reenviada no resume
+        if self.reconnecting:
+            return False
+        
+        sent = self.transmit(message)
+        if not sent and self.use_relay and self.session_token:
+            # Servidor de salas inacessível: segura as próximas mensagens até
+            # o RoomClient retomar a sessão, para não criar buracos na sequência
+            self.reconnecting = True
+        return sent
+    
+    def transmit(self, message, path=None):
+        """Envia uma mensagem pelo caminho informado ou pelo caminho ativo"""
+        path = path or self.active_path
+        
         # Se estiver usando relay, enviar através do servidor de salas
-        if self.use_relay:
+        if path == 'relay':
             return self.send_via_relay(message)
             
         # Lógica normal P2P
@@ -248,29 +325,42 @@ class NetworkManager:
         try:
             # Conversão para JSON com tratamento de erros
             try:
-                data = json.dumps(message).encode('utf-8')
+                data = encode_message(message)
             except Exception as e:
                 print(f"Error encoding JSON: {e}")
                 return False
                 
-            # Enviar dados
-            self.peer_socket.sendall(data)
+            # Enviar dados (no UDP, estado do jogo e reinício vão no canal ordenado)
+            if self.transport.datagram:
+                self.peer_socket.sendall(data, ordered=message.get('type') in ORDERED_MESSAGE_TYPES)
+            else:
+                self.peer_socket.sendall(data)
             return True
         except ConnectionResetError:
             print("Connection was reset by peer")
-            self.is_connected = False
-            return False
         except BrokenPipeError:
             print("Connection broken (pipe error)")
-            self.is_connected = False
-            return False
         except Exception as e:
             print(f"Failed to send message: {e}")
-            self.is_connected = False
-            return False
+        
+        if self.use_relay:
+            # Caminho direto caiu: volta para o relay sem encerrar a partida
+            # (as mensagens do jogo são reenviadas a partir do outbox)
+            self.drop_direct_path()
+            return '_seq' in message
+        self.is_connected = False
+        return False
     
     def send_via_relay(self, message):
         """Envia mensagem através do servidor de salas usando relay"""
+        relay_socket = self.relay_socket
+        if relay_socket and relay_socket.peer_present:
+            try:
+                relay_socket.sendall(encode_message(message), ordered=message.get('type') in ORDERED_MESSAGE_TYPES)
+                return True
+            except (OSError, ValueError) as e:
+                print(f"Relay UDP indisponível, usando o relay TCP: {e}")
+        
         # Verificar se está conectado ao serviço de salas
         if not hasattr(self.game, 'room_client') or not self.game.room_client.connected:
             print("Não está conectado ao servidor de salas")
@@ -295,26 +385,74 @@ class NetworkManager:
             print(f"Erro ao enviar via relay: {e}")
             return False
     
-    def receive_messages(self):
-        if not self.peer_socket and not self.use_relay:
+    def open_udp_relay(self):
+        """Registra a cadeira no relay UDP do servidor de salas, em segundo plano"""
+        room_client = getattr(self.game, 'room_client', None)
+        seat = room_client.seat(self.room_id) if room_client else None
+        if not self.transport.datagram or not seat or not room_client.udp_port or not seat['session_token']:
             return
-            
-        # Se estiver usando relay, não precisa receber mensagens aqui
-        # Elas são processadas pelo RoomClient 
-        if self.use_relay:
+        thread = threading.Thread(target=self.udp_relay_loop, args=(room_client.server_host, room_client.udp_port, seat['session_token']))
+        thread.daemon = True
+        thread.start()
+    
+    def udp_relay_loop(self, host, port, session_token):
+        try:
+            relay_socket = self.transport.connect_relay(host, port, session_token, timeout=DIRECT_CONNECT_TIMEOUT)
+        except OSError as e:
+            print(f"Relay UDP indisponível, usando o relay TCP: {e}")
             return
-            
-        buffer = ""
+        if not self.running:
+            relay_socket.close()
+            return
+        
+        self.relay_socket = relay_socket
+        self.relay_buffer.clear()
+        relay_socket.settimeout(1.0)
+        
+        while self.running and self.relay_socket is relay_socket:
+            try:
+                data = relay_socket.recv(4096)
+            except socket.timeout:
+                continue
+            except OSError:
+                break
+            if not data:
+                break
+            try:
+                messages = self.relay_buffer.feed(data)
+            except ProtocolError as e:
+                print(f"Relay UDP encerrado: {e}")
+                break
+            for message in messages:
+                try:
+                    self.handle_relay_message(message)
+                except Exception as e:
+                    print(f"Error processing message: {e}")
         
+        if self.relay_socket is relay_socket:
+            # O relay UDP parou de responder: o que ficou sem confirmação é
+            # reenviado pelo relay TCP (o outro lado descarta duplicatas)
+            self.relay_socket = None
+            relay_socket.close()
+            if self.running and self.use_relay and self.active_path == 'relay':
+                self.resend_outbox(0)
+    
+    def receive_messages(self):
+        # Mensagens do relay são processadas pelo RoomClient; aqui chegam
+        # apenas as do socket P2P (ou do caminho direto no modo relay)
+        peer_socket = self.peer_socket
+        if not peer_socket:
+            return
+            
         while self.running and self.is_connected:
             try:
-                if not self.peer_socket:
-                    print("Socket inválido, encerrando recebimento")
-                    break
+                if peer_socket is not self.peer_socket:
+                    # O socket foi substituído (reconexão ou novo caminho direto)
+                    return
                 
                 # Receber dados
                 try:
-                    data = self.peer_socket.recv(1024)
+                    data = peer_socket.recv(1024)
                 except socket.timeout:
                     continue
                 except ConnectionResetError:
@@ -328,62 +466,597 @@ class NetworkManager:
                     print("No data received, connection closed")
                     break
                 
-                # Decodificar dados
-                try:
-                    decoded_data = data.decode('utf-8')
-                    buffer += decoded_data
-                except UnicodeDecodeError as e:
-                    print(f"Error decoding data: {e}")
-                    buffer = ""  # Reset buffer on decode error
-                    continue
-                
-                # Processar JSON do buffer
-                while buffer:
+                # Processar as mensagens completas do buffer (ProtocolError
+                # encerra a conexão, como uma queda)
+                for message in self.recv_buffer.feed(data):
                     try:
-                        # Tentar carregar o JSON completo
-                        message = json.loads(buffer)
-                        self.game.handle_message(message)
-                        buffer = ""  # Limpar buffer após processamento
-                        break
-                    except json.JSONDecodeError as e:
-                        # Verificar se o erro é por dados incompletos ou inválidos
-                        if "Extra data" in str(e):
-                            # Dados extras no buffer - encontrar o fim do primeiro JSON
-                            pos = e.pos
-                            try:
-                                # Processar primeiro JSON e manter o resto no buffer
-                                first_json = buffer[:pos]
-                                message = json.loads(first_json)
-                                self.game.handle_message(message)
-                                buffer = buffer[pos:]  # Manter o resto para o próximo ciclo
-                            except:
-                                # Se falhar, descartar o buffer
-                                print("Error processing partial JSON, discarding buffer")
-                                buffer = ""
-                        elif "Expecting value" in str(e) and len(buffer) < 1024:
-                            # Provavelmente JSON incompleto, manter buffer e aguardar mais dados
-                            break
-                        else:
-                            # JSON inválido, descartar buffer
-                            print(f"Invalid JSON in buffer: {e}")
-                            buffer = ""
-                            break
+                        self.process_incoming(message)
                     except Exception as e:
                         print(f"Error processing message: {e}")
-                        buffer = ""
-                        break
                 
             except Exception as e:
                 print(f"Error in receive loop: {e}")
                 break
         
         # Se saímos do loop, a conexão foi perdida
-        self.is_connected = False
+        self.handle_connection_lost(peer_socket)
+    
+    def process_incoming(self, message):
+        """Encaminha uma mensagem recebida pelo socket P2P"""
+        if self.recorder:
+            self.recorder.message(message)
+        
+        if self.use_relay and not self.direct_ready and not self.opens_direct_path(message):
+            # Caminho direto do modo relay ainda não validado pelo direct_hello
+            return
         
-        # Se ainda estamos em execução, mas a conexão foi perdida, voltar ao menu
+        if self.handle_control_message(message, 'direct'):
+            return
+        
+        with self.incoming_lock:
+            for ready in self.sequence_incoming(message):
+                if self.use_relay and ready.get('type') == 'handshake' and self.is_host:
+                    # Cliente que encontrou a mesa pela rede local e entrou
+                    # direto, sem passar pelo servidor de salas
+                    print("Cliente conectado diretamente, deixando o relay")
+                    self.use_relay = False
+                    self.active_path = 'direct'
+                    self.accept_handshake(ready)
+                elif self.use_relay:
+                    # Caminho direto do modo relay: mesmo tratamento do relay
+                    self.dispatch_relay_message(ready)
+                elif ready.get('type') == 'handshake' and self.is_host:
+                    if ready.get('client') == 'ready':
+                        print("Handshake recebido com sucesso")
+                        self.accept_handshake(ready)
+                    else:
+                        print("Handshake inválido")
+                else:
+                    self.game.handle_message(ready)
+    
+    def handle_control_message(self, message, path):
+        """
+        Trata mensagens de controle, que não entram na sequência do jogo
+        Retorna True se a mensagem foi consumida aqui
+        """
+        msg_type = message.get('type')
+        
+        if msg_type == 'resume':
+            self.handle_resume(message)
+        elif msg_type == 'resume_ack':
+            self.handle_resume_ack(message)
+        elif msg_type == 'ack':
+            with self.incoming_lock:
+                self.release_outbox(message.get('last_seq'))
+        elif msg_type == 'probe':
+            # Responde pelo mesmo caminho para medir o RTT dele; t1/t2 permitem
+            # estimar a diferença entre os relógios
+            received_at = time.time()
+            self.transmit({
+                'type': 'probe_ack',
+                'id': message.get('id'),
+                't0': message.get('t0'),
+                't1': received_at,
+                't2': time.time()
+            }, path)
+        elif msg_type == 'probe_ack':
+            if message.get('t0'):
+                self.path_stats[path].probe_answered(message.get('id'), message['t0'], message.get('t1'), message.get('t2'))
+        elif msg_type == 'direct_hello':
+            self.handle_direct_hello(message)
+        elif msg_type == 'direct_hello_ack':
+            print("Caminho direto estabelecido")
+            self.direct_ready = True
+            self.start_path_monitor()
+        else:
+            return False
+        return True
+    
+    def reset_session(self):
+        """Descarta o estado de sessão (token, outbox e sequências)"""
+        self.session_token = None
+        self.reconnecting = False
+        self.outbox.clear()
+        self.out_seq = 0
+        self.last_received_seq = 0
+        self.acked_seq = 0
+        self.recv_buffer.clear()
+        self.reorder_buffer.clear()
+    
+    def sequence_incoming(self, message):
+        """
+        Confere a sequência de uma mensagem recebida
+        Libera do outbox o que o outro lado confirmou, descarta duplicatas
+        (reenvios após reconexão ou troca de caminho) e segura mensagens
+        adiantadas até que as anteriores cheguem. Retorna a lista de
+        mensagens prontas para processar, na ordem de envio.
+        """
+        self.release_outbox(message.get('_ack'))
+        
+        seq = message.get('_seq')
+        if seq is None:
+            return [message]
+        if seq <= self.last_received_seq:
+            return []
+        if seq > self.last_received_seq + OUTBOX_SIZE:
+            # O outbox do outro lado não guarda tantas mensagens sem
+            # confirmação: as que faltam antes desta não chegarão mais
+            self.abandon_session("Mensagem fora da janela da sessão")
+            return []
+        self.reorder_buffer[seq] = message
+        
+        ready = []
+        while self.last_received_seq + 1 in self.reorder_buffer:
+            self.last_received_seq += 1
+            ready.append(self.reorder_buffer.pop(self.last_received_seq))
+        
+        # Lado que só recebe: confirma sozinho antes de o outbox do outro lado encher
+        if self.last_received_seq - self.acked_seq >= OUTBOX_SIZE // 2:
+            self.acked_seq = self.last_received_seq
+            self.transmit({'type': 'ack', 'last_seq': self.last_received_seq})
+        return ready
+    
+    def release_outbox(self, ack):
+        """Libera do outbox as mensagens que o outro lado confirmou"""
+        if not isinstance(ack, int):
+            return
+        while self.outbox and self.outbox[0]['_seq'] <= ack:
+            self.outbox.popleft()
+    
+    def abandon_session(self, reason):
+        """Limite da sessão estourado: encerra a partida em vez de perder mensagens"""
+        print(f"{reason}, encerrando a partida")
+        self.session_token = None
         if self.running:
+            self.game.game_state = GameState.MENU
+        self.close_connection()
+    
+    def resend_outbox(self, peer_last_seq):
+        """Reenvia as mensagens que o outro lado ainda não recebeu"""
+        self.release_outbox(peer_last_seq)
+        for message in list(self.outbox):
+            if message['_seq'] > peer_last_seq:
+                message['_ack'] = self.last_received_seq
+                self.transmit(message)
+    
+    def handle_connection_lost(self, peer_socket):
+        """Conexão P2P caiu: tenta retomar a sessão antes de desistir da partida"""
+        if peer_socket is not self.peer_socket:
+            # Socket antigo, já substituído por outra conexão
+            return
+        
+        if self.use_relay:
+            # Era o caminho direto do modo relay: a partida continua pelo relay
+            if self.running:
+                self.drop_direct_path()
+            return
+        
+        self.is_connected = False
+        if not self.running:
+            return
+        
+        if not self.session_token:
+            # Ainda não havia sessão (antes do handshake): volta ao menu
             print("Connection lost, returning to menu")
             self.game.game_state = GameState.MENU
+            return
+        
+        with self.reconnect_lock:
+            if not self.reconnecting:
+                self.reconnecting = True
+                self.reconnect_deadline = time.time() + RECONNECT_GRACE_PERIOD
+                print("Conexão perdida, tentando reconectar...")
+        
+        # Fecha apenas o socket do peer; o host mantém o socket de escuta
+        if self.peer_socket:
+            try:
+                self.peer_socket.close()
+            except:
+                pass
+            if self.peer_socket == self.socket:
+                self.socket = None
+            self.peer_socket = None
+        
+        target = self.wait_for_connection if self.is_host else self.reconnect_loop
+        self.connection_thread = threading.Thread(target=target)
+        self.connection_thread.daemon = True
+        self.connection_thread.start()
+    
+    def reconnect_loop(self):
+        """Cliente: reconecta ao host com backoff exponencial e jitter"""
+        for delay in reconnect_delays(RECONNECT_BASE_DELAY, RECONNECT_MAX_DELAY):
+            if not self.running:
+                return
+            if time.time() + delay > self.reconnect_deadline:
+                break
+            time.sleep(delay)
+            
+            try:
+                sock = self.transport.connect(self.peer_address, GAME_PORT, timeout=5)
+            except OSError:
+                continue
+            
+            self.socket = sock
+            self.peer_socket = sock
+            self.recv_buffer.clear()
+            self.is_connected = True
+            
+            # Informa o token da sessão e a última mensagem recebida
+            self.transmit({
+                'type': 'resume',
+                'session': self.session_token,
+                'last_seq': self.last_received_seq
+            })
+            
+            self.receive_thread = threading.Thread(target=self.receive_messages)
+            self.receive_thread.daemon = True
+            self.receive_thread.start()
+            return
+        
+        self.give_up_reconnect()
+    
+    def give_up_reconnect(self):
+        print("Não foi possível reconectar, retornando ao menu")
+        self.reconnecting = False
+        self.session_token = None
+        if self.running:
+            self.game.game_state = GameState.MENU
+    
+    def resume_relay(self):
+        """Chamado quando o RoomClient retoma a sessão no servidor de salas"""
+        if not self.use_relay or not self.session_token:
+            return
+        self.reconnecting = True
+        self.transmit({
+            'type': 'resume',
+            'session': self.session_token,
+            'last_seq': self.last_received_seq
+        })
+    
+    def handle_resume(self, message):
+        """O outro lado reconectou: confirma e reenvia o que ele perdeu"""
+        if not self.session_token or message.get('session') != self.session_token:
+            print("Tentativa de retomada com sessão inválida")
+            if not self.use_relay and self.peer_socket:
+                try:
+                    self.peer_socket.shutdown(socket.SHUT_RDWR)
+                except:
+                    pass
+            return
+        
+        print("Sessão retomada")
+        self.reconnecting = False
+        self.start_path_monitor()
+        self.transmit({
+            'type': 'resume_ack',
+            'session': self.session_token,
+            'last_seq': self.last_received_seq
+        })
+        self.resend_outbox(message.get('last_seq', 0))
+        self.check_deck_after_resume()
+    
+    def handle_resume_ack(self, message):
+        if message.get('session') != self.session_token:
+            return
+        print("Sessão retomada")
+        self.reconnecting = False
+        self.start_path_monitor()
+        self.resend_outbox(message.get('last_seq', 0))
+        self.check_deck_after_resume()
+    
+    def check_deck_after_resume(self):
+        """
+        No lockstep a retomada só restaura a sequência das mensagens: cada lado
+        envia a rodada e o cursor do seu assento (Table.send_deck_check) e o
+        outro embaralha de novo se eles não baterem
+        """
+        if self.lockstep_active:
+            with self.incoming_lock:
+                self.game.send_deck_check()
+    
+    def listen_for_direct_path(self):
+        """Host no modo relay: aceita conexões diretas em segundo plano"""
+        try:
+            self.socket = self.transport.listen(GAME_PORT)
+        except OSError as e:
+            # Sem porta disponível a partida segue apenas pelo relay
+            print(f"Conexão direta indisponível: {e}")
+            self.socket = None
+            return
+        
+        self.connection_thread = threading.Thread(target=self.accept_direct_loop)
+        self.connection_thread.daemon = True
+        self.connection_thread.start()
+    
+    def accept_direct_loop(self):
+        listen_socket = self.socket
+        while self.running and listen_socket:
+            try:
+                direct_socket, addr = listen_socket.accept()
+            except OSError:
+                break
+            
+            if not self.running:
+                direct_socket.close()
+                break
+            
+            # A conexão fica pendente, sem tocar no caminho direto atual, até
+            # a primeira mensagem mostrar que é do nosso oponente
+            direct_socket.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            validate_thread = threading.Thread(target=self.validate_direct_socket, args=(direct_socket, addr))
+            validate_thread.daemon = True
+            validate_thread.start()
+    
+    def validate_direct_socket(self, direct_socket, addr):
+        """
+        Host: espera a primeira mensagem de uma conexão direta pendente
+        Só se ela abrir o caminho direto (opens_direct_path) a conexão
+        substitui o caminho atual; senão é fechada.
+        """
+        buffer = MessageBuffer()
+        messages = []
+        deadline = time.time() + DIRECT_CONNECT_TIMEOUT
+        direct_socket.settimeout(DIRECT_CONNECT_TIMEOUT)
+        try:
+            while not messages and self.running and time.time() < deadline:
+                data = direct_socket.recv(1024)
+                if not data:
+                    break
+                messages = buffer.feed(data)
+        except (OSError, ProtocolError):
+            pass
+        
+        if not messages or not self.running or not self.opens_direct_path(messages[0]):
+            print(f"Conexão direta de {addr} recusada")
+            direct_socket.close()
+            return
+        
+        self.drop_direct_path()
+        direct_socket.settimeout(5.0)
+        self.peer_socket = direct_socket
+        self.recv_buffer = buffer
+        print(f"Conexão direta recebida de {addr}")
+        for message in messages:
+            self.process_incoming(message)
+        
+        self.receive_thread = threading.Thread(target=self.receive_messages)
+        self.receive_thread.daemon = True
+        self.receive_thread.start()
+    
+    def opens_direct_path(self, message):
+        """
+        Se a mensagem pode chegar por um caminho direto ainda não validado: o
+        direct_hello com o token da sessão, a resposta dele (no cliente) ou o
+        handshake de um cliente da rede local, antes de existir sessão
+        """
+        msg_type = message.get('type')
+        if msg_type == 'direct_hello':
+            return bool(self.session_token) and message.get('session') == self.session_token
+        if msg_type == 'direct_hello_ack':
+            return not self.is_host
+        return msg_type == 'handshake' and self.is_host and not self.session_token
+    
+    def try_direct_path(self):
+        """Cliente no modo relay: tenta conectar diretamente ao host"""
+        if not self.peer_address or not self.session_token:
+            return
+        try:
+            direct_socket = self.transport.connect(self.peer_address, GAME_PORT, timeout=DIRECT_CONNECT_TIMEOUT)
+        except OSError as e:
+            print(f"Conexão direta com o host indisponível, mantendo o relay: {e}")
+            return
+        
+        if not self.running:
+            direct_socket.close()
+            return
+        
+        direct_socket.settimeout(5.0)
+        self.peer_socket = direct_socket
+        self.recv_buffer.clear()
+        self.transmit({'type': 'direct_hello', 'session': self.session_token}, 'direct')
+        
+        self.receive_thread = threading.Thread(target=self.receive_messages)
+        self.receive_thread.daemon = True
+        self.receive_thread.start()
+    
+    def handle_direct_hello(self, message):
+        """Host: valida a conexão direta pelo token da sessão"""
+        if not self.session_token or message.get('session') != self.session_token:
+            print("Conexão direta com sessão inválida")
+            self.drop_direct_path()
+            return
+        print("Caminho direto estabelecido")
+        self.direct_ready = True
+        self.transmit({'type': 'direct_hello_ack'}, 'direct')
+        self.start_path_monitor()
+    
+    def drop_direct_path(self):
+        """Fecha o caminho direto e volta a enviar tudo pelo relay"""
+        was_active = self.active_path == 'direct'
+        self.direct_ready = False
+        self.active_path = 'relay'
+        self.path_stats['direct'].reset()
+        
+        if self.peer_socket:
+            try:
+                self.peer_socket.close()
+            except:
+                pass
+            self.peer_socket = None
+        
+        if was_active:
+            print("Caminho direto perdido, voltando ao relay")
+            # O que foi enviado pelo caminho direto e não confirmado vai de novo
+            self.resend_outbox(0)
+    
+    def start_path_monitor(self):
+        if self.monitor_thread and self.monitor_thread.is_alive():
+            return
+        self.monitor_thread = threading.Thread(target=self.path_monitor_loop)
+        self.monitor_thread.daemon = True
+        self.monitor_thread.start()
+    
+    def path_monitor_loop(self):
+        """Mede periodicamente os caminhos disponíveis e migra para o mais rápido"""
+        while self.running and self.is_connected and self.session_token:
+            for path in self.available_paths():
+                probe_id, t0 = self.path_stats[path].new_probe()
+                self.transmit({'type': 'probe', 'id': probe_id, 't0': t0}, path)
+            time.sleep(PATH_PROBE_INTERVAL)
+            self.select_path()
+    
+    def available_paths(self):
+        if not self.use_relay:
+            return ['direct']
+        if self.direct_ready:
+            return ['relay', 'direct']
+        return ['relay']
+    
+    def get_stats(self):
+        """
+        Estatísticas dos caminhos da partida (RTT, jitter, perda, offset de relógio)
+        Retorna {'active_path': nome, 'paths': {nome: snapshot}}
+        """
+        return {
+            'active_path': self.active_path,
+            'paths': {path: self.path_stats[path].snapshot() for path in self.available_paths()}
+        }
+    
+    def select_path(self):
+        if not self.use_relay or not self.direct_ready:
+            return
+        relay_rtt = self.path_stats['relay'].srtt
+        direct_rtt = self.path_stats['direct'].srtt
+        if relay_rtt is None or direct_rtt is None:
+            return
+        
+        # Caminho com muita perda não é considerado, mesmo com RTT menor
+        if self.path_stats['direct'].loss_rate() > PATH_MAX_LOSS:
+            direct_rtt = float('inf')
+        if self.path_stats['relay'].loss_rate() > PATH_MAX_LOSS:
+            relay_rtt = float('inf')
+        
+        # Histerese para não alternar entre caminhos com latências parecidas
+        if self.active_path == 'relay' and direct_rtt < relay_rtt * PATH_SWITCH_RATIO:
+            print(f"Migrando para o caminho direto ({direct_rtt * 1000:.0f} ms vs {relay_rtt * 1000:.0f} ms)")
+            self.active_path = 'direct'
+        elif self.active_path == 'direct' and relay_rtt < direct_rtt * PATH_SWITCH_RATIO:
+            print(f"Migrando para o relay ({relay_rtt * 1000:.0f} ms vs {direct_rtt * 1000:.0f} ms)")
+            self.active_path = 'relay'
+    
+    def build_handshake(self):
+        """Monta o handshake do cliente, incluindo o commit da semente no modo lockstep"""
+        handshake_msg = {'type': 'handshake', 'client': 'ready', 'name': self.game.player_name}
+        if self.lockstep:
+            self.seed_exchange = SeedExchange(is_host=False, rng=self.nonce_rng)
+            handshake_msg['commit'] = self.seed_exchange.commitment()
+        return handshake_msg
+    
+    def accept_handshake(self, handshake):
+        """Responde ao handshake do cliente (lado do host)"""
+        # Token da sessão, usado pelo cliente para retomar após uma queda
+        self.session_token = uuid.uuid4().hex
+        self.peer_name = handshake.get('name')
+        ack = {'type': 'handshake_ack', 'host': 'ready', 'session': self.session_token, 'name': self.game.player_name}
+        self.start_path_monitor()
+        
+        if self.lockstep and handshake.get('commit'):
+            # O cliente já se comprometeu com o nonce dele, então o host pode
+            # enviar o seu; as cartas só são distribuídas após o reveal
+            self.seed_exchange = SeedExchange(is_host=True, rng=self.nonce_rng)
+            self.seed_exchange.set_peer_commitment(handshake['commit'])
+            ack['nonce'] = self.seed_exchange.local_nonce
+            self.send_message(ack)
+            self.game.game_state = GameState.PLAYING
+            return
+        
+        # Peer sem suporte a lockstep: segue o fluxo antigo
+        self.lockstep_active = False
+        self.send_message(ack)
+        self.game.game_state = GameState.PLAYING
+        self.game.deal_initial_cards()
+    
+    def begin_seed_exchange(self):
+        """Inicia uma nova troca de semente (host, ao reiniciar a partida)"""
+        self.seed_exchange = SeedExchange(is_host=self.is_host, rng=self.nonce_rng)
+        return self.seed_exchange.commitment()
+    
+    def handle_lockstep_message(self, message):
+        """
+        Processa as mensagens da troca de semente
+        Retorna a semente quando a troca termina deste lado, senão None
+        """
+        msg_type = message.get('type')
+        exchange = self.seed_exchange
+        
+        if msg_type == 'handshake_ack':
+            # O ack também traz o token de sessão emitido pelo host
+            self.session_token = message.get('session', self.session_token)
+            self.peer_name = message.get('name', self.peer_name)
+            if self.session_token:
+                self.start_path_monitor()
+            
+            # Com a sessão estabelecida pelo relay, tenta o caminho direto
+            if self.use_relay and not self.is_host and self.session_token:
+                direct_thread = threading.Thread(target=self.try_direct_path)
+                direct_thread.daemon = True
+                direct_thread.start()
+            
+            # Cliente: o host enviou o nonce dele, revelamos o nosso
+            if not message.get('nonce') or not exchange:
+                self.lockstep_active = False
+                return None
+            exchange.set_peer_nonce(message['nonce'])
+            self.send_message({'type': 'seed_reveal', 'nonce': exchange.local_nonce})
+            return self.activate_lockstep()
+        
+        elif msg_type == 'seed_nonce':
+            # Host: o cliente respondeu ao commit do reinício, revelamos o nosso
+            if not exchange or not exchange.set_peer_nonce(message.get('nonce')):
+                return None
+            self.send_message({'type': 'seed_reveal', 'nonce': exchange.local_nonce})
+            return self.activate_lockstep()
+        
+        elif msg_type == 'seed_reveal':
+            # Quem respondeu ao commit confere se o nonce revelado bate com ele
+            if not exchange or not exchange.set_peer_nonce(message.get('nonce')):
+                print("Reveal da semente não confere com o commit, usando modo sem lockstep")
+                self.lockstep_active = False
+                return None
+            return self.activate_lockstep()
+        
+        return None
+    
+    def respond_seed_commit(self, commitment):
+        """Cliente: responde ao commit do host com o próprio nonce"""
+        self.seed_exchange = SeedExchange(is_host=False, rng=self.nonce_rng)
+        self.seed_exchange.set_peer_commitment(commitment)
+        self.send_message({'type': 'seed_nonce', 'nonce': self.seed_exchange.local_nonce})
+    
+    def activate_lockstep(self):
+        self.lockstep_active = True
+        self.send_seq = 0
+        self.recv_seq = 0
+        return self.seed_exchange.seed()
+    
+    def send_intent(self, action, player):
+        """Envia apenas a ação (hit/stand), a sequência e o hash da mão resultante"""
+        self.send_seq += 1
+        return self.send_message({
+            'type': action,
+            'seq': self.send_seq,
+            'h': hand_digest(player.hand)
+        })
+    
+    def accept_intent(self, message):
+        """Confere a sequência de uma ação recebida; ações repetidas são ignoradas"""
+        seq = message.get('seq', 0)
+        if seq <= self.recv_seq:
+            return False
+        if seq != self.recv_seq + 1:
+            print(f"Ação fora de ordem (esperado {self.recv_seq + 1}, recebido {seq})")
+        self.recv_seq = seq
+        return True
     
     def send_game_state(self, player):
         """Envia o estado atual do jogador para o outro jogador"""
@@ -391,7 +1064,7 @@ class NetworkManager:
             return
         
         try:
-            hand_data = [{'value': card.value, 'suit': card.suit} for card in player.hand]
+            hand_data = encode_hand(player.hand)
             message = {
                 'type': 'game_state',
                 'hand': hand_data,
@@ -408,6 +1081,12 @@ class NetworkManager:
         self.running = False
         self.is_connected = False
         self.relay_connected = False
+        self.reconnecting = False
+        self.direct_ready = False
+        
+        if self.relay_socket:
+            self.relay_socket.close()
+            self.relay_socket = None
         
         # Fechar socket do peer (cliente conectado)
         if self.peer_socket and self.peer_socket != self.socket:
@@ -450,7 +1129,7 @@ class NetworkManager:
         elif msg_type == 'game_state':
             # Atualizar estado do jogo do outro jogador
             if 'hand' in message:
-                self.game.remote_player.hand = [Card(card_data['value'], card_data['suit']) for card_data in message['hand']]
+                self.game.remote_player.set_hand(decode_hand(message['hand']))
             if 'status' in message:
                 self.game.remote_player.status = message['status']
         elif msg_type == 'host_left':
@@ -475,7 +1154,7 @@ class NetworkManager:
             if self.is_host:  # Apenas o host processa hits
                 card = self.game.deck.draw()
                 if card:
-                    self.game.remote_player.hand.append(card)
+                    self.game.remote_player.add_card(card)
                     # Enviar estado atualizado
                     self.send_game_state(self.game.remote_player)
         elif msg_type == 'stand':
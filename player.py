@@ -1,29 +1,82 @@
-from card import Deck
+from card import CARD_HARD_VALUE, CARD_IS_ACE, CARD_COMPOSITION
+
+BLACKJACK = 21
 
 class Player:
+    """
+    Jogador e a sua mão, com a pontuação mantida de forma incremental
+    Cada carta atualiza em O(1) o total duro (ases valendo 1), a contagem de
+    ases, a composição (card.CARD_COMPOSITION, chave das tabelas de
+    estratégia), e as marcas de blackjack e estouro; score é o melhor total. Quem
+    substituir hand por inteiro (mão recebida da rede) usa set_hand, ou
+    calculate_score para recalcular a partir da mão atual.
+    """
+    __slots__ = ('name', 'hand', 'score', 'status', 'hard_total', 'aces', 'composition', 'blackjack', 'busted')
+    
     def __init__(self, name):
         self.name = name
         self.hand = []
         self.score = 0
         self.status = "playing"  # can be "playing", "standing", "busted"
+        self.hard_total = 0
+        self.aces = 0
+        self.composition = 0
+        self.blackjack = False
+        self.busted = False
     
     def hit(self, deck):
         card = deck.draw()
         if card:
-            self.hand.append(card)
-            self.calculate_score()
-            if self.score > 21:
+            self.add_card(card)
+            if self.busted:
                 self.status = "busted"
         return card
     
     def stand(self):
         self.status = "standing"
     
+    def add_card(self, card):
+        """Acrescenta uma carta à mão e atualiza os totais sem percorrer a mão"""
+        self.hand.append(card)
+        hard = self.hard_total + CARD_HARD_VALUE[card.index]
+        self.hard_total = hard
+        self.aces += CARD_IS_ACE[card.index]
+        self.composition += CARD_COMPOSITION[card.index]
+        # No máximo um ás conta 11: dois já somariam 22
+        self.score = hard + 10 if self.aces and hard <= BLACKJACK - 10 else hard
+        self.blackjack = self.score == BLACKJACK and len(self.hand) == 2
+        self.busted = hard > BLACKJACK
+    
+    def set_hand(self, cards):
+        """Substitui a mão (estado recebido do outro jogador) e recalcula os totais"""
+        self.hand = list(cards)
+        return self.calculate_score()
+    
     def calculate_score(self):
-        self.score = sum(card.get_numeric_value() for card in self.hand)
-        # Simple Ace handling for this version - if bust with Ace, count some Aces as 1
-        num_aces = sum(1 for card in self.hand if card.value == 'A')
-        while self.score > 21 and num_aces > 0:
-            self.score -= 10  # Count an Ace as 1 instead of 11
-            num_aces -= 1
-        return self.score 
\ No newline at end of file
+        # Recalcula a partir da mão atual, para quem atribuiu hand diretamente
+        hard = 0
+        aces = 0
+        composition = 0
+        for card in self.hand:
+            hard += CARD_HARD_VALUE[card.index]
+            aces += CARD_IS_ACE[card.index]
+            composition += CARD_COMPOSITION[card.index]
+        self.hard_total = hard
+        self.aces = aces
+        self.composition = composition
+        self.score = hard + 10 if aces and hard <= BLACKJACK - 10 else hard
+        self.blackjack = self.score == BLACKJACK and len(self.hand) == 2
+        self.busted = hard > BLACKJACK
+        return self.score
+    
+    def is_soft(self):
+        """A mão tem um ás contando 11"""
+        return self.score != self.hard_total
+    
+    def best_total(self):
+        """Melhor total sem estourar (o total duro, se já estourou)"""
+        return self.score
+    
+    def can_double(self):
+        """Dobrar só é permitido com as duas cartas iniciais, ainda jogando e sem blackjack"""
+        return self.status == "playing" and len(self.hand) == 2 and not self.blackjack
@@ -0,0 +1,183 @@
+import json
+import random
+import threading
+import itertools
+from collections import deque
+
+# Canais lógicos da conexão com o servidor de salas, em ordem de prioridade:
+# quadros do relay passam na frente de respostas grandes do lobby
+CHANNEL_PRIORITY = ('relay', 'lobby', 'chat', 'telemetry')
+
+# Canal de cada comando quando a mensagem não informa o campo 'ch'
+COMMAND_CHANNELS = {
+    'relay_message': 'relay',
+    'relay_received': 'relay',
+    'relay_sent': 'relay',
+    'relay_failed': 'relay',
+    'chat_message': 'chat',
+    'chat_received': 'chat',
+    'ping': 'telemetry',
+    'pong': 'telemetry',
+    'report_hand': 'telemetry'
+}
+
+# Mensagens maiores que isso são divididas em fragmentos, para que quadros de
+# canais mais prioritários possam ser enviados entre um fragmento e outro
+FRAGMENT_SIZE = 1024
+
+# Limites da recepção: tamanho de uma linha, de uma mensagem remontada a
+# partir dos fragmentos e quantas mensagens fragmentadas podem estar abertas
+# ao mesmo tempo. Quem passa deles tem a conexão encerrada (ProtocolError)
+MAX_LINE_SIZE = 64 * 1024
+MAX_MESSAGE_SIZE = 4 * 1024 * 1024
+MAX_OPEN_FRAGMENTS = 16
+
+class ProtocolError(ValueError):
+    """O outro lado passou de um limite do MessageBuffer; a conexão deve ser encerrada"""
+
+def channel_of(message):
+    return message.get('ch') or COMMAND_CHANNELS.get(message.get('command'), 'lobby')
+
+class MessageBuffer:
+    """
+    Buffer de recepção para mensagens JSON delimitadas por quebra de linha
+    Acumula os bytes recebidos e devolve apenas as mensagens completas, então
+    várias mensagens num mesmo recv (ou uma mensagem dividida em vários) são
+    tratadas corretamente. feed levanta ProtocolError quando um dos limites
+    (MAX_LINE_SIZE, MAX_MESSAGE_SIZE, MAX_OPEN_FRAGMENTS) é ultrapassado.
+    """
+    def __init__(self):
+        self.buffer = b""
+        self.fragments = {}  # {(canal, id): [partes, tamanho]}
+    
+    def feed(self, data):
+        """Adiciona bytes recebidos e retorna a lista de mensagens completas"""
+        self.buffer += data
+        messages = []
+        while b"\n" in self.buffer:
+            line, self.buffer = self.buffer.split(b"\n", 1)
+            if len(line) > MAX_LINE_SIZE:
+                raise ProtocolError(f"Linha de {len(line)} bytes, acima do limite")
+            if not line.strip():
+                continue
+            try:
+                message = json.loads(line.decode('utf-8'))
+                if not isinstance(message, dict):
+                    print("Mensagem inválida descartada: não é um objeto JSON")
+                    continue
+                if 'frag' in message:
+                    message = self.reassemble(message)
+                if message is not None:
+                    messages.append(message)
+            except (UnicodeDecodeError, json.JSONDecodeError) as e:
+                print(f"Mensagem inválida descartada: {e}")
+        if len(self.buffer) > MAX_LINE_SIZE:
+            raise ProtocolError(f"Linha de mais de {MAX_LINE_SIZE} bytes sem terminar")
+        return messages
+    
+    def reassemble(self, fragment):
+        """Junta os fragmentos de uma mensagem grande; retorna a mensagem quando completa"""
+        channel, fragment_id, part = fragment.get('ch'), fragment['frag'], fragment.get('part', '')
+        if not isinstance(channel, (str, type(None))) or not isinstance(fragment_id, int) or not isinstance(part, str):
+            raise ProtocolError("Fragmento malformado")
+        key = (channel, fragment_id)
+        if key not in self.fragments:
+            if len(self.fragments) >= MAX_OPEN_FRAGMENTS:
+                raise ProtocolError(f"Mais de {MAX_OPEN_FRAGMENTS} mensagens fragmentadas abertas")
+            self.fragments[key] = [[], 0]
+        entry = self.fragments[key]
+        entry[0].append(part)
+        entry[1] += len(part)
+        if entry[1] > MAX_MESSAGE_SIZE:
+            raise ProtocolError(f"Mensagem fragmentada acima de {MAX_MESSAGE_SIZE} bytes")
+        if not fragment.get('end'):
+            return None
+        del self.fragments[key]
+        return json.loads(''.join(entry[0]))
+    
+    def clear(self):
+        self.buffer = b""
+        self.fragments.clear()
+
+class FrameWriter:
+    """
+    Envio multiplexado por canais sobre um único socket
+    Cada canal tem a sua fila (a ordem é mantida dentro do canal) e o próximo
+    quadro enviado é sempre o do canal mais prioritário com algo pendente.
+    Não há thread própria: quem enfileira tenta assumir a escrita e esvazia
+    as filas; se outra thread já está escrevendo, ela envia os novos quadros
+    na ordem de prioridade. Isso também impede que dois sendall simultâneos
+    misturem os bytes de mensagens diferentes.
+    """
+    def __init__(self, sock):
+        self.socket = sock
+        self.queues = {channel: deque() for channel in CHANNEL_PRIORITY}
+        self.queue_lock = threading.Lock()
+        self.write_lock = threading.Lock()
+        self.fragment_ids = itertools.count(1)
+    
+    def send(self, message, channel=None):
+        """Enfileira a mensagem no canal e envia o que for possível"""
+        channel = channel or channel_of(message)
+        frames = self.frames(dict(message, ch=channel), channel)
+        with self.queue_lock:
+            self.queues[channel].extend(frames)
+        self.flush()
+    
+    def frames(self, message, channel):
+        text = json.dumps(message, separators=(',', ':'))
+        if len(text) <= FRAGMENT_SIZE:
+            return [(text + "\n").encode('utf-8')]
+        
+        fragment_id = next(self.fragment_ids)
+        parts = [text[i:i + FRAGMENT_SIZE] for i in range(0, len(text), FRAGMENT_SIZE)]
+        return [
+            encode_message({'ch': channel, 'frag': fragment_id, 'part': part, 'end': i == len(parts) - 1})
+            for i, part in enumerate(parts)
+        ]
+    
+    def next_frame(self):
+        with self.queue_lock:
+            for channel in CHANNEL_PRIORITY:
+                if self.queues[channel]:
+                    return self.queues[channel].popleft()
+        return None
+    
+    def has_pending(self):
+        with self.queue_lock:
+            return any(self.queues.values())
+    
+    def flush(self):
+        while self.write_lock.acquire(blocking=False):
+            try:
+                frame = self.next_frame()
+                while frame is not None:
+                    self.socket.sendall(frame)
+                    frame = self.next_frame()
+            except OSError:
+                # A conexão caiu: descarta o que estava na fila
+                with self.queue_lock:
+                    for queue in self.queues.values():
+                        queue.clear()
+                raise
+            finally:
+                self.write_lock.release()
+            
+            # Quadros enfileirados enquanto liberávamos a escrita
+            if not self.has_pending():
+                return
+
+def encode_message(message):
+    """Serializa uma mensagem para envio (JSON + quebra de linha)"""
+    return (json.dumps(message, separators=(',', ':')) + "\n").encode('utf-8')
+
+def reconnect_delays(base_delay, max_delay):
+    """
+    Gera os intervalos de espera entre tentativas de reconexão
+    Backoff exponencial com jitter completo, para que vários clientes que
+    caíram juntos não tentem reconectar todos no mesmo instante.
+    """
+    attempt = 0
+    while True:
+        yield random.uniform(0, min(max_delay, base_delay * (2 ** attempt)))
+        attempt += 1
@@ -0,0 +1,136 @@
+"""
+Gravação das partidas em formato binário compacto, só de acréscimo
+
+Uma gravação guarda o que é preciso para reproduzir uma mesa: a semente da
+mesa (sapato e nonces do lockstep), o papel (host/cliente, relay) e, em
+ordem, cada mensagem recebida e cada ação do jogador local, com o tempo
+desde o evento anterior. replay.py joga a gravação de novo pelo mesmo
+caminho (NetworkManager e Table.handle_message).
+
+Formato (little-endian):
+    cabeçalho  MAGIC, versão (B), semente (Q), host, relay, lockstep (???),
+               início em segundos desde a época (d), tamanho da sala (H) e a sala
+    registro   tipo (B), microssegundos desde o registro anterior (I),
+               tamanho (I) e a mensagem em JSON (vazio nas ações)
+Um registro incompleto no fim (processo encerrado no meio da escrita) é
+ignorado na leitura.
+"""
+import json
+import os
+import struct
+import threading
+import time
+
+MAGIC = b'BJRC'
+VERSION = 1
+HEADER = struct.Struct('<4sBQ???dH')
+RECORD = struct.Struct('<BII')
+MAX_DELTA = 0xFFFFFFFF
+
+# Tipos de registro
+DIRECT_MESSAGE = 1  # NetworkManager.process_incoming
+RELAY_MESSAGE = 2  # NetworkManager.handle_relay_message
+HIT = 3
+STAND = 4
+RESTART = 5
+
+EVENT_NAMES = {
+    DIRECT_MESSAGE: 'direct',
+    RELAY_MESSAGE: 'relay',
+    HIT: 'hit',
+    STAND: 'stand',
+    RESTART: 'restart'
+}
+ACTIONS = {'hit': HIT, 'stand': STAND, 'restart': RESTART}
+
+class RecordingHeader:
+    def __init__(self, seed, is_host, use_relay, lockstep, room_id, started=None):
+        self.seed = seed
+        self.is_host = is_host
+        self.use_relay = use_relay
+        self.lockstep = lockstep
+        self.room_id = room_id
+        self.started = time.time() if started is None else started
+    
+    def pack(self):
+        room = self.room_id.encode('utf-8')
+        return HEADER.pack(MAGIC, VERSION, self.seed, self.is_host, self.use_relay,
+                           self.lockstep, self.started, len(room)) + room
+
+class MatchRecorder:
+    """
+    Grava os eventos de uma mesa; as mensagens chegam pela thread de
+    recebimento e as ações pela do jogo, então a escrita é protegida por lock
+    Cada registro é escrito e enviado ao arquivo na hora (uma partida gera
+    poucos eventos por segundo), para a gravação sobreviver a um encerramento
+    abrupto.
+    """
+    def __init__(self, path, header):
+        self.path = path
+        self.header = header
+        self.lock = threading.Lock()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.file = open(path, 'ab')
+        self.file.write(header.pack())
+        self.file.flush()
+        self.last_event = time.perf_counter()
+        self.events = 0
+    
+    def record(self, kind, payload=b''):
+        with self.lock:
+            if self.file is None:
+                return
+            now = time.perf_counter()
+            delta = min(int((now - self.last_event) * 1e6), MAX_DELTA)
+            self.last_event = now
+            self.file.write(RECORD.pack(kind, delta, len(payload)) + payload)
+            self.file.flush()
+            self.events += 1
+    
+    def message(self, message, relay=False):
+        """Mensagem recebida, antes de qualquer tratamento"""
+        payload = json.dumps(message, separators=(',', ':')).encode('utf-8')
+        self.record(RELAY_MESSAGE if relay else DIRECT_MESSAGE, payload)
+    
+    def action(self, name):
+        """Ação do jogador local: 'hit', 'stand' ou 'restart'"""
+        self.record(ACTIONS[name])
+    
+    def close(self):
+        with self.lock:
+            if self.file is not None:
+                self.file.close()
+                self.file = None
+
+def recording_path(directory, header):
+    stamp = time.strftime('%Y%m%d-%H%M%S', time.localtime(header.started))
+    return os.path.join(directory, f"{stamp}-{header.seed:016x}.bjr")
+
+def read_recording(path):
+    """
+    Lê uma gravação e retorna (RecordingHeader, [(tipo, segundos desde o anterior, mensagem ou None)])
+    Gera ValueError se o arquivo não for uma gravação desta versão.
+    """
+    with open(path, 'rb') as file:
+        data = file.read()
+    if len(data) < HEADER.size:
+        raise ValueError("Arquivo curto demais para uma gravação")
+    magic, version, seed, is_host, use_relay, lockstep, started, room_size = HEADER.unpack_from(data)
+    if magic != MAGIC or version != VERSION:
+        raise ValueError("Arquivo não é uma gravação de partida desta versão")
+    offset = HEADER.size + room_size
+    header = RecordingHeader(seed, is_host, use_relay, lockstep,
+                             data[HEADER.size:offset].decode('utf-8'), started)
+    
+    events = []
+    while offset + RECORD.size <= len(data):
+        kind, delta, size = RECORD.unpack_from(data, offset)
+        start = offset + RECORD.size
+        if start + size > len(data):
+            break
+        message = json.loads(data[start:start + size]) if size else None
+        events.append((kind, delta / 1e6, message))
+        offset = start + size
+    return header, events
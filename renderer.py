@@ -1,7 +1,7 @@
 import pygame
 import socket
 from constants import *
-from cards import SpriteSheet
+from cards import get_sprite_sheet
 
 class GameRenderer:
     def __init__(self, screen, font, small_font):
@@ -23,11 +23,15 @@ class GameRenderer:
         self.title_font = pygame.font.Font("assets/font-jersey.ttf", 40)
         
         # Carrega o sprite sheet das cartas
-        self.card_sprites = SpriteSheet("assets/cards.png")
+        self.card_sprites = get_sprite_sheet()
         
         # Escala para as cartas (ajustar conforme necessário)
         self.card_scale = 0.5  # 50% do tamanho original
         
+        # Sprites já redimensionadas, por índice da carta ('back' para o verso),
+        # para não redimensionar a cada quadro
+        self.scaled_sprites = {}
+        
         # Botões maiores para gameplay
         button_width = 180
         button_height = 60
@@ -46,18 +50,35 @@ class GameRenderer:
             button_width,
             button_height
         )
+        
+        # Dica de estratégia (H ou botão): o texto só é renderizado de novo quando a dica muda
+        self.hint_button = pygame.Rect(SCREEN_WIDTH - 150, button_y + 10, 120, 40)
+        self.show_hint = False
+        self.hint = None
+        self.hint_surface = None
+        
+        # Fichas do jogador no canto oposto ao da dica, renderizadas de novo só quando mudam
+        self.bank = None
+        self.bank_surface = None
+        
+        # HUD de rede (F3): as linhas só são renderizadas de novo quando o texto muda
+        self.show_network_hud = False
+        self.hud_lines = []
+        self.hud_surfaces = []
+        
+        # Miniaturas das outras mesas (multi-mesa): superfícies em cache por
+        # mesa, renderizadas de novo apenas quando o resumo da mesa muda
+        self.thumbnail_cache = {}  # {room_id: (resumo, superfície)}
+        self.thumbnail_rects = {}  # {room_id: Rect}, para os cliques
+        self.hidden_tables_text = None
+        self.hidden_tables_surface = None
     
     def draw_card(self, card, position):
-        # Obtém a sprite da carta correspondente
-        sprite = self.card_sprites.get_sprite(card.suit, card.value)
+        # Obtém a sprite da carta correspondente (referência do registro de cartas)
+        sprite = card.sprite
         
         if sprite:
-            # Calcula o novo tamanho da carta
-            scaled_width = int(self.card_sprites.card_width * self.card_scale)
-            scaled_height = int(self.card_sprites.card_height * self.card_scale)
-            
-            # Redimensiona a sprite
-            scaled_sprite = pygame.transform.scale(sprite, (scaled_width, scaled_height))
+            scaled_sprite = self.get_scaled_sprite(card.index, sprite)
             
             # Desenha a carta
             self.screen.blit(scaled_sprite, position)
@@ -74,6 +95,16 @@ class GameRenderer:
             self.screen.blit(card_text, (position[0] + 10, position[1] + 10))
             self.screen.blit(suit_text, (position[0] + 10, position[1] + 40))
     
+    def get_scaled_sprite(self, key, sprite):
+        """Sprite redimensionada para a escala das cartas, calculada uma vez por carta"""
+        scaled_sprite = self.scaled_sprites.get(key)
+        if scaled_sprite is None:
+            scaled_width = int(self.card_sprites.card_width * self.card_scale)
+            scaled_height = int(self.card_sprites.card_height * self.card_scale)
+            scaled_sprite = pygame.transform.scale(sprite, (scaled_width, scaled_height))
+            self.scaled_sprites[key] = scaled_sprite
+        return scaled_sprite
+    
     def draw_hand(self, player, is_local):
         # Posicionamento vertical melhorado com maior distanciamento
         y_pos = SCREEN_HEIGHT - 280 if is_local else 80
@@ -120,12 +151,7 @@ class GameRenderer:
                 back_sprite = self.card_sprites.get_back_sprite()
                 
                 if back_sprite:
-                    # Calcula o novo tamanho da carta
-                    scaled_width = int(self.card_sprites.card_width * self.card_scale)
-                    scaled_height = int(self.card_sprites.card_height * self.card_scale)
-                    
-                    # Redimensiona a sprite
-                    scaled_sprite = pygame.transform.scale(back_sprite, (scaled_width, scaled_height))
+                    scaled_sprite = self.get_scaled_sprite('back', back_sprite)
                     
                     # Desenha o verso da carta
                     self.screen.blit(scaled_sprite, (50 + i * card_spacing, y_pos))
@@ -152,6 +178,11 @@ class GameRenderer:
             stand_text = self.custom_font.render("Parar", True, BLACK)
             stand_text_rect = stand_text.get_rect(center=self.stand_button.center)
             self.screen.blit(stand_text, stand_text_rect)
+            
+            pygame.draw.rect(self.screen, GOLD if self.show_hint else GRAY, self.hint_button, border_radius=8)
+            pygame.draw.rect(self.screen, BLACK, self.hint_button, 3, border_radius=10)
+            hint_text = self.small_custom_font.render("Dica (H)", True, BLACK)
+            self.screen.blit(hint_text, hint_text.get_rect(center=self.hint_button.center))
     
     def draw_waiting_screen(self, menu):
         # Usa a imagem de fundo em vez de preenchimento sólido
@@ -257,7 +288,63 @@ class GameRenderer:
         self.game_state = "PLAYING"
         self.game_over = False
     
-    def draw_game(self, local_player, remote_player):
+    def toggle_network_hud(self):
+        self.show_network_hud = not self.show_network_hud
+    
+    def toggle_hint(self):
+        self.show_hint = not self.show_hint
+    
+    def draw_hint(self, hint):
+        """Desenha a dica (ação, ev_parar, ev_pedir) acima dos botões"""
+        if hint != self.hint:
+            self.hint = hint
+            action, stand_ev, hit_ev = hint
+            text = f"Dica: {'pedir carta' if action == 'hit' else 'parar'}  (EV pedir {hit_ev:+.2f} / parar {stand_ev:+.2f})"
+            self.hint_surface = self.small_custom_font.render(text, True, GOLD)
+        self.screen.blit(self.hint_surface, self.hint_surface.get_rect(center=(SCREEN_WIDTH // 2, self.hit_button.y - 20)))
+    
+    def draw_bank(self, bank):
+        """Desenha o saldo e a aposta da mão (saldo, aposta) ao lado dos botões"""
+        if bank != self.bank:
+            self.bank = bank
+            balance, stake = bank
+            self.bank_surface = self.small_custom_font.render(f"Fichas: {balance}  Aposta: {stake}", True, GOLD)
+        self.screen.blit(self.bank_surface, self.bank_surface.get_rect(midleft=(30, self.hint_button.centery)))
+    
+    def format_link_stats(self, label, stats):
+        """Formata as estatísticas de um caminho numa linha do HUD"""
+        if not stats or stats['rtt_ms'] is None:
+            return f"{label}: sem medições"
+        line = f"{label}: {stats['rtt_ms']:.0f}ms ±{stats['jitter_ms']:.0f}  perda {stats['loss'] * 100:.0f}%"
+        if stats['offset_ms'] is not None:
+            line += f"  offset {stats['offset_ms']:+.0f}ms"
+        return line
+    
+    def draw_network_hud(self, network_stats):
+        """Desenha RTT, jitter, perda e offset de relógio de cada caminho no canto da tela"""
+        lines = [f"Rede ({network_stats.get('active_path') or '-'})"]
+        for name, stats in network_stats.get('paths', {}).items():
+            marker = "*" if name == network_stats.get('active_path') else " "
+            lines.append(marker + self.format_link_stats(name, stats))
+        if network_stats.get('server'):
+            lines.append(" " + self.format_link_stats("servidor", network_stats['server']))
+        
+        if lines != self.hud_lines:
+            self.hud_lines = lines
+            self.hud_surfaces = [self.small_font.render(line, True, WHITE) for line in lines]
+        
+        width = max(surface.get_width() for surface in self.hud_surfaces) + 20
+        height = sum(surface.get_height() for surface in self.hud_surfaces) + 20
+        panel = pygame.Surface((width, height), pygame.SRCALPHA)
+        panel.fill((0, 0, 0, 160))
+        self.screen.blit(panel, (10, 10))
+        
+        y = 20
+        for surface in self.hud_surfaces:
+            self.screen.blit(surface, (20, y))
+            y += surface.get_height()
+    
+    def draw_game(self, local_player, remote_player, network_stats=None, hint=None, bank=None):
         # Usa a imagem de fundo em vez de preenchimento sólido
         self.screen.blit(self.background_image, (0, 0))
         
@@ -269,4 +356,74 @@ class GameRenderer:
         
         self.draw_hand(local_player, True)
         self.draw_hand(remote_player, False)
-        self.draw_buttons(local_player.status) 
\ No newline at end of file
+        self.draw_buttons(local_player.status)
+        
+        if hint:
+            self.draw_hint(hint)
+        
+        if bank:
+            self.draw_bank(bank)
+        
+        if self.show_network_hud and network_stats:
+            self.draw_network_hud(network_stats) 
+    
+    def render_thumbnail(self, summary):
+        """Renderiza a miniatura de uma mesa a partir do seu resumo (Table.summary)"""
+        name, state, score, status, opponent_cards, opponent_status = summary
+        width, height = THUMBNAIL_SIZE
+        surface = pygame.Surface((width, height), pygame.SRCALPHA)
+        surface.fill((0, 0, 0, 160))
+        
+        # Borda dourada quando a mesa espera uma ação nossa
+        needs_action = state == "PLAYING" and status == "playing"
+        pygame.draw.rect(surface, GOLD if needs_action else GRAY, surface.get_rect(), 2, border_radius=8)
+        
+        state_map = {"WAITING": "Aguardando", "PLAYING": "Jogando", "GAME_OVER": "Fim de jogo"}
+        status_map = {"playing": "jogando", "standing": "parou", "busted": "estourou"}
+        lines = [
+            f"{str(name)[:18]} - {state_map.get(state, state)}",
+            f"Você: {score} ({status_map.get(status, status)})",
+            f"Oponente: {opponent_cards} cartas ({status_map.get(opponent_status, opponent_status)})"
+        ]
+        y = 4
+        for line in lines:
+            text = self.small_custom_font.render(line, True, WHITE)
+            surface.blit(text, (8, y))
+            y += text.get_height()
+        return surface
+    
+    def draw_table_thumbnails(self, tables, active_id):
+        """
+        Desenha as outras mesas abertas como miniaturas no canto direito da tela
+        Cada miniatura vem do cache enquanto o resumo da mesa não muda, e no
+        máximo MAX_TABLE_THUMBNAILS são desenhadas (as demais viram um
+        contador), então o custo por quadro não cresce com o número de mesas.
+        """
+        self.thumbnail_rects = {}
+        width, height = THUMBNAIL_SIZE
+        x, y = SCREEN_WIDTH - width - 10, 10
+        
+        others = [table for table in tables if table.room_id != active_id]
+        for table in others[:MAX_TABLE_THUMBNAILS]:
+            summary = table.summary()
+            cached = self.thumbnail_cache.get(table.room_id)
+            if cached is None or cached[0] != summary:
+                cached = (summary, self.render_thumbnail(summary))
+                self.thumbnail_cache[table.room_id] = cached
+            self.screen.blit(cached[1], (x, y))
+            self.thumbnail_rects[table.room_id] = pygame.Rect(x, y, width, height)
+            y += height + 6
+        
+        hidden = len(others) - MAX_TABLE_THUMBNAILS
+        if hidden > 0:
+            text = f"+{hidden} mesas (TAB)"
+            if text != self.hidden_tables_text:
+                self.hidden_tables_text = text
+                self.hidden_tables_surface = self.small_custom_font.render(text, True, WHITE)
+            self.screen.blit(self.hidden_tables_surface, (x, y))
+        
+        # Mesas fechadas saem do cache
+        if len(self.thumbnail_cache) > len(others):
+            open_ids = {table.room_id for table in others}
+            for room_id in [room_id for room_id in self.thumbnail_cache if room_id not in open_ids]:
+                del self.thumbnail_cache[room_id]
@@ -0,0 +1,179 @@
+#!/usr/bin/env python3
+"""
+Reprodução de partidas gravadas (recorder.py), sem interface nem rede
+
+Monta uma mesa com a semente e o papel da gravação e entrega os eventos na
+ordem: as mensagens passam pelo NetworkManager (sequência, troca de
+semente, relay) até o Table.handle_message e as ações do jogador chamam
+hit/stand/restart_game, como os cliques. As mensagens enviadas vão para um
+coletor em memória. Por padrão roda na velocidade máxima, para medir o
+fluxo do jogo e depurar; --realtime respeita os tempos gravados.
+
+Uso: python replay.py gravacao.bjr [--repeat 5] [--realtime] [--trace]
+"""
+import argparse
+import contextlib
+import io
+import time
+from constants import GameState
+from headless import HeadlessApp, LinkedNetwork
+from protocol import encode_message
+from recorder import DIRECT_MESSAGE, RELAY_MESSAGE, HIT, STAND, RESTART, EVENT_NAMES, read_recording
+from table import Table
+
+class ReplaySink:
+    """Destino das mensagens enviadas pela mesa reproduzida"""
+    def __init__(self):
+        self.messages = 0
+        self.bytes = 0
+    
+    def sendall(self, data, ordered=False):
+        self.messages += 1
+        self.bytes += len(data)
+    
+    def shutdown(self, how=None):
+        pass
+    
+    def close(self):
+        pass
+
+class OfflineRoomClient:
+    """Servidor de salas da reprodução: os pedidos de lista e saída não vão a lugar nenhum"""
+    connected = False
+    
+    def list_rooms(self):
+        pass
+    
+    def leave_room(self, room_id):
+        pass
+    
+    def seat(self, room_id):
+        return None
+
+class ReplayApp(HeadlessApp):
+    def __init__(self):
+        super().__init__()
+        self.room_client = OfflineRoomClient()
+
+class ReplayNetwork(LinkedNetwork):
+    """NetworkManager da reprodução: relay e caminho direto viram o mesmo coletor"""
+    def send_via_relay(self, message):
+        self.peer_socket.sendall(encode_message(message))
+        return True
+    
+    def try_direct_path(self):
+        pass
+    
+    def listen_for_direct_path(self):
+        pass
+
+class ReplayResult:
+    def __init__(self, header):
+        self.header = header
+        self.table = None
+        self.events = 0
+        self.kinds = {kind: 0 for kind in EVENT_NAMES}
+        self.outcomes = []  # Resultado de cada rodada terminada, na ordem
+        self.sent = 0
+        self.errors = []
+        self.elapsed = 0.0
+    
+    def report(self):
+        header = self.header
+        role = "host" if header.is_host else "cliente"
+        path = "relay" if header.use_relay else "direto"
+        lines = [f"mesa {header.room_id or '-'} ({role}, {path}, lockstep {'sim' if header.lockstep else 'não'}), semente {header.seed:016x}"]
+        lines.append(f"{self.events} eventos em {self.elapsed * 1000:.2f} ms ({self.events / self.elapsed if self.elapsed else 0:,.0f} eventos/s)")
+        lines.append("  ".join(f"{EVENT_NAMES[kind]} {count}" for kind, count in self.kinds.items()))
+        lines.append(f"mensagens enviadas {self.sent}")
+        lines.append(f"rodadas {len(self.outcomes)}: {' '.join(self.outcomes)}")
+        for error in self.errors:
+            lines.append(f"erro: {error}")
+        return "\n".join(lines)
+
+def open_replay_table(header):
+    """Mesa no estado em que Table.initialize a deixa, ligada ao coletor"""
+    table = Table(ReplayApp(), header.room_id, seed=header.seed)
+    network = ReplayNetwork(table)
+    table.network = network
+    network.lockstep = header.lockstep
+    network.connect(header.is_host, ReplaySink(), table.nonce_rng(header.is_host))
+    network.room_id = header.room_id
+    network.use_relay = header.use_relay
+    network.active_path = 'relay' if header.use_relay else 'direct'
+    
+    table.engine.new_round()
+    if not header.is_host:
+        network.send_message(network.build_handshake())
+    table.game_state = GameState.WAITING if header.is_host else GameState.PLAYING
+    return table
+
+def replay(header, events, realtime=False, trace=False):
+    """Reproduz os eventos lidos por recorder.read_recording e retorna o ReplayResult"""
+    result = ReplayResult(header)
+    table = result.table = open_replay_table(header)
+    network = table.network
+    game_over = False
+    start = time.perf_counter()
+    
+    for number, (kind, delay, message) in enumerate(events):
+        if realtime and delay:
+            time.sleep(delay)
+        try:
+            if kind == DIRECT_MESSAGE:
+                network.process_incoming(message)
+            elif kind == RELAY_MESSAGE:
+                network.handle_relay_message(message)
+            elif kind == HIT:
+                table.hit()
+            elif kind == STAND:
+                table.stand()
+            elif kind == RESTART:
+                table.restart_game()
+        except Exception as e:
+            result.errors.append(f"evento {number} ({EVENT_NAMES.get(kind, kind)}): {e}")
+        
+        result.kinds[kind] = result.kinds.get(kind, 0) + 1
+        over = table.game_state == GameState.GAME_OVER
+        if over and not game_over:
+            result.outcomes.append(table.result())
+        game_over = over
+        
+        if trace:
+            label = message.get('type') if message else EVENT_NAMES.get(kind, kind)
+            print(f"{number:>5} +{delay * 1000:8.1f} ms  {EVENT_NAMES.get(kind, kind):<7} {label:<16} "
+                  f"{table.game_state.name:<10} você {table.local_player.score:>2}  oponente {table.remote_player.score:>2}")
+    
+    result.elapsed = time.perf_counter() - start
+    result.events = len(events)
+    result.sent = network.peer_socket.messages if network.peer_socket else 0
+    return result
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('recording')
+    parser.add_argument('--repeat', type=int, default=1, help="reproduções (vale o melhor tempo)")
+    parser.add_argument('--realtime', action='store_true', help="respeita os intervalos gravados")
+    parser.add_argument('--trace', action='store_true', help="mostra o estado da mesa a cada evento")
+    args = parser.parse_args()
+    
+    try:
+        header, events = read_recording(args.recording)
+    except (OSError, ValueError) as e:
+        print(f"Erro: {e}")
+        return
+    
+    best = None
+    for _ in range(max(1, args.repeat)):
+        if args.trace:
+            result = replay(header, events, args.realtime, trace=True)
+        else:
+            # As mensagens de conexão do NetworkManager não interessam na reprodução
+            with contextlib.redirect_stdout(io.StringIO()):
+                result = replay(header, events, args.realtime)
+        if best is None or result.elapsed < best.elapsed:
+            best = result
+    print(best.report())
+
+if __name__ == "__main__":
+    main()
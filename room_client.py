@@ -1,46 +1,102 @@
+import secrets
 import socket
-import json
 import threading
 import time
+import heapq
+import itertools
+from concurrent.futures import Future
+from constants import RECONNECT_GRACE_PERIOD, RECONNECT_BASE_DELAY, RECONNECT_MAX_DELAY, SERVER_HEARTBEAT_INTERVAL, ROOM_REQUEST_TIMEOUT, PLAYER_KEY_PATH
+from protocol import MessageBuffer, FrameWriter, channel_of, reconnect_delays
+from net_stats import LinkStats
+from transport import TcpTransport
+
+def load_player_key(path=PLAYER_KEY_PATH):
+    """
+    Chave que prova ao servidor de salas que o nome do jogador é nosso
+    Criada na primeira vez e guardada em path; se o arquivo não puder ser
+    gravado, vale só para esta sessão.
+    """
+    try:
+        with open(path) as file:
+            key = file.read().strip()
+        if key:
+            return key
+    except OSError:
+        pass
+    key = secrets.token_hex(16)
+    try:
+        with open(path, 'w') as file:
+            file.write(key)
+    except OSError as e:
+        print(f"Não foi possível guardar a chave do jogador: {e}")
+    return key
 
 class RoomClient:
-    def __init__(self, server_host='localhost', server_port=5001):
+    def __init__(self, server_host='localhost', server_port=5001, transport=None):
         self.server_host = server_host
         self.server_port = server_port
+        self.transport = transport or TcpTransport()
         self.socket = None
         self.connected = False
-        self.room_id = None
-        self.ping_thread = None
-        self.is_host = False
         self.running = False
         self.callback = None
         self.use_relay = True  # Por padrão, usar relay
         
+        # Identidade enviada ao sentar: o servidor associa o nome à chave na
+        # primeira vez e só aceita o nome de novo com a mesma chave
+        self.player_name = None
+        self.player_key = None
+        
+        # Cadeiras ocupadas por esta conexão, uma por sala (multi-mesa), com o
+        # token emitido pelo servidor para retomar a sessão
+        self.seats = {}  # {room_id: {'session_token': token, 'is_host': bool}}
+        self.reconnect_thread = None
+        
+        # Porta do relay UDP informada pelo servidor (None se ele não tiver)
+        self.udp_port = None
+        
+        # Latência até o servidor de salas, medida pelos pings de heartbeat
+        self.server_stats = LinkStats('server')
+        self.last_sent = 0
+        
+        # Requisições aguardando resposta do servidor, correlacionadas pelo req_id
+        self.request_ids = itertools.count(1)
+        self.pending_requests = {}  # {req_id: Future}
+        self.request_deadlines = []  # heap [(prazo, req_id)]
+        self.request_condition = threading.Condition()
+        self.timeout_thread = None
+        
     def connect(self):
         """Conecta ao servidor de salas"""
         try:
-            self.socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-            self.socket.connect((self.server_host, self.server_port))
-            self.connected = True
-            self.running = True
-            
-            # Iniciar thread para receber mensagens
-            self.receive_thread = threading.Thread(target=self.receive_messages)
-            self.receive_thread.daemon = True
-            self.receive_thread.start()
-            
+            self.open_connection()
             return True
         except Exception as e:
             print(f"Erro ao conectar ao servidor de salas: {e}")
             self.connected = False
             return False
     
+    def open_connection(self):
+        """Abre o socket e inicia a thread de recebimento"""
+        self.socket = self.transport.connect(self.server_host, self.server_port)
+        self.writer = FrameWriter(self.socket)
+        
+        # O recv acorda periodicamente para enviar o heartbeat se a conexão estiver ociosa
+        self.socket.settimeout(SERVER_HEARTBEAT_INTERVAL)
+        self.connected = True
+        self.running = True
+        
+        # Iniciar thread para receber mensagens
+        self.receive_thread = threading.Thread(target=self.receive_messages)
+        self.receive_thread.daemon = True
+        self.receive_thread.start()
+    
     def disconnect(self):
         """Desconecta do servidor de salas"""
-        self.running = False
+        for room_id in list(self.seats):
+            self.leave_room(room_id)
         
-        if self.is_host and self.room_id:
-            self.delete_room(self.room_id)
+        self.running = False
         
         if self.socket:
             try:
@@ -49,8 +105,8 @@ class RoomClient:
                 pass
         
         self.connected = False
-        self.room_id = None
-        self.is_host = False
+        self.fail_pending_requests(ConnectionError("Desconectado do servidor de salas"))
+        self.seats.clear()
     
     def set_callback(self, callback):
         """Define uma função de callback para processar mensagens recebidas"""
@@ -58,49 +114,22 @@ class RoomClient:
     
     def receive_messages(self):
         """Recebe mensagens do servidor de salas"""
-        buffer = ""
+        buffer = MessageBuffer()
         
         while self.running and self.connected:
             try:
-                data = self.socket.recv(1024)
+                self.heartbeat_if_idle()
+                
+                data = self.socket.recv(4096)
                 if not data:
                     break
                 
-                # Adicionar ao buffer e processar mensagens
-                try:
-                    buffer += data.decode('utf-8')
-                    
-                    # Processar todas as mensagens no buffer
-                    while buffer:
-                        try:
-                            message = json.loads(buffer)
-                            self.process_message(message)
-                            buffer = ""  # Limpar buffer
-                            break
-                        except json.JSONDecodeError as e:
-                            if "Extra data" in str(e):
-                                # Dados extras - processar o primeiro JSON e manter o resto
-                                pos = e.pos
-                                try:
-                                    first_json = buffer[:pos]
-                                    message = json.loads(first_json)
-                                    self.process_message(message)
-                                    buffer = buffer[pos:]  # Manter o resto para próximo ciclo
-                                except:
-                                    print("Erro processando JSON parcial, descartando buffer")
-                                    buffer = ""
-                            elif "Expecting value" in str(e) and len(buffer) < 1024:
-                                # JSON incompleto, aguardar mais dados
-                                break
-                            else:
-                                # JSON inválido, descartar
-                                print(f"JSON inválido no buffer: {e}")
-                                buffer = ""
-                                break
-                except UnicodeDecodeError:
-                    print("Erro ao decodificar dados")
-                    buffer = ""
+                # Processar todas as mensagens completas do buffer
+                for message in buffer.feed(data):
+                    self.process_message(message)
                 
+            except socket.timeout:
+                continue
             except Exception as e:
                 print(f"Erro ao receber mensagem: {e}")
                 break
@@ -108,25 +137,176 @@ class RoomClient:
         if self.running:
             print("Conexão com o servidor de salas perdida")
             self.connected = False
+            
+            # As respostas das requisições em andamento não vão mais chegar
+            self.fail_pending_requests(ConnectionError("Conexão com o servidor de salas perdida"))
+            
+            # Se estávamos em alguma sala, tenta voltar antes que o servidor libere as cadeiras
+            if self.seats:
+                self.start_reconnect()
+    
+    def heartbeat_if_idle(self):
+        """
+        Envia um ping ao servidor se nada foi enviado no último intervalo
+        O servidor considera qualquer mensagem (relay incluído) como sinal de
+        vida da sala, então o heartbeat só é necessário com a conexão ociosa.
+        O ping leva um timestamp e também serve para medir a latência.
+        """
+        if time.time() - self.last_sent < SERVER_HEARTBEAT_INTERVAL:
+            return
+        probe_id, t0 = self.server_stats.new_probe()
+        self.send_message({'command': 'ping', 'id': probe_id, 't0': t0})
+    
+    def start_reconnect(self):
+        """Inicia a thread de reconexão, se ainda não estiver rodando"""
+        if self.reconnect_thread and self.reconnect_thread.is_alive():
+            return
+        self.reconnect_thread = threading.Thread(target=self.reconnect_loop)
+        self.reconnect_thread.daemon = True
+        self.reconnect_thread.start()
+    
+    def reconnect_loop(self):
+        """Reconecta com backoff exponencial e jitter e retoma a sessão em cada sala"""
+        deadline = time.time() + RECONNECT_GRACE_PERIOD
+        for delay in reconnect_delays(RECONNECT_BASE_DELAY, RECONNECT_MAX_DELAY):
+            if not self.running or time.time() + delay > deadline:
+                break
+            time.sleep(delay)
+            
+            try:
+                self.open_connection()
+            except OSError:
+                continue
+            
+            for room_id, seat in list(self.seats.items()):
+                self.send_message({
+                    'command': 'resume_session',
+                    'room_id': room_id,
+                    'session_token': seat['session_token']
+                })
+            return
+        
+        print("Não foi possível reconectar ao servidor de salas")
+    
+    def request(self, message, timeout=ROOM_REQUEST_TIMEOUT):
+        """
+        Envia uma requisição e retorna um Future resolvido com a resposta do servidor
+        A resposta continua sendo entregue ao callback; o Future serve para quem
+        precisa correlacioná-la ou esperar por ela (future.result(), ou
+        asyncio.wrap_future(future) em código assíncrono). Várias requisições
+        podem ser enviadas em sequência sem esperar as respostas anteriores.
+        Se o prazo expirar, o Future falha com TimeoutError.
+        """
+        future = Future()
+        req_id = next(self.request_ids)
+        
+        with self.request_condition:
+            self.pending_requests[req_id] = future
+            heapq.heappush(self.request_deadlines, (time.time() + timeout, req_id))
+            self.request_condition.notify()
+        self.start_timeout_thread()
+        
+        if not self.send_message(dict(message, req_id=req_id)):
+            self.resolve_request(req_id, error=ConnectionError("Não conectado ao servidor de salas"))
+        return future
+    
+    def resolve_request(self, req_id, response=None, error=None):
+        """Conclui uma requisição pendente com a resposta ou com um erro"""
+        with self.request_condition:
+            future = self.pending_requests.pop(req_id, None)
+        if future is None:
+            return False
+        if error is not None:
+            future.set_exception(error)
+        else:
+            future.set_result(response)
+        return True
+    
+    def fail_pending_requests(self, error):
+        with self.request_condition:
+            pending = list(self.pending_requests)
+            self.request_condition.notify()
+        for req_id in pending:
+            self.resolve_request(req_id, error=error)
+    
+    def start_timeout_thread(self):
+        if self.timeout_thread and self.timeout_thread.is_alive():
+            return
+        self.timeout_thread = threading.Thread(target=self.request_timeout_loop)
+        self.timeout_thread.daemon = True
+        self.timeout_thread.start()
+    
+    def request_timeout_loop(self):
+        """Dorme até o próximo prazo de requisição e expira as que não tiveram resposta"""
+        while self.running:
+            expired = []
+            with self.request_condition:
+                # Descarta do heap as requisições que já foram respondidas
+                while self.request_deadlines and self.request_deadlines[0][1] not in self.pending_requests:
+                    heapq.heappop(self.request_deadlines)
+                
+                if not self.request_deadlines:
+                    self.request_condition.wait()
+                    continue
+                
+                now = time.time()
+                while self.request_deadlines and self.request_deadlines[0][0] <= now:
+                    expired.append(heapq.heappop(self.request_deadlines)[1])
+                
+                if not expired:
+                    self.request_condition.wait(self.request_deadlines[0][0] - now)
+                    continue
+            
+            for req_id in expired:
+                self.resolve_request(req_id, error=TimeoutError(f"Sem resposta do servidor de salas (req_id {req_id})"))
     
     def process_message(self, message):
         """Processa mensagem recebida do servidor"""
         command = message.get('command')
         
-        # Processar mensagens de relay
+        # Resposta a uma requisição: conclui o Future correspondente
+        if message.get('req_id') is not None:
+            self.resolve_request(message['req_id'], response=message)
+        
+        # Guardar o token da cadeira para poder retomar a sessão
+        if command in ('room_created', 'join_success'):
+            self.seats[message.get('room_id')] = {
+                'session_token': message.get('session_token'),
+                'is_host': command == 'room_created'
+            }
+            self.udp_port = message.get('udp_port')
+        elif command == 'resume_failed':
+            # O servidor ecoa o token; a cadeira correspondente foi perdida
+            for room_id, seat in list(self.seats.items()):
+                if seat['session_token'] == message.get('session_token'):
+                    del self.seats[room_id]
+                    message['room_id'] = room_id
+        
+        # Cada canal tem o seu tratamento; o lobby vai para o callback geral
+        channel = channel_of(message)
+        if channel == 'telemetry':
+            self.handle_telemetry(message)
+        elif channel == 'relay':
+            self.handle_relay(message)
+        elif self.callback:
+            self.callback(message)
+    
+    def handle_telemetry(self, message):
+        # Resposta do heartbeat: atualiza a latência do servidor
+        if message.get('command') == 'pong' and message.get('t0'):
+            self.server_stats.probe_answered(message.get('id'), message['t0'], message.get('t1'), message.get('t2'))
+    
+    def handle_relay(self, message):
+        command = message.get('command')
         if command == 'relay_received':
-            relay_data = message.get('data', {})
-            
             # Repassar para o callback (que será o método na classe game)
             if self.callback:
                 self.callback({
                     'command': 'relay_data',
-                    'data': relay_data
+                    'room_id': message.get('room_id'),
+                    'data': message.get('data', {})
                 })
-            return
-        
-        # Para outras mensagens, repassar para o callback geral
-        if self.callback:
+        elif command == 'relay_failed' and self.callback:
             self.callback(message)
     
     def send_message(self, message):
@@ -136,7 +316,8 @@ class RoomClient:
             return False
         
         try:
-            self.socket.sendall(json.dumps(message).encode('utf-8'))
+            self.writer.send(message)
+            self.last_sent = time.time()
             return True
         except Exception as e:
             print(f"Erro ao enviar mensagem: {e}")
@@ -144,66 +325,85 @@ class RoomClient:
             return False
     
     def list_rooms(self):
-        """Solicita a lista de salas disponíveis"""
+        """Solicita a lista de salas disponíveis (retorna um Future com a resposta)"""
         message = {'command': 'list_rooms'}
-        return self.send_message(message)
+        return self.request(message)
+    
+    def set_identity(self, player_name, player_key):
+        """Nome e chave (load_player_key) informados ao criar ou entrar numa sala"""
+        self.player_name = player_name
+        self.player_key = player_key
     
     def create_room(self, room_name, host_ip):
         """Cria uma nova sala"""
         message = {
             'command': 'create_room',
             'room_name': room_name,
-            'host_ip': host_ip
+            'host_ip': host_ip,
+            'player_name': self.player_name,
+            'player_key': self.player_key
         }
         
-        if self.send_message(message):
-            self.is_host = True
-            
-            # Iniciar thread de ping se ainda não estiver rodando
-            if not self.ping_thread or not self.ping_thread.is_alive():
-                self.ping_thread = threading.Thread(target=self.ping_room_loop)
-                self.ping_thread.daemon = True
-                self.ping_thread.start()
-            
-            return True
-        return False
+        return self.request(message)
     
     def join_room(self, room_id):
-        """Solicita entrada em uma sala"""
+        """Solicita entrada em uma sala (retorna um Future com a resposta)"""
         message = {
             'command': 'join_room',
-            'room_id': room_id
+            'room_id': room_id,
+            'player_name': self.player_name,
+            'player_key': self.player_key
         }
-        return self.send_message(message)
+        return self.request(message)
     
-    def ping_room(self, room_id):
-        """Envia ping para manter a sala ativa"""
-        message = {
-            'command': 'ping_room',
-            'room_id': room_id
-        }
+    def send_chat(self, text, room_id=None):
+        """Envia uma mensagem de chat para o outro jogador da sala"""
+        message = {'command': 'chat_message', 'text': text}
+        if room_id is not None:
+            message['room_id'] = room_id
         return self.send_message(message)
     
-    def ping_room_loop(self):
-        """Loop que envia pings periódicos para manter a sala ativa"""
-        while self.running and self.connected and self.room_id and self.is_host:
-            self.ping_room(self.room_id)
-            time.sleep(30)  # Ping a cada 30 segundos
-    
     def delete_room(self, room_id):
         """Solicita a exclusão de uma sala"""
         message = {
             'command': 'delete_room',
             'room_id': room_id
         }
-        return self.send_message(message)
+        return self.request(message)
     
-    def set_room_id(self, room_id):
-        """Define o ID da sala atual"""
-        self.room_id = room_id
-        
-        # Se for host, iniciar thread de ping
-        if self.is_host and not self.ping_thread:
-            self.ping_thread = threading.Thread(target=self.ping_room_loop)
-            self.ping_thread.daemon = True
-            self.ping_thread.start() 
\ No newline at end of file
+    def report_hand(self, room_id, hand):
+        """Informa uma mão terminada ao histórico do servidor (canal de telemetria, sem resposta)"""
+        return self.send_message({'command': 'report_hand', 'room_id': room_id, 'hand': hand})
+    
+    def hand_history(self, player, limit=10, before=None):
+        """Últimas mãos do jogador no histórico do servidor (retorna um Future com a resposta)"""
+        message = {'command': 'hand_history', 'player': player, 'limit': limit}
+        if before is not None:
+            message['before'] = before
+        return self.request(message)
+    
+    def player_stats(self, player):
+        """Totais e aproveitamento por dia do jogador (retorna um Future com a resposta)"""
+        return self.request({'command': 'player_stats', 'player': player})
+    
+    def balance(self, player):
+        """Saldo de fichas do jogador no servidor (retorna um Future com a resposta)"""
+        return self.request({'command': 'balance', 'player': player})
+    
+    def get_leaderboard(self, board='chips', offset=0, limit=10, player=None):
+        """Página do ranking (e a posição de player, se informado); retorna um Future com a resposta"""
+        message = {'command': 'get_leaderboard', 'board': board, 'offset': offset, 'limit': limit}
+        if player is not None:
+            message['player'] = player
+        return self.request(message)
+    
+    def seat(self, room_id):
+        """Cadeira ocupada na sala (None se esta conexão não estiver nela)"""
+        return self.seats.get(room_id)
+    
+    def leave_room(self, room_id):
+        """Libera a cadeira na sala; se formos o host, a sala é excluída no servidor"""
+        seat = self.seats.pop(room_id, None)
+        if seat and seat['is_host'] and self.connected:
+            return self.delete_room(room_id)
+        return None 
\ No newline at end of file
@@ -19,6 +19,8 @@ class RoomMenu:
         
         # Estado do menu de salas
         self.rooms = []  # Lista de salas disponíveis
+        self.server_rooms = []  # Salas informadas pelo servidor
+        self.lan_rooms = []  # Mesas descobertas na rede local
         self.selected_room_index = -1
         self.scroll_offset = 0
         self.max_visible_rooms = 6
@@ -27,6 +29,13 @@ class RoomMenu:
         self.room_name_input = ""
         self.room_name_active = False
         
+        # Ranking do servidor: uma página por vez, pedida ao abrir a tela e ao trocar de página
+        self.leaderboard_board = 'chips'
+        self.leaderboard_offset = 0
+        self.leaderboard_page_size = 8
+        self.leaderboard = None  # Última página recebida do servidor
+        self.leaderboard_status = ""
+        
         # Elementos da UI
         self.create_ui_elements()
     
@@ -48,6 +57,14 @@ class RoomMenu:
             40
         )
         
+        # Botão do ranking no canto esquerdo, na altura do botão atualizar
+        self.leaderboard_button = pygame.Rect(
+            self.room_list_rect.x,
+            self.room_list_rect.y - 50,
+            120,
+            40
+        )
+        
         button_y_bottom = SCREEN_HEIGHT - 80
         self.back_button = pygame.Rect(
             50,
@@ -112,6 +129,9 @@ class RoomMenu:
         refresh_rect = refresh_text.get_rect(center=self.refresh_button.center)
         self.screen.blit(refresh_text, refresh_rect)
         
+        # Botão do ranking
+        self.draw_button(self.leaderboard_button, "Ranking", self.small_custom_font)
+        
         # Desenhar salas
         if not self.rooms:
             no_rooms_text = self.custom_font.render("Nenhuma sala disponível", True, WHITE)
@@ -149,6 +169,13 @@ class RoomMenu:
                 self.screen.blit(name_text, (room_rect.x + 10, room_rect.y + 5))
                 self.screen.blit(id_text, (room_rect.x + 10, room_rect.y + 30))
                 self.screen.blit(host_text, (room_rect.x + 200, room_rect.y + 30))
+                
+                # Mesas da rede local mostram a latência medida
+                if room.get('lan'):
+                    latency = room.get('latency_ms')
+                    lan_label = f"LAN {latency:.0f} ms" if latency is not None else "LAN"
+                    lan_text = self.small_custom_font.render(lan_label, True, DARK_GREEN)
+                    self.screen.blit(lan_text, (room_rect.right - lan_text.get_width() - 10, room_rect.y + 30))
         
         # Botão para criar sala
         pygame.draw.rect(self.screen, GOLD, self.create_room_button, border_radius=8)
@@ -213,8 +240,106 @@ class RoomMenu:
         back_rect = back_text.get_rect(center=self.back_button.center)
         self.screen.blit(back_text, back_rect)
     
+    def draw_button(self, rect, label, font=None, enabled=True):
+        pygame.draw.rect(self.screen, GOLD if enabled else GRAY, rect, border_radius=8)
+        pygame.draw.rect(self.screen, BLACK, rect, 4, border_radius=10)  # Contorno preto
+        text = (font or self.custom_font).render(label, True, BLACK)
+        self.screen.blit(text, text.get_rect(center=rect.center))
+    
+    def draw_leaderboard(self):
+        """Desenha a página atual do ranking; os botões ocupam os lugares dos da lista de salas"""
+        self.screen.blit(self.background_image, (0, 0))
+        
+        chips = self.leaderboard_board == 'chips'
+        title_text = self.title_font.render("Ranking de Fichas" if chips else "Ranking de Vitórias", True, WHITE)
+        self.screen.blit(title_text, title_text.get_rect(center=(SCREEN_WIDTH // 2, 50)))
+        
+        pygame.draw.rect(self.screen, DARK_GREEN, self.room_list_rect, border_radius=5)
+        pygame.draw.rect(self.screen, BLACK, self.room_list_rect, 2, border_radius=5)
+        self.draw_button(self.refresh_button, "Vitórias" if chips else "Fichas", self.small_custom_font)
+        
+        leaderboard = self.leaderboard
+        entries = leaderboard['entries'] if leaderboard else []
+        if not entries:
+            message = self.leaderboard_status if leaderboard is None else "Nenhum jogador no ranking"
+            message_text = self.custom_font.render(message, True, WHITE)
+            self.screen.blit(message_text, message_text.get_rect(center=(SCREEN_WIDTH // 2, SCREEN_HEIGHT // 2 - 50)))
+        
+        for i, (rank, name, score) in enumerate(entries):
+            row_rect = pygame.Rect(
+                self.room_list_rect.x + 10,
+                self.room_list_rect.y + 10 + i * 35,
+                self.room_list_rect.width - 20,
+                30
+            )
+            # A linha do próprio jogador fica destacada
+            pygame.draw.rect(self.screen, LIGHT_BLUE if name == leaderboard.get('player') else WHITE, row_rect, border_radius=5)
+            pygame.draw.rect(self.screen, BLACK, row_rect, 1, border_radius=5)
+            name_text = self.small_custom_font.render(f"{rank}. {name}", True, BLACK)
+            score_text = self.small_custom_font.render(f"{score} {'fichas' if chips else 'vitórias'}", True, BLACK)
+            self.screen.blit(name_text, name_text.get_rect(midleft=(row_rect.x + 10, row_rect.centery)))
+            self.screen.blit(score_text, score_text.get_rect(midright=(row_rect.right - 10, row_rect.centery)))
+        
+        if leaderboard and leaderboard.get('rank'):
+            rank, score = leaderboard['rank']
+            position_text = self.small_custom_font.render(f"Sua posição: {rank} de {leaderboard['total']}", True, WHITE)
+            self.screen.blit(position_text, position_text.get_rect(center=(SCREEN_WIDTH // 2, self.refresh_button.centery)))
+        
+        total = leaderboard['total'] if leaderboard else 0
+        self.draw_button(self.create_room_button, "Anterior", enabled=self.leaderboard_offset > 0)
+        self.draw_button(self.join_room_button, "Próxima", enabled=self.leaderboard_offset + self.leaderboard_page_size < total)
+        self.draw_button(self.back_button, "Voltar")
+    
+    def open_leaderboard(self, status="Carregando..."):
+        """Volta para a primeira página; a página chega depois, por update_leaderboard"""
+        self.leaderboard_offset = 0
+        self.leaderboard = None
+        self.leaderboard_status = status
+    
+    def switch_leaderboard(self):
+        self.leaderboard_board = 'wins' if self.leaderboard_board == 'chips' else 'chips'
+        self.open_leaderboard()
+    
+    def turn_leaderboard_page(self, step):
+        """Avança (step=1) ou volta (step=-1) uma página; retorna False se não houver página para ir"""
+        total = self.leaderboard['total'] if self.leaderboard else 0
+        offset = self.leaderboard_offset + step * self.leaderboard_page_size
+        if offset < 0 or offset >= total:
+            return False
+        self.leaderboard_offset = offset
+        return True
+    
+    def update_leaderboard(self, page):
+        """Página recebida do servidor; respostas de uma página ou ranking anterior são ignoradas"""
+        if page.get('board') == self.leaderboard_board and page.get('offset') == self.leaderboard_offset:
+            self.leaderboard = page
+    
     def update_rooms(self, rooms):
         """Atualiza a lista de salas"""
+        self.server_rooms = rooms
+        self.merge_rooms()
+    
+    def update_lan_rooms(self, rooms):
+        """Atualiza as mesas descobertas na rede local"""
+        self.lan_rooms = rooms
+        self.merge_rooms()
+    
+    def merge_rooms(self):
+        """Junta as salas do servidor com as mesas da rede local"""
+        lan_by_id = {room['id']: room for room in self.lan_rooms}
+        
+        rooms = []
+        for room in self.server_rooms:
+            lan_room = lan_by_id.pop(room.get('id'), None)
+            if lan_room:
+                # Mesma sala vista pelo servidor e pela rede local
+                room = dict(room, lan=True, latency_ms=lan_room.get('latency_ms'))
+            rooms.append(room)
+        
+        # Mesas que só existem na rede local (host sem servidor de salas)
+        for room in lan_by_id.values():
+            rooms.append(dict(room, lan_only=True))
+        
         self.rooms = rooms
         
         # Verificar se a sala selecionada ainda está disponível
@@ -247,6 +372,9 @@ class RoomMenu:
             if self.refresh_button.collidepoint(mouse_pos):
                 return "refresh"
             
+            if self.leaderboard_button.collidepoint(mouse_pos):
+                return "leaderboard"
+            
             if self.create_room_button.collidepoint(mouse_pos):
                 return "create_room"
             
@@ -263,6 +391,29 @@ class RoomMenu:
         
         return None
     
+    def handle_leaderboard_event(self, event):
+        """Processa eventos na tela do ranking"""
+        if event.type == pygame.MOUSEBUTTONDOWN:
+            mouse_pos = pygame.mouse.get_pos()
+            
+            if self.refresh_button.collidepoint(mouse_pos):
+                return "switch_board"
+            
+            if self.create_room_button.collidepoint(mouse_pos):
+                return "previous_page"
+            
+            if self.join_room_button.collidepoint(mouse_pos):
+                return "next_page"
+            
+            if self.back_button.collidepoint(mouse_pos):
+                return "back"
+        
+        # A rolagem troca de página
+        elif event.type == pygame.MOUSEWHEEL:
+            return "previous_page" if event.y > 0 else "next_page"
+        
+        return None
+    
     def handle_create_room_event(self, event):
         """Processa eventos na tela de criação de sala"""
         if event.type == pygame.MOUSEBUTTONDOWN:
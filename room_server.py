@@ -1,17 +1,40 @@
+import hashlib
+import hmac
 import socket
 import threading
-import json
 import time
 import uuid
 import sys
+from protocol import MessageBuffer, FrameWriter
+from transport import TcpTransport
+from udp_transport import REGISTER, REGISTERED, unpack, pack
+from constants import TABLE_STAKE
+from hand_history import HandHistory, WIN, LOSS, PUSH, validate_hand
+from ledger import Ledger
+from leaderboard import LeaderboardService, BOARDS, CHIPS, WINS
 
 # Configurações do servidor
 HOST = '0.0.0.0'
 PORT = 5001
+UDP_PORT = 5003  # Relay UDP (opcional) das mensagens do jogo
 ROOM_CLEANUP_INTERVAL = 60  # Segundos antes de remover salas inativas
+HOST_SILENCE_TIMEOUT = 20  # Segundos sem nenhuma mensagem do host antes de considerar a sala morta
+ROOM_CHECK_INTERVAL = 5  # Intervalo entre as verificações de salas inativas
+SEAT_GRACE_PERIOD = 30  # Segundos que a cadeira de quem caiu fica reservada
+SERVER_HISTORY_DIR = 'server_history'  # Histórico das mãos confirmadas pelas duas cadeiras das mesas
+HISTORY_QUERY_LIMIT = 100  # Máximo de mãos por consulta ao histórico
+SERVER_LEDGER_PATH = 'server_ledger.db'  # Fichas dos jogadores, liquidadas pelas mãos informadas
+LEADERBOARD_PAGE_LIMIT = 50  # Máximo de jogadores por página do ranking
+PLAYER_NAME_LIMIT = 64  # Tamanho máximo do nome de um jogador
+PENDING_REPORTS = 8  # Rodadas por sala aguardando a confirmação da outra cadeira
+SETTLED_ROUNDS = 4096  # Rodadas liquidadas lembradas por sala, para não liquidar de novo
+REPORT_GRACE_PERIOD = 10  # Segundos em que uma sala excluída ainda confirma as mãos informadas
 
 class RoomServer:
-    def __init__(self):
+    def __init__(self, transport=None, host=None, port=None, history_dir=SERVER_HISTORY_DIR, ledger_path=SERVER_LEDGER_PATH):
+        self.transport = transport or TcpTransport()
+        self.host = host or HOST
+        self.port = port or PORT
         self.server_socket = None
         self.rooms = {}  # {room_id: {'host': host_ip, 'name': room_name, 'last_ping': timestamp}}
         self.clients = []  # Lista de sockets de clientes conectados
@@ -19,50 +42,189 @@ class RoomServer:
         self.lock = threading.Lock()  # Para acesso seguro à lista de salas
         
         # Dicionários para gerenciar conexões de relay
-        self.client_rooms = {}  # {client_socket: room_id}
-        self.room_connections = {}  # {room_id: {'host': host_socket, 'client': client_socket}}
+        # Uma conexão pode ocupar cadeiras em várias salas (multi-mesa)
+        self.client_rooms = {}  # {client_socket: set(room_ids)}
+        # Por sala: os dois sockets, as cadeiras reservadas de quem caiu, os
+        # nomes verificados e as rodadas informadas (pendentes e já liquidadas)
+        self.room_connections = {}  # {room_id: {'host': socket, 'client': socket, 'away': {papel: prazo}, 'names': {papel: nome}, 'reports': {rodada: ...}, 'settled': {rodada: None}}}
+        self.session_tokens = {}  # {token: (room_id, 'host' | 'client')}
+        self.player_keys = {}  # {nome: hash da chave}, sem o livro de fichas
+        self.closing_rooms = {}  # {room_id: (prazo, conexões)} das salas recém-excluídas
+        
+        # Instante da última mensagem recebida em cada conexão; escrito sem lock
+        # pela thread de cada cliente (atribuição em dict é atômica) e lido na limpeza
+        self.last_seen = {}  # {client_socket: timestamp}
+        
+        # Envio multiplexado por canais (relay, lobby, chat, telemetria) de cada conexão
+        self.writers = {}  # {client_socket: FrameWriter}
+        
+        # Relay UDP: endereço registrado por cadeira e o caminho inverso
+        self.udp_socket = None
+        self.udp_seats = {}  # {(room_id, papel): endereço}
+        self.udp_routes = {}  # {endereço: (room_id, papel)}
+        
+        # Histórico de mãos (None desliga): o registro só enfileira, a
+        # gravação em lotes fica com a thread do HandHistory
+        self.hand_history = None
+        if history_dir:
+            try:
+                self.hand_history = HandHistory(history_dir)
+            except (OSError, ValueError) as e:
+                print(f"Histórico de mãos indisponível: {e}")
+        
+        # Fichas (None desliga): saldos em cache, lançamentos gravados em lote no SQLite
+        self.ledger = Ledger(ledger_path) if ledger_path else None
+        
+        # Rankings (fichas e vitórias) mantidos a cada mão informada, por uma thread própria
+        self.leaderboards = LeaderboardService()
+        self.load_leaderboards()
+    
+    def load_leaderboards(self):
+        """Monta os rankings a partir das fichas e do histórico já gravados"""
+        if self.ledger:
+            for name, balance, _ in self.ledger.accounts(limit=None):
+                self.leaderboards.submit(CHIPS, name, balance)
+        if self.hand_history:
+            for name in self.hand_history.players():
+                self.leaderboards.submit(WINS, name, self.hand_history.totals(name)[1])
     
     def start(self):
         """Inicia o servidor de salas"""
         try:
-            self.server_socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-            self.server_socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
-            self.server_socket.bind((HOST, PORT))
-            self.server_socket.listen(10)  # Máximo 10 conexões pendentes
-            self.running = True
-            
-            print(f"Servidor de salas iniciado em {HOST}:{PORT}")
-            
-            # Iniciar thread para limpeza de salas inativas
-            cleanup_thread = threading.Thread(target=self.cleanup_inactive_rooms)
-            cleanup_thread.daemon = True
-            cleanup_thread.start()
-            
-            # Aceitar conexões de clientes
-            while self.running:
-                try:
-                    client_socket, addr = self.server_socket.accept()
-                    print(f"Conexão recebida de {addr}")
-                    
-                    # Iniciar thread para cada cliente
-                    client_thread = threading.Thread(target=self.handle_client, args=(client_socket, addr))
-                    client_thread.daemon = True
-                    client_thread.start()
-                    
-                except Exception as e:
-                    if self.running:
-                        print(f"Erro ao aceitar conexão: {e}")
-                    else:
-                        break
-                
+            self.listen()
+            self.serve()
         except Exception as e:
             print(f"Erro ao iniciar servidor: {e}")
             self.stop()
     
+    def listen(self):
+        """Abre a porta do servidor e inicia a limpeza de salas inativas"""
+        self.server_socket = self.transport.listen(self.port, host=self.host, backlog=10)  # Máximo 10 conexões pendentes
+        self.running = True
+        
+        print(f"Servidor de salas iniciado em {self.host}:{self.port}")
+        
+        # O relay UDP só existe com rede de verdade (não no transporte em memória)
+        if not self.transport.in_process:
+            self.start_udp_relay()
+        
+        # Iniciar thread para limpeza de salas inativas
+        cleanup_thread = threading.Thread(target=self.cleanup_inactive_rooms)
+        cleanup_thread.daemon = True
+        cleanup_thread.start()
+    
+    def serve(self):
+        """Aceita conexões de clientes até o servidor ser encerrado"""
+        while self.running:
+            try:
+                client_socket, addr = self.server_socket.accept()
+                client_socket.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+                print(f"Conexão recebida de {addr}")
+                
+                # Iniciar thread para cada cliente
+                client_thread = threading.Thread(target=self.handle_client, args=(client_socket, addr))
+                client_thread.daemon = True
+                client_thread.start()
+                
+            except Exception as e:
+                if self.running:
+                    print(f"Erro ao aceitar conexão: {e}")
+                else:
+                    break
+    
+    def start_udp_relay(self):
+        try:
+            self.udp_socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+            self.udp_socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+            self.udp_socket.bind((self.host, UDP_PORT))
+        except OSError as e:
+            print(f"Relay UDP indisponível: {e}")
+            self.udp_socket = None
+            return
+        
+        udp_thread = threading.Thread(target=self.udp_relay_loop)
+        udp_thread.daemon = True
+        udp_thread.start()
+    
+    def udp_relay_loop(self):
+        """
+        Repassa datagramas entre as duas cadeiras de uma sala
+        O conteúdo não é aberto: sequência, acks e retransmissões são
+        resolvidos entre os jogadores. Só o REGISTER é tratado aqui.
+        """
+        udp_socket = self.udp_socket
+        while self.running:
+            try:
+                datagram, addr = udp_socket.recvfrom(2048)
+            except OSError:
+                break
+            
+            if datagram[:1] == bytes([REGISTER]):
+                self.register_udp_seat(datagram, addr)
+                continue
+            
+            route = self.udp_routes.get(addr)
+            if route is None:
+                continue
+            room_id, role = route
+            target = self.udp_seats.get((room_id, 'client' if role == 'host' else 'host'))
+            if target:
+                try:
+                    udp_socket.sendto(datagram, target)
+                except OSError:
+                    pass
+    
+    def register_udp_seat(self, datagram, addr):
+        packet = unpack(datagram)
+        if packet is None:
+            return
+        token = packet[-1].decode('utf-8', 'ignore')
+        
+        with self.lock:
+            seat = self.session_tokens.get(token)
+            if seat is None:
+                reply = b"!"
+            else:
+                old_addr = self.udp_seats.get(seat)
+                if old_addr and old_addr != addr:
+                    self.udp_routes.pop(old_addr, None)
+                self.udp_seats[seat] = addr
+                self.udp_routes[addr] = seat
+                other = (seat[0], 'client' if seat[1] == 'host' else 'host')
+                reply = b"1" if other in self.udp_seats else b"0"
+        
+        try:
+            self.udp_socket.sendto(pack(REGISTERED, payload=reply), addr)
+        except OSError:
+            pass
+    
+    def drop_udp_seats(self, room_id):
+        """Remove os endereços UDP das cadeiras de uma sala (chamar com o lock adquirido)"""
+        for role in ('host', 'client'):
+            addr = self.udp_seats.pop((room_id, role), None)
+            if addr:
+                self.udp_routes.pop(addr, None)
+    
     def stop(self):
         """Encerra o servidor de salas"""
         self.running = False
         
+        if self.hand_history:
+            self.hand_history.close()
+            self.hand_history = None
+        
+        if self.ledger:
+            self.ledger.close()
+            self.ledger = None
+        
+        self.leaderboards.close()
+        
+        if self.udp_socket:
+            try:
+                self.udp_socket.close()
+            except:
+                pass
+        
         # Fechar todas as conexões de clientes
         for client in self.clients:
             try:
@@ -83,17 +245,19 @@ class RoomServer:
         """Gerencia comunicação com um cliente"""
         try:
             self.clients.append(client_socket)
+            self.writers[client_socket] = FrameWriter(client_socket)
+            buffer = MessageBuffer()
             
             while self.running:
-                data = client_socket.recv(1024)
+                data = client_socket.recv(4096)
                 if not data:
                     break
                 
-                try:
-                    message = json.loads(data.decode('utf-8'))
+                # Qualquer tráfego (relay, heartbeat, comandos) mantém a sala viva
+                self.last_seen[client_socket] = time.time()
+                
+                for message in buffer.feed(data):
                     self.process_message(client_socket, addr, message)
-                except json.JSONDecodeError:
-                    print(f"Mensagem inválida de {addr}")
                 
         except Exception as e:
             print(f"Erro na comunicação com {addr}: {e}")
@@ -102,12 +266,12 @@ class RoomServer:
             # Remover cliente da lista e limpar associações de relay
             if client_socket in self.clients:
                 self.clients.remove(client_socket)
+            self.last_seen.pop(client_socket, None)
+            self.writers.pop(client_socket, None)
             
-            # Verificar se o cliente estava em alguma sala e notificar o outro jogador
-            if client_socket in self.client_rooms:
-                room_id = self.client_rooms[client_socket]
+            # Notificar o outro jogador de cada sala em que o cliente estava
+            for room_id in self.client_rooms.pop(client_socket, set()):
                 self.notify_disconnect(client_socket, room_id)
-                del self.client_rooms[client_socket]
             
             # Fechar socket
             try:
@@ -123,40 +287,47 @@ class RoomServer:
         
         # Comandos de gerenciamento de salas
         if command == 'list_rooms':
-            self.send_room_list(client_socket)
+            self.send_room_list(client_socket, message)
         
         elif command == 'create_room':
             room_name = message.get('room_name', 'Sala sem nome')
             host_ip = message.get('host_ip', addr[0])
+            player_name = self.seat_name(message)
             room_id = self.create_room(room_name, host_ip)
             
             # Associar o socket do host à sala para relay
-            self.client_rooms[client_socket] = room_id
             with self.lock:
+                self.client_rooms.setdefault(client_socket, set()).add(room_id)
                 if room_id not in self.room_connections:
-                    self.room_connections[room_id] = {'host': client_socket, 'client': None}
+                    self.room_connections[room_id] = {'host': client_socket, 'client': None, 'away': {}, 'names': {}, 'reports': {}, 'settled': {}}
                 else:
                     self.room_connections[room_id]['host'] = client_socket
+                self.room_connections[room_id]['names']['host'] = player_name
+                session_token = self.issue_session_token(room_id, 'host')
             
             response = {
                 'command': 'room_created',
                 'room_id': room_id,
                 'room_name': room_name,
                 'host_ip': host_ip,
-                'use_relay': True  # Indicar que usará relay
+                'use_relay': True,  # Indicar que usará relay
+                'udp_port': UDP_PORT if self.udp_socket else None,
+                'session_token': session_token
             }
-            self.send_message(client_socket, response)
+            self.reply(client_socket, message, response)
         
         elif command == 'join_room':
             room_id = message.get('room_id')
+            player_name = self.seat_name(message)
             with self.lock:
                 if room_id in self.rooms:
                     # Associar o socket do cliente à sala para relay
-                    self.client_rooms[client_socket] = room_id
+                    self.client_rooms.setdefault(client_socket, set()).add(room_id)
                     
                     # Configurar o relay entre host e cliente
                     if room_id in self.room_connections:
                         self.room_connections[room_id]['client'] = client_socket
+                        self.room_connections[room_id]['names']['client'] = player_name
                         
                         # Notificar o host que um cliente se conectou
                         if self.room_connections[room_id]['host']:
@@ -170,24 +341,21 @@ class RoomServer:
                         'room_id': room_id,
                         'room_name': self.rooms[room_id]['name'],
                         'host_ip': self.rooms[room_id]['host'],
-                        'use_relay': True  # Indicar que usará relay
+                        'use_relay': True,  # Indicar que usará relay
+                        'udp_port': UDP_PORT if self.udp_socket else None,
+                        'session_token': self.issue_session_token(room_id, 'client')
                     }
                 else:
                     response = {
                         'command': 'join_failed',
                         'reason': 'Sala não encontrada'
                     }
-            self.send_message(client_socket, response)
+            self.reply(client_socket, message, response)
         
-        elif command == 'ping_room':
-            room_id = message.get('room_id')
-            with self.lock:
-                if room_id in self.rooms:
-                    self.rooms[room_id]['last_ping'] = time.time()
-                    response = {'command': 'pong'}
-                else:
-                    response = {'command': 'room_not_found'}
-            self.send_message(client_socket, response)
+        elif command in ('ping', 'ping_room'):
+            # Heartbeat/probe de latência: a mensagem já atualizou last_seen,
+            # então não é preciso tocar na sala nem adquirir o lock
+            self.reply(client_socket, message, self.build_pong(message, time.time()))
         
         elif command == 'delete_room':
             room_id = message.get('room_id')
@@ -196,17 +364,100 @@ class RoomServer:
                     del self.rooms[room_id]
                     # Limpar referências de relay para esta sala
                     if room_id in self.room_connections:
-                        del self.room_connections[room_id]
+                        connections = self.room_connections.pop(room_id)
+                        for role in ('host', 'client'):
+                            self.client_rooms.get(connections[role], set()).discard(room_id)
+                        # A mão da última rodada do outro jogador pode chegar
+                        # depois da saída do host: a sala ainda a confirma por um tempo
+                        self.keep_closing_room(room_id, connections)
+                    self.drop_session_tokens(room_id)
                     response = {'command': 'room_deleted'}
                 else:
                     response = {'command': 'room_not_found'}
-            self.send_message(client_socket, response)
+            self.reply(client_socket, message, response)
+            
+        elif command == 'chat_message':
+            # Chat entre os jogadores da sala (canal próprio, de baixa prioridade)
+            room_id = self.room_of(client_socket, message.get('room_id'))
+            sent = room_id is not None and self.send_to_peer(client_socket, room_id, {
+                'command': 'chat_received',
+                'room_id': room_id,
+                'text': str(message.get('text', ''))[:500]
+            })
+            if not sent:
+                self.reply(client_socket, message, {'command': 'chat_failed', 'reason': 'Ninguém na sala'})
+            
+        elif command == 'report_hand':
+            # Mão terminada numa mesa; cada cadeira informa a sua e a mão só
+            # é guardada e liquidada quando as duas confirmam a mesma rodada
+            room_id = message.get('room_id')
+            confirmed = self.confirm_hand(client_socket, room_id, message.get('hand'))
+            if confirmed:
+                hand, seated = confirmed
+                hand['room'] = room_id
+                # A aposta é a da mesa, não a informada pelo host
+                hand['wager'] = TABLE_STAKE
+                if self.hand_history:
+                    self.hand_history.append(hand)
+                if self.ledger:
+                    for player, balance in zip(seated, self.ledger.settle_hand(hand, seated)):
+                        self.leaderboards.submit(CHIPS, player['name'], balance)
+                # Os rankings só conhecem quem o servidor sentou na sala
+                for player in seated:
+                    self.leaderboards.add(WINS, player['name'], int(player['outcome'] == WIN))
+            
+        elif command == 'hand_history':
+            # Últimas mãos de um jogador (before pagina para trás no tempo)
+            player = str(message.get('player', ''))
+            limit = message.get('limit')
+            limit = max(1, min(limit, HISTORY_QUERY_LIMIT)) if isinstance(limit, int) else 10
+            before = message.get('before')
+            before = before if isinstance(before, (int, float)) else None
+            hands = self.hand_history.last_hands(player, limit, before) if self.hand_history else []
+            self.reply(client_socket, message, {'command': 'hand_history', 'player': player, 'hands': hands})
+            
+        elif command == 'player_stats':
+            # Totais e aproveitamento por dia de um jogador
+            player = str(message.get('player', ''))
+            history = self.hand_history
+            self.reply(client_socket, message, {
+                'command': 'player_stats',
+                'player': player,
+                'totals': history.totals(player) if history else (0, 0, 0, 0),
+                'days': history.daily_stats(player) if history else []
+            })
+            
+        elif command == 'balance':
+            # Saldo de fichas de um jogador, do cache do livro
+            player = str(message.get('player', ''))
+            balance = self.ledger.balance(player) if self.ledger else None
+            self.reply(client_socket, message, {'command': 'balance', 'player': player, 'balance': balance})
+            
+        elif command == 'get_leaderboard':
+            # Página do ranking e, se informado, a posição do jogador
+            board = message.get('board')
+            board = board if board in BOARDS else CHIPS
+            offset = message.get('offset')
+            offset = max(0, offset) if isinstance(offset, int) else 0
+            limit = message.get('limit')
+            limit = max(1, min(limit, LEADERBOARD_PAGE_LIMIT)) if isinstance(limit, int) else 10
+            total, entries = self.leaderboards.page(board, offset, limit)
+            response = {'command': 'leaderboard', 'board': board, 'offset': offset, 'total': total, 'entries': entries}
+            player = message.get('player')
+            if isinstance(player, str):
+                response['player'] = player
+                response['rank'] = self.leaderboards.rank(board, player)
+            self.reply(client_socket, message, response)
+            
+        elif command == 'resume_session':
+            # Jogador que caiu voltando para a cadeira reservada
+            self.resume_session(client_socket, message.get('session_token'))
             
         # Comandos de relay
         elif command == 'relay_message':
             # Retransmitir a mensagem para o outro jogador na sala
-            if client_socket in self.client_rooms:
-                room_id = self.client_rooms[client_socket]
+            room_id = self.room_of(client_socket, message.get('room_id'))
+            if room_id is not None:
                 relay_data = message.get('data', {})
                 
                 # Adicionar info de relay para o receptor saber se veio do host ou do cliente
@@ -216,80 +467,282 @@ class RoomServer:
                 
                 # Confirmação para quem enviou
                 response = {'command': 'relay_sent'}
-                self.send_message(client_socket, response)
+                self.reply(client_socket, message, response)
             else:
                 response = {'command': 'relay_failed', 'reason': 'Not in a room'}
-                self.send_message(client_socket, response)
+                self.reply(client_socket, message, response)
+    
+    def seat_name(self, message):
+        """
+        Nome verificado de quem senta na cadeira (create_room/join_room)
+        O nome só vale com a chave associada a ele na primeira vez em que
+        foi usado; sem isso a cadeira fica sem nome e as mãos dela não são
+        liquidadas. O saldo é carregado aqui, ao sentar, para a liquidação
+        das mãos não consultar o banco.
+        """
+        player_name = message.get('player_name')
+        player_key = message.get('player_key')
+        if not isinstance(player_name, str) or not player_name or len(player_name) > PLAYER_NAME_LIMIT:
+            return None
+        if not isinstance(player_key, str) or not player_key:
+            return None
+        digest = hashlib.sha256(player_key.encode('utf-8')).hexdigest()
+        if self.ledger:
+            if not self.ledger.claim(player_name, digest):
+                return None
+            self.ledger.preload(player_name)
+        else:
+            with self.lock:
+                known = self.player_keys.setdefault(player_name, digest)
+            if not hmac.compare_digest(known, digest):
+                return None
+        return player_name
+    
+    def confirm_hand(self, client_socket, room_id, hand):
+        """
+        Registra a mão informada por uma das cadeiras da sala
+        Os nomes precisam ser os verificados das duas cadeiras (a de quem
+        informa primeiro, como na mesa dele) e a mesma rodada (round, derivado
+        da semente do lockstep) precisa chegar das duas com os mesmos
+        resultados. Só então retorna (mão do host, jogadores na ordem host,
+        cliente) para liquidar, uma única vez por rodada; antes disso, ou com
+        qualquer divergência, retorna None.
+        """
+        if not validate_hand(hand) or len(hand['players']) != 2:
+            return None
+        round_id = hand.get('round')
+        if not isinstance(round_id, str) or not round_id or len(round_id) > 64:
+            return None
+        
+        with self.lock:
+            connections = self.room_connections.get(room_id) or self.closing_room(room_id)
+            if not connections:
+                return None
+            if connections['host'] is client_socket:
+                role, other_role = 'host', 'client'
+            elif connections['client'] is client_socket:
+                role, other_role = 'client', 'host'
+            else:
+                return None
+            names = (connections['names'].get(role), connections['names'].get(other_role))
+            if None in names or names[0] == names[1]:
+                return None
+            if tuple(player['name'] for player in hand['players']) != names:
+                return None
+            outcomes = tuple(player['outcome'] for player in hand['players'])
+            if outcomes not in ((WIN, LOSS), (LOSS, WIN), (PUSH, PUSH)):
+                return None
+            if role == 'client':
+                names, outcomes = names[::-1], outcomes[::-1]
+            
+            if round_id in connections['settled']:
+                return None
+            pending = connections['reports'].pop(round_id, None)
+            if pending is None or pending[0] == role:
+                # Primeira confirmação da rodada: espera a outra cadeira
+                connections['reports'][round_id] = (role, outcomes, hand)
+                while len(connections['reports']) > PENDING_REPORTS:
+                    del connections['reports'][next(iter(connections['reports']))]
+                return None
+            if pending[1] != outcomes:
+                return None
+            connections['settled'][round_id] = None
+            while len(connections['settled']) > SETTLED_ROUNDS:
+                del connections['settled'][next(iter(connections['settled']))]
+        
+        host_hand = hand if role == 'host' else pending[2]
+        return host_hand, [{'name': name, 'outcome': outcome} for name, outcome in zip(names, outcomes)]
+    
+    def keep_closing_room(self, room_id, connections):
+        """Guarda a sala excluída para confirmar mãos atrasadas (chamar com o lock adquirido)"""
+        now = time.time()
+        for expired in [key for key, (deadline, _) in self.closing_rooms.items() if deadline < now]:
+            del self.closing_rooms[expired]
+        self.closing_rooms[room_id] = (now + REPORT_GRACE_PERIOD, connections)
+    
+    def closing_room(self, room_id):
+        """Sala excluída há menos de REPORT_GRACE_PERIOD segundos (chamar com o lock adquirido)"""
+        closing = self.closing_rooms.get(room_id)
+        if closing and closing[0] >= time.time():
+            return closing[1]
+        return None
+    
+    def room_of(self, client_socket, room_id=None):
+        """
+        Sala da mensagem de um cliente: a informada, se ele estiver nela, ou a
+        única sala da conexão quando a mensagem não diz qual é
+        """
+        rooms = self.client_rooms.get(client_socket)
+        if not rooms:
+            return None
+        if room_id is not None:
+            return room_id if room_id in rooms else None
+        if len(rooms) == 1:
+            return next(iter(rooms))
+        return None
+    
+    def build_pong(self, message, received_at):
+        """Resposta de probe: ecoa o t0 do cliente e informa os instantes do servidor"""
+        return {
+            'command': 'pong',
+            'id': message.get('id'),
+            't0': message.get('t0'),
+            't1': received_at,
+            't2': time.time()
+        }
     
     def relay_message_to_room(self, sender_socket, room_id, message_data):
         """Retransmite uma mensagem para o outro jogador na sala"""
+        relay_message = {
+            'command': 'relay_received',
+            'room_id': room_id,
+            'data': message_data
+        }
+        return self.send_to_peer(sender_socket, room_id, relay_message)
+    
+    def send_to_peer(self, sender_socket, room_id, message):
+        """Envia uma mensagem para o outro jogador da sala de quem enviou"""
         with self.lock:
-            if room_id in self.room_connections:
-                host_socket = self.room_connections[room_id]['host']
-                client_socket = self.room_connections[room_id]['client']
-                
-                # Determinar qual socket é o destinatário
-                if sender_socket == host_socket and client_socket:
-                    recipient = client_socket
-                elif sender_socket == client_socket and host_socket:
-                    recipient = host_socket
-                else:
-                    return  # Não há destinatário válido
-                
-                # Enviar mensagem relay para o destinatário
-                relay_message = {
-                    'command': 'relay_received',
-                    'data': message_data
-                }
-                self.send_message(recipient, relay_message)
+            if room_id not in self.room_connections:
+                return False
+            host_socket = self.room_connections[room_id]['host']
+            client_socket = self.room_connections[room_id]['client']
+            
+            # Determinar qual socket é o destinatário
+            if sender_socket == host_socket and client_socket:
+                recipient = client_socket
+            elif sender_socket == client_socket and host_socket:
+                recipient = host_socket
+            else:
+                return False  # Não há destinatário válido
+        
+        # O envio acontece fora do lock: o FrameWriter do destinatário ordena
+        # os quadros pela prioridade do canal
+        self.send_message(recipient, message)
+        return True
     
     def notify_disconnect(self, disconnected_socket, room_id):
-        """Notifica o outro jogador na sala que um jogador desconectou"""
+        """
+        Notifica o outro jogador na sala que um jogador desconectou
+        A cadeira fica reservada por SEAT_GRACE_PERIOD segundos para que o
+        jogador possa retomar a sessão; só depois disso a saída é definitiva.
+        """
         with self.lock:
-            if room_id in self.room_connections:
-                host_socket = self.room_connections[room_id]['host']
-                client_socket = self.room_connections[room_id]['client']
+            if room_id not in self.room_connections:
+                return
+            connections = self.room_connections[room_id]
+            
+            # Determinar qual papel caiu (se o socket já foi substituído por
+            # uma reconexão, não há nada a fazer)
+            if disconnected_socket == connections['host']:
+                role, other_role = 'host', 'client'
+            elif disconnected_socket == connections['client']:
+                role, other_role = 'client', 'host'
+            else:
+                return
+            
+            connections[role] = None
+            deadline = time.time() + SEAT_GRACE_PERIOD
+            connections['away'][role] = deadline
+            
+            # Avisar o outro jogador que estamos aguardando a reconexão
+            if connections[other_role]:
+                self.send_message(connections[other_role], {
+                    'command': 'relay_received',
+                    'room_id': room_id,
+                    'data': {
+                        'type': 'peer_away',
+                        '_relay_from': role
+                    }
+                })
+        
+        timer = threading.Timer(SEAT_GRACE_PERIOD, self.expire_seat, args=(room_id, role, deadline))
+        timer.daemon = True
+        timer.start()
+    
+    def expire_seat(self, room_id, role, deadline):
+        """Libera a cadeira de quem não voltou dentro do período de tolerância"""
+        with self.lock:
+            connections = self.room_connections.get(room_id)
+            
+            # O jogador voltou (ou caiu de novo, com um novo prazo)
+            if not connections or connections['away'].get(role) != deadline:
+                return
+            del connections['away'][role]
+            
+            other_role = 'client' if role == 'host' else 'host'
+            if connections[other_role]:
+                # Notificar o outro jogador da saída definitiva
+                self.send_message(connections[other_role], {
+                    'command': 'relay_received',
+                    'room_id': room_id,
+                    'data': {
+                        'type': f'{role}_left',
+                        '_relay_from': role
+                    }
+                })
+            
+            # Se ambos desconectaram, limpar a sala completamente
+            if connections['host'] is None and connections['client'] is None:
+                if room_id in self.rooms:
+                    del self.rooms[room_id]
+                del self.room_connections[room_id]
+                self.drop_session_tokens(room_id)
+    
+    def resume_session(self, client_socket, session_token):
+        """Associa a nova conexão à cadeira identificada pelo token"""
+        with self.lock:
+            seat = self.session_tokens.get(session_token)
+            connections = self.room_connections.get(seat[0]) if seat else None
+            
+            if connections is None:
+                # O token volta na resposta para o cliente saber qual cadeira perdeu
+                response = {'command': 'resume_failed', 'reason': 'Sessão expirada', 'session_token': session_token}
+            else:
+                room_id, role = seat
+                old_socket = connections[role]
+                connections[role] = client_socket
+                connections['away'].pop(role, None)
                 
-                # Determinar qual socket está ativo e notificá-lo
-                if disconnected_socket == host_socket and client_socket:
-                    # Host desconectou, notificar cliente
-                    self.send_message(client_socket, {
-                        'command': 'relay_received',
-                        'data': {
-                            'type': 'host_left',
-                            '_relay_from': 'host'
-                        }
-                    })
-                elif disconnected_socket == client_socket and host_socket:
-                    # Cliente desconectou, notificar host
-                    self.send_message(host_socket, {
-                        'command': 'relay_received',
-                        'data': {
-                            'type': 'client_left',
-                            '_relay_from': 'client'
-                        }
-                    })
+                # A conexão antiga (se ainda não caiu) deixa de representar a cadeira
+                if old_socket is not None and old_socket != client_socket:
+                    self.client_rooms.get(old_socket, set()).discard(room_id)
+                self.client_rooms.setdefault(client_socket, set()).add(room_id)
                 
-                # Remover o socket que desconectou
-                if disconnected_socket == host_socket:
-                    self.room_connections[room_id]['host'] = None
-                elif disconnected_socket == client_socket:
-                    self.room_connections[room_id]['client'] = None
+                if role == 'host' and room_id in self.rooms:
+                    self.rooms[room_id]['last_ping'] = time.time()
                 
-                # Se ambos desconectaram, limpar a sala completamente
-                if self.room_connections[room_id]['host'] is None and self.room_connections[room_id]['client'] is None:
-                    if room_id in self.rooms:
-                        del self.rooms[room_id]
-                    del self.room_connections[room_id]
+                response = {'command': 'session_resumed', 'room_id': room_id, 'role': role}
+        
+        self.send_message(client_socket, response)
+    
+    def issue_session_token(self, room_id, role):
+        """Emite o token de uma cadeira (chamar com o lock adquirido)"""
+        token = uuid.uuid4().hex
+        self.session_tokens[token] = (room_id, role)
+        return token
+    
+    def drop_session_tokens(self, room_id):
+        """Remove os tokens de uma sala (chamar com o lock adquirido)"""
+        for token in [t for t, seat in self.session_tokens.items() if seat[0] == room_id]:
+            del self.session_tokens[token]
+        self.drop_udp_seats(room_id)
     
     def send_message(self, client_socket, message):
-        """Envia mensagem para um cliente"""
+        """Envia mensagem para um cliente, no canal correspondente ao comando"""
+        writer = self.writers.get(client_socket) or FrameWriter(client_socket)
         try:
-            client_socket.sendall(json.dumps(message).encode('utf-8'))
+            writer.send(message)
         except Exception as e:
             print(f"Erro ao enviar mensagem: {e}")
     
-    def send_room_list(self, client_socket):
+    def reply(self, client_socket, request, response):
+        """Envia a resposta a uma requisição, ecoando o req_id para o cliente correlacioná-la"""
+        if request.get('req_id') is not None:
+            response['req_id'] = request['req_id']
+        self.send_message(client_socket, response)
+    
+    def send_room_list(self, client_socket, request=None):
         """Envia lista de salas disponíveis para um cliente"""
         with self.lock:
             room_list = [
@@ -306,7 +759,7 @@ class RoomServer:
             'rooms': room_list
         }
         
-        self.send_message(client_socket, response)
+        self.reply(client_socket, request or {}, response)
     
     def create_room(self, room_name, host_ip):
         """Cria uma nova sala"""
@@ -322,18 +775,32 @@ class RoomServer:
         print(f"Sala criada: {room_name} (ID: {room_id}, Host: {host_ip})")
         return room_id
     
+    def room_is_alive(self, room_id, room_info, current_time):
+        """
+        Uma sala está viva enquanto a conexão do host tiver tráfego recente
+        Com o host ausente (reconectando), quem decide é o prazo da cadeira;
+        sem conexão de host, vale o último sinal registrado na própria sala.
+        """
+        connections = self.room_connections.get(room_id, {})
+        host_socket = connections.get('host')
+        if host_socket is not None:
+            last_seen = self.last_seen.get(host_socket, room_info['last_ping'])
+            return current_time - max(last_seen, room_info['last_ping']) <= HOST_SILENCE_TIMEOUT
+        if 'host' in connections.get('away', {}):
+            return True
+        return current_time - room_info['last_ping'] <= ROOM_CLEANUP_INTERVAL
+    
     def cleanup_inactive_rooms(self):
-        """Remove salas inativas (que não receberam ping por um tempo)"""
+        """Remove salas inativas (cujo host parou de enviar mensagens)"""
         while self.running:
-            time.sleep(10)  # Verificar a cada 10 segundos
+            time.sleep(ROOM_CHECK_INTERVAL)
             
             current_time = time.time()
             rooms_to_remove = []
             
             with self.lock:
                 for room_id, room_info in self.rooms.items():
-                    # Se a última atualização foi há mais de ROOM_CLEANUP_INTERVAL segundos
-                    if current_time - room_info['last_ping'] > ROOM_CLEANUP_INTERVAL:
+                    if not self.room_is_alive(room_id, room_info, current_time):
                         rooms_to_remove.append(room_id)
                 
                 # Remover salas inativas
@@ -356,8 +823,29 @@ class RoomServer:
                         del self.room_connections[room_id]
                     
                     del self.rooms[room_id]
+                    self.drop_session_tokens(room_id)
                     print(f"Sala removida por inatividade: {room_id}")
 
+def start_embedded_room_server(transport=None, port=None):
+    """
+    Inicia um servidor de salas dentro do próprio processo, em segundo plano
+    Com um LoopbackTransport nenhuma porta é aberta (testes e benchmarks de
+    ponta a ponta); com TCP ele atende outros jogos na mesma máquina ou rede.
+    Retorna o servidor, ou None se a porta já estiver ocupada.
+    """
+    # O jogo que hospeda o servidor já guarda o próprio histórico e as próprias fichas
+    server = RoomServer(transport, port=port, history_dir=None, ledger_path=None)
+    try:
+        server.listen()
+    except OSError as e:
+        print(f"Servidor de salas embutido indisponível: {e}")
+        return None
+    
+    serve_thread = threading.Thread(target=server.serve)
+    serve_thread.daemon = True
+    serve_thread.start()
+    return server
+
 if __name__ == "__main__":
     server = RoomServer()
     try:
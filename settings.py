@@ -11,6 +11,7 @@ class Settings:
         self.sound_enabled = True
         self.music_enabled = True
         self.music_volume = 50  # Volume da música (0-100)
+        self.bot_policy = BOT_POLICY  # Política do oponente bot ('strategy' ou 'threshold')
         
         # Carrega a imagem de fundo
         self.background_image = pygame.image.load("assets/capa2.png")
@@ -67,6 +68,24 @@ class Settings:
         # Variável para controlar se o slider está sendo arrastado
         self.dragging_slider = False
         
+        # Botões da política do bot
+        self.bot_title_pos = (SCREEN_WIDTH // 2, 490)
+        bot_button_width = 140
+        
+        self.bot_strategy_button = pygame.Rect(
+            SCREEN_WIDTH // 2 - bot_button_width - button_margin,
+            515,
+            bot_button_width,
+            button_height
+        )
+        
+        self.bot_threshold_button = pygame.Rect(
+            SCREEN_WIDTH // 2 + button_margin,
+            515,
+            bot_button_width,
+            button_height
+        )
+        
         # Botão voltar
         self.back_button = pygame.Rect(
             50,
@@ -133,6 +152,21 @@ class Settings:
         status_rect = status_text.get_rect(center=(self.slider_rect.centerx, self.slider_rect.y + 50))
         self.screen.blit(status_text, status_rect)
         
+        # Título "Jeito do Bot"
+        bot_text = self.title_font.render("Jeito do Bot", True, WHITE)
+        bot_rect = bot_text.get_rect(center=self.bot_title_pos)
+        self.screen.blit(bot_text, bot_rect)
+        
+        # Botões da política do bot (Básica/Limite)
+        for button, policy, label in ((self.bot_strategy_button, 'strategy', "Básica"),
+                                      (self.bot_threshold_button, 'threshold', f"Limite {BOT_STAND_ON}")):
+            button_color = GOLD if self.bot_policy == policy else GRAY
+            pygame.draw.rect(self.screen, button_color, button, border_radius=8)
+            pygame.draw.rect(self.screen, BLACK, button, 4, border_radius=10)  # Contorno preto
+            policy_text = self.custom_font.render(label, True, BLACK)
+            policy_text_rect = policy_text.get_rect(center=button.center)
+            self.screen.blit(policy_text, policy_text_rect)
+        
         # Botão "Voltar"
         pygame.draw.rect(self.screen, GOLD, self.back_button, border_radius=8)
         pygame.draw.rect(self.screen, BLACK, self.back_button, 4, border_radius=10)  # Contorno preto
@@ -0,0 +1,248 @@
+"""
+Simulador Monte Carlo de mãos de blackjack em lote, com NumPy
+
+Joga milhões de mãos como arrays: cada linha é uma rodada do modo lockstep
+(sapato de SHOE_DECKS baralhos, assentos intercalados como no SeatDeck) e
+os dois jogadores seguem a política de limite do engine (pedir carta abaixo
+de stand_on). O resultado segue o TableEngine.result: quem estoura perde, e
+se o jogador local estoura a rodada acaba antes do remoto jogar.
+Cada rodada sai de um sapato recém-embaralhado: o jogo reaproveita o sapato
+até o corte, mas as cartas das rodadas anteriores não entram na simulação.
+
+O NumPy é opcional para o resto do jogo: só este módulo precisa dele.
+
+Uso: python simulator.py [--hands 1000000] [--decks 6] [--local-stand 17] [--remote-stand 17]
+"""
+import argparse
+import math
+import random
+import time
+from functools import partial
+from card import Shoe, DECK_SIZE, CARD_HARD_VALUE, CARD_IS_ACE
+from constants import SHOE_DECKS
+from engine import TableEngine, LOCAL_WINS, REMOTE_WINS, PUSH
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+BLACKJACK = 21
+SEATS = 2
+
+# Valor z do intervalo de confiança de 95%
+Z_95 = 1.959964
+
+class SimulationResult:
+    """Contagem de resultados (do ponto de vista do jogador local) e estouros"""
+    def __init__(self):
+        self.hands = 0
+        self.outcomes = {LOCAL_WINS: 0, REMOTE_WINS: 0, PUSH: 0}
+        self.local_busts = 0
+        self.remote_busts = 0
+        self.elapsed = 0.0
+    
+    def add(self, other):
+        self.hands += other.hands
+        for outcome in self.outcomes:
+            self.outcomes[outcome] += other.outcomes[outcome]
+        self.local_busts += other.local_busts
+        self.remote_busts += other.remote_busts
+        self.elapsed += other.elapsed
+    
+    def rate(self, outcome):
+        return self.outcomes[outcome] / self.hands if self.hands else 0.0
+    
+    def confidence_interval(self, outcome, z=Z_95):
+        """Intervalo de Wilson para a taxa do resultado (95% por padrão)"""
+        if not self.hands:
+            return (0.0, 1.0)
+        p = self.rate(outcome)
+        n = self.hands
+        center = (p + z * z / (2 * n)) / (1 + z * z / n)
+        margin = z * math.sqrt(p * (1 - p) / n + z * z / (4 * n * n)) / (1 + z * z / n)
+        return (center - margin, center + margin)
+    
+    def edge(self):
+        """Vantagem do jogador local: vitórias menos derrotas por mão"""
+        return self.rate(LOCAL_WINS) - self.rate(REMOTE_WINS)
+    
+    def hands_per_second(self):
+        return self.hands / self.elapsed if self.elapsed else 0.0
+    
+    def report(self):
+        lines = [f"{self.hands:,} mãos em {self.elapsed:.2f} s ({self.hands_per_second():,.0f} mãos/s)"]
+        for outcome, label in ((LOCAL_WINS, "local vence"), (REMOTE_WINS, "remoto vence"), (PUSH, "empate")):
+            low, high = self.confidence_interval(outcome)
+            lines.append(f"{label:<14} {self.rate(outcome):.4%}  IC95% [{low:.4%}, {high:.4%}]")
+        lines.append(f"estouros      local {self.local_busts / self.hands:.4%}  remoto {self.remote_busts / self.hands:.4%}")
+        lines.append(f"vantagem local {self.edge():+.4%}")
+        return "\n".join(lines)
+
+def require_numpy():
+    if np is None:
+        raise RuntimeError("O simulador precisa do NumPy: pip install numpy")
+
+def card_tables(decks=1):
+    """
+    Tabelas por carta do sapato de decks baralhos para o NumPy
+    A carta p do sapato é a carta p % DECK_SIZE. CODE soma o valor duro
+    (ás = 1) nos 6 bits baixos e 64 por ás, então uma única soma por mão
+    guarda o total duro e a contagem de ases. WORD e BIT localizam a carta
+    na máscara de cartas já compradas de cada sapato (64 cartas por palavra).
+    """
+    positions = np.arange(DECK_SIZE * decks)
+    code = np.array([value + 64 * is_ace for value, is_ace in zip(CARD_HARD_VALUE, CARD_IS_ACE)], dtype=np.int16)
+    word = positions // 64
+    bit = np.left_shift(np.uint64(1), (positions % 64).astype(np.uint64))
+    return code[positions % DECK_SIZE], word, bit
+
+def draw_cards(rng, used, rows, word_table, bit_table):
+    """
+    Próxima carta do sapato de cada linha em rows: sorteia entre todas as
+    cartas e sorteia de novo só nas linhas em que a carta já saiu; used é a
+    máscara das compradas (as palavras de cada linha em sequência) e recebe
+    as cartas compradas agora
+    Equivale a comprar a próxima posição de um sapato embaralhado, sem
+    precisar guardar as posições de cada sapato.
+    """
+    size = len(word_table)
+    first_word = rows * (word_table[-1] + 1)
+    cards = rng.integers(0, size, len(rows))
+    slots = first_word + word_table[cards]
+    clash = np.flatnonzero(used[slots] & bit_table[cards])
+    while len(clash):
+        retry = rng.integers(0, size, len(clash))
+        retry_slots = first_word[clash] + word_table[retry]
+        free = (used[retry_slots] & bit_table[retry]) == 0
+        cards[clash[free]] = retry[free]
+        slots[clash[free]] = retry_slots[free]
+        clash = clash[~free]
+    used[slots] |= bit_table[cards]
+    return cards
+
+def play_batch(rng, count, stands, decks=SHOE_DECKS):
+    """
+    Totais finais (2 x count) dos dois assentos com a política "pedir abaixo do limite"
+    As posições do sapato são compradas em ordem, como no SeatDeck: as pares
+    pelo assento 0 e as ímpares pelo assento 1. Cada linha sai do lote assim
+    que o assento para, então as compras seguintes custam só as mãos ativas.
+    """
+    code_table, word_table, bit_table = card_tables(decks)
+    used = np.zeros(count * (word_table[-1] + 1), dtype=np.uint64)
+    totals = np.zeros((SEATS, count), dtype=np.int16)
+    rows = [np.arange(count) for _ in range(SEATS)]
+    sums = [np.zeros(count, dtype=np.int16) for _ in range(SEATS)]
+    
+    for position in range(len(code_table)):
+        seat = position % SEATS
+        active = rows[seat]
+        if not len(active):
+            if not any(len(other) for other in rows):
+                break
+            continue
+        
+        cards = draw_cards(rng, used, active, word_table, bit_table)
+        hand = sums[seat]
+        hand += code_table[cards]
+        if position < SEATS:
+            continue  # Ninguém decide antes da segunda carta
+        
+        # Total do Player: duro, mais 10 se houver ás e couber
+        hard = hand & 63
+        total = np.where((hand >= 64) & (hard <= BLACKJACK - 10), hard + 10, hard)
+        done = total >= stands[seat]
+        totals[seat, active[done]] = total[done]
+        rows[seat] = active[~done]
+        sums[seat] = hand[~done]
+    return totals
+
+def simulate_batch(rng, count, local_stand=17, remote_stand=17, decks=SHOE_DECKS):
+    """Joga count rodadas de uma vez e retorna o SimulationResult"""
+    start = time.perf_counter()
+    local, remote = play_batch(rng, count, (local_stand, remote_stand), decks)
+    
+    local_bust = local > BLACKJACK
+    remote_bust = (remote > BLACKJACK) & ~local_bust
+    decided = local_bust | remote_bust
+    local_wins = remote_bust | (~decided & (local > remote))
+    remote_wins = local_bust | (~decided & (remote > local))
+    
+    result = SimulationResult()
+    result.hands = count
+    result.outcomes[LOCAL_WINS] = int(np.count_nonzero(local_wins))
+    result.outcomes[REMOTE_WINS] = int(np.count_nonzero(remote_wins))
+    result.outcomes[PUSH] = count - result.outcomes[LOCAL_WINS] - result.outcomes[REMOTE_WINS]
+    result.local_busts = int(np.count_nonzero(local_bust))
+    result.remote_busts = int(np.count_nonzero(remote_bust))
+    result.elapsed = time.perf_counter() - start
+    return result
+
+def check_stands(local_stand, remote_stand, decks):
+    if not (1 < local_stand <= BLACKJACK and 1 < remote_stand <= BLACKJACK):
+        raise ValueError("O limite para parar precisa estar entre 2 e 21")
+    if decks < 1:
+        raise ValueError("O sapato precisa de pelo menos um baralho")
+
+def simulate(hands, local_stand=17, remote_stand=17, seed=None, batch_size=1000000, decks=SHOE_DECKS):
+    """Joga hands rodadas em lotes de batch_size (limita a memória) e soma os resultados"""
+    require_numpy()
+    check_stands(local_stand, remote_stand, decks)
+    rng = np.random.default_rng(seed)
+    total = SimulationResult()
+    remaining = hands
+    while remaining > 0:
+        count = min(batch_size, remaining)
+        total.add(simulate_batch(rng, count, local_stand, remote_stand, decks))
+        remaining -= count
+    return total
+
+def simulate_reference(hands, local_stand=17, remote_stand=17, seed=None, decks=SHOE_DECKS):
+    """
+    As mesmas rodadas jogadas uma a uma pelo TableEngine, sem NumPy
+    Serve de referência para conferir as taxas do simulador e de base para o benchmark.
+    """
+    check_stands(local_stand, remote_stand, decks)
+    rng = random.Random(seed)
+    # Sapato embaralhado a cada rodada (corte na posição 0), como no simulador em lote
+    engine = TableEngine(partial(Shoe, decks, 0))
+    result = SimulationResult()
+    start = time.perf_counter()
+    for _ in range(hands):
+        engine.new_lockstep_round(rng.getrandbits(64), 0)
+        engine.deal_initial_cards()
+        while engine.can_act() and engine.local_player.score < local_stand:
+            engine.hit()
+        if engine.can_act():
+            engine.stand()
+        if engine.local_player.status != "busted":
+            while engine.remote_player.status == "playing" and engine.remote_player.score < remote_stand:
+                engine.remote_hit()
+            if engine.remote_player.status == "playing":
+                engine.remote_stand()
+        result.outcomes[engine.result()] += 1
+        result.local_busts += engine.local_player.busted
+        result.remote_busts += engine.remote_player.busted
+    result.hands = hands
+    result.elapsed = time.perf_counter() - start
+    return result
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--hands', type=int, default=1000000)
+    parser.add_argument('--decks', type=int, default=SHOE_DECKS)
+    parser.add_argument('--local-stand', type=int, default=17)
+    parser.add_argument('--remote-stand', type=int, default=17)
+    parser.add_argument('--batch', type=int, default=1000000)
+    parser.add_argument('--seed', type=int, default=None)
+    args = parser.parse_args()
+    
+    try:
+        result = simulate(args.hands, args.local_stand, args.remote_stand, args.seed, args.batch, args.decks)
+    except (RuntimeError, ValueError) as e:
+        print(f"Erro: {e}")
+        return
+    print(result.report())
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,260 @@
+#!/usr/bin/env python3
+"""
+Estratégia e valor esperado (EV) das decisões de pedir carta ou parar
+
+O oponente mantém as cartas viradas até o fim da rodada, então a decisão
+depende só da nossa mão e do sapato: as cartas do oponente são posições
+quaisquer do sapato sem as nossas. O EV de parar vem da distribuição do
+total final do oponente (que pede carta abaixo de STRATEGY_OPPONENT_STAND)
+e o EV de pedir é calculado por recursão memoizada sobre a composição da
+mão (quantas cartas de cada valor), exata para o número de baralhos do sapato.
+
+As tabelas cobrem todas as mãos possíveis, ficam em cache num arquivo JSON
+e a consulta é um acesso a dicionário pela composição mantida pelo Player.
+
+Uso: python strategy.py [--decks 6] [--opponent-stand 17] [--rebuild]
+"""
+import argparse
+import json
+import os
+import time
+from constants import SHOE_DECKS, STRATEGY_OPPONENT_STAND, STRATEGY_CACHE_DIR
+from card import COMPOSITION_BITS
+
+BLACKJACK = 21
+BUST = BLACKJACK + 1  # Posição dos estouros na distribuição do oponente
+RANK_VALUES = 10  # Valores duros 1 (ás) a 10
+
+HIT = 'hit'
+STAND = 'stand'
+
+def best_total(hard, aces):
+    return hard + 10 if aces and hard <= BLACKJACK - 10 else hard
+
+def composition_key(counts):
+    """Composição (quantidade por valor duro) na mesma codificação do Player.composition"""
+    key = 0
+    for value, count in enumerate(counts):
+        key += count << (COMPOSITION_BITS * value)
+    return key
+
+def opponent_terminals(stand_on):
+    """
+    Mãos finais possíveis do oponente, independentes do sapato
+    A probabilidade de uma sequência de compras só depende de quantas
+    cartas de cada valor ela tem, não da ordem; então basta contar quantas
+    ordens (weight) levam a cada mão final sem parar antes. Retorna
+    [(((valor, quantidade), ...), cartas, total final, weight)].
+    """
+    empty = (0,) * RANK_VALUES
+    drawing = {empty: 1}
+    final = {}
+    frontier = [empty]
+    while frontier:
+        following = {}
+        for counts in frontier:
+            orders = drawing[counts]
+            cards = sum(counts)
+            hard = sum((value + 1) * count for value, count in enumerate(counts))
+            for value in range(RANK_VALUES):
+                grown = counts[:value] + (counts[value] + 1,) + counts[value + 1:]
+                total = best_total(hard + value + 1, grown[0])
+                target = final if cards + 1 >= 2 and total >= stand_on else following
+                target[grown] = target.get(grown, 0) + orders
+        for counts, orders in following.items():
+            drawing[counts] = orders
+        frontier = list(following)
+    
+    terminals = []
+    for counts, orders in final.items():
+        hard = sum((value + 1) * count for value, count in enumerate(counts))
+        total = min(best_total(hard, counts[0]), BUST)
+        items = tuple((value, count) for value, count in enumerate(counts) if count)
+        terminals.append((items, sum(counts), total, orders))
+    return terminals
+
+class StrategyTable:
+    """
+    EV de parar e de pedir para cada composição de mão, do ponto de vista do
+    jogador que decide (+1 vitória, -1 derrota, 0 empate)
+    """
+    VERSION = 1
+    
+    def __init__(self, decks=SHOE_DECKS, opponent_stand=STRATEGY_OPPONENT_STAND):
+        self.decks = decks
+        self.opponent_stand = opponent_stand
+        self.entries = {}  # {composição: (ev_parar, ev_pedir)}
+    
+    def shoe_counts(self):
+        return [4 * self.decks] * (RANK_VALUES - 1) + [16 * self.decks]
+    
+    def opponent_distribution(self, counts, full, terminals):
+        """Probabilidade de cada total final do oponente (BUST para estouro) sem as cartas de counts"""
+        remaining = [full[value] - counts[value] for value in range(RANK_VALUES)]
+        total_cards = sum(remaining)
+        
+        # Produtos decrescentes n(n-1)...(n-k+1), por valor e pelo total do sapato
+        falling = []
+        for available in remaining:
+            row = [1.0]
+            for taken in range(BLACKJACK):
+                row.append(row[-1] * max(available - taken, 0))
+            falling.append(row)
+        denominators = [1.0]
+        for taken in range(BLACKJACK + 1):
+            denominators.append(denominators[-1] * (total_cards - taken))
+        
+        distribution = [0.0] * (BUST + 1)
+        for items, cards, total, orders in terminals:
+            probability = orders
+            for value, count in items:
+                probability *= falling[value][count]
+            distribution[total] += probability / denominators[cards]
+        return distribution
+    
+    def stand_ev(self, total, distribution):
+        # O oponente nunca termina abaixo do limite dele, então as posições baixas valem zero
+        win = distribution[BUST] + sum(distribution[:total])
+        lose = sum(distribution[total + 1:BUST])
+        return win - lose
+    
+    def build(self):
+        """Calcula as tabelas para todas as mãos de duas ou mais cartas sem estouro"""
+        full = self.shoe_counts()
+        terminals = opponent_terminals(self.opponent_stand)
+        entries = {}
+        
+        def best_ev(counts, hard):
+            key = composition_key(counts)
+            if key in entries:
+                return max(entries[key])
+            
+            stand = self.stand_ev(best_total(hard, counts[0]), self.opponent_distribution(counts, full, terminals))
+            remaining = [full[value] - counts[value] for value in range(RANK_VALUES)]
+            total_cards = sum(remaining)
+            hit = 0.0
+            for value in range(RANK_VALUES):
+                if not remaining[value]:
+                    continue
+                probability = remaining[value] / total_cards
+                if hard + value + 1 > BLACKJACK:
+                    hit -= probability
+                else:
+                    grown = counts[:value] + (counts[value] + 1,) + counts[value + 1:]
+                    hit += probability * best_ev(grown, hard + value + 1)
+            entries[key] = (stand, hit)
+            return max(stand, hit)
+        
+        for first in range(RANK_VALUES):
+            for second in range(first, RANK_VALUES):
+                counts = [0] * RANK_VALUES
+                counts[first] += 1
+                counts[second] += 1
+                if all(counts[value] <= full[value] for value in range(RANK_VALUES)):
+                    best_ev(tuple(counts), first + second + 2)
+        self.entries = entries
+        return self
+    
+    def lookup(self, composition):
+        """(ev_parar, ev_pedir) da mão, ou None para composições fora da tabela (mão estourada)"""
+        return self.entries.get(composition)
+    
+    def action(self, composition):
+        evs = self.entries.get(composition)
+        if evs is None:
+            return None
+        return HIT if evs[1] > evs[0] else STAND
+    
+    def hint(self, player):
+        """Dica para o jogador: (ação, ev_parar, ev_pedir), ou None"""
+        evs = self.entries.get(player.composition)
+        if evs is None:
+            return None
+        return (HIT if evs[1] > evs[0] else STAND, evs[0], evs[1])
+    
+    def cache_path(self, cache_dir=STRATEGY_CACHE_DIR):
+        return os.path.join(cache_dir, f"strategy-{self.decks}d-s{self.opponent_stand}.json")
+    
+    def save(self, path):
+        data = {
+            'version': self.VERSION,
+            'decks': self.decks,
+            'opponent_stand': self.opponent_stand,
+            'entries': [[key, stand, hit] for key, (stand, hit) in self.entries.items()]
+        }
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with open(path, 'w') as file:
+            json.dump(data, file)
+    
+    def load(self, path):
+        """Carrega as tabelas do arquivo; retorna False se ele não existe ou é de outra configuração"""
+        try:
+            with open(path) as file:
+                data = json.load(file)
+            if (data['version'], data['decks'], data['opponent_stand']) != (self.VERSION, self.decks, self.opponent_stand):
+                return False
+            entries = {int(key): (float(stand), float(hit)) for key, stand, hit in data['entries']}
+        except FileNotFoundError:
+            return False
+        except (OSError, KeyError, TypeError, ValueError) as e:
+            # JSON válido com outro formato também cai aqui, e as tabelas são recalculadas
+            print(f"Cache de estratégia inválido ({path}): {e}")
+            return False
+        self.entries = entries
+        return True
+
+def load_or_build(decks=SHOE_DECKS, opponent_stand=STRATEGY_OPPONENT_STAND, cache_dir=STRATEGY_CACHE_DIR):
+    """Tabelas do cache ou, na primeira vez, calculadas e gravadas nele (alguns segundos)"""
+    table = StrategyTable(decks, opponent_stand)
+    path = table.cache_path(cache_dir)
+    if table.load(path):
+        return table
+    table.build()
+    try:
+        table.save(path)
+    except OSError as e:
+        print(f"Não foi possível gravar o cache de estratégia: {e}")
+    return table
+
+class StrategyPolicy:
+    """Bot que segue a tabela de estratégia (para headless.HeadlessMatch e o torneio)"""
+    def __init__(self, table):
+        self.table = table
+    
+    def wants_hit(self, engine):
+        return self.table.action(engine.local_player.composition) == HIT
+    
+    def __repr__(self):
+        return f"StrategyPolicy({self.table.decks} baralhos)"
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--decks', type=int, default=SHOE_DECKS)
+    parser.add_argument('--opponent-stand', type=int, default=STRATEGY_OPPONENT_STAND)
+    parser.add_argument('--rebuild', action='store_true', help="ignora o cache")
+    args = parser.parse_args()
+    
+    start = time.perf_counter()
+    if args.rebuild:
+        table = StrategyTable(args.decks, args.opponent_stand).build()
+        table.save(table.cache_path())
+    else:
+        table = load_or_build(args.decks, args.opponent_stand)
+    print(f"{len(table.entries)} mãos em {time.perf_counter() - start:.2f} s")
+    
+    # Tabela das mãos iniciais
+    ranks = ['A', '2', '3', '4', '5', '6', '7', '8', '9', '10']
+    for first in range(RANK_VALUES):
+        for second in range(first, RANK_VALUES):
+            counts = [0] * RANK_VALUES
+            counts[first] += 1
+            counts[second] += 1
+            stand, hit = table.lookup(composition_key(counts))
+            total = best_total(first + second + 2, counts[0])
+            action = "pedir" if hit > stand else "parar"
+            print(f"{ranks[first]:>2},{ranks[second]:<2} ({total:>2})  {action:<5}  parar {stand:+.3f}  pedir {hit:+.3f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,557 @@
+import hashlib
+import random
+import threading
+import time
+from constants import *
+from card import encode_hand, decode_hand
+from engine import TableEngine, LOCAL_WINS, REMOTE_WINS, PUSH
+from lockstep import hand_digest
+from network import NetworkManager
+from recorder import MatchRecorder, RecordingHeader, recording_path
+
+# Estados em que a mesa está aberta; qualquer outro estado (MENU, ROOM_LIST)
+# indica que a partida acabou e a mesa pode ser fechada
+TABLE_STATES = (GameState.WAITING, GameState.PLAYING, GameState.GAME_OVER)
+
+RESULT_TEXT = {LOCAL_WINS: "Você venceu!", REMOTE_WINS: "Oponente venceu!", PUSH: "Empate!"}
+
+# Resultado de cada jogador (local, remoto) no histórico de mãos
+HAND_OUTCOMES = {LOCAL_WINS: ('win', 'loss'), REMOTE_WINS: ('loss', 'win'), PUSH: ('push', 'push')}
+
+def table_seed(room_id, match_seed=MATCH_SEED):
+    """Semente da mesa: derivada de match_seed e da sala, ou sorteada pelo sistema se match_seed for None"""
+    if match_seed is None:
+        return random.SystemRandom().getrandbits(64)
+    digest = hashlib.sha256(f"{match_seed}:{room_id}".encode('utf-8')).digest()
+    return int.from_bytes(digest[:8], 'big')
+
+class Table:
+    """
+    Uma mesa aberta: as regras ficam no TableEngine e a mesa liga o engine à
+    rede e à interface
+    Cada mesa tem o seu engine e o seu NetworkManager (que a enxerga como
+    "game"); o servidor de salas, o renderer, o som e o sapato (shoe_factory)
+    são do aplicativo e compartilhados por todas as mesas.
+    Todo o acaso da mesa sai da semente (seed): o engine embaralha com um
+    random.Random dela e os nonces do lockstep também derivam dela, então a
+    semente e as mensagens recebidas bastam para reproduzir a partida.
+    """
+    def __init__(self, app, room_id, name=None, seed=None):
+        self.app = app
+        self.room_id = room_id
+        self.name = name or room_id
+        self.seed = table_seed(room_id) if seed is None else seed
+        self.engine = TableEngine(app.shoe_factory, random.Random(self.seed))
+        
+        # Tela para a qual a mesa foi encerrada (MENU, ROOM_LIST), fora das fases do engine
+        self.exit_state = None
+        
+        self.network = NetworkManager(self, app.game_transport)
+        self.recorder = None
+        
+        # Aposta de cada mão, liquidada nas fichas do jogador quando a rodada termina
+        self.stake = TABLE_STAKE
+        
+        # Cada rodada terminada vai para o histórico de mãos e para as fichas;
+        # pending_record marca a rodada cujo registro espera o host (record_hand)
+        self.engine.on_round_over = self.record_hand
+        self.pending_record = False
+    
+    @property
+    def game_state(self):
+        return self.exit_state or self.engine.state
+    
+    @game_state.setter
+    def game_state(self, state):
+        if state in TABLE_STATES:
+            self.engine.state = state
+            self.exit_state = None
+        else:
+            self.exit_state = state
+    
+    # Estado da partida, lido e escrito também pelo NetworkManager
+    @property
+    def deck(self):
+        return self.engine.deck
+    
+    @deck.setter
+    def deck(self, deck):
+        self.engine.deck = deck
+    
+    @property
+    def local_player(self):
+        return self.engine.local_player
+    
+    @local_player.setter
+    def local_player(self, player):
+        self.engine.local_player = player
+    
+    @property
+    def remote_player(self):
+        return self.engine.remote_player
+    
+    @remote_player.setter
+    def remote_player(self, player):
+        self.engine.remote_player = player
+    
+    @property
+    def room_client(self):
+        return self.app.room_client
+    
+    @property
+    def renderer(self):
+        return self.app.renderer
+    
+    @property
+    def sound_manager(self):
+        return self.app.sound_manager
+    
+    @property
+    def is_host(self):
+        return self.network.is_host
+    
+    @property
+    def player_name(self):
+        return self.app.player_name
+    
+    def bank(self):
+        """(saldo, aposta) do jogador local para a tela, None sem o livro de fichas"""
+        if not self.app.ledger:
+            return None
+        return (self.app.ledger.balance(self.player_name), self.stake)
+    
+    def is_open(self):
+        return self.game_state in TABLE_STATES
+    
+    def summary(self):
+        """Resumo da mesa para a miniatura; muda apenas quando algo visível muda"""
+        return (
+            self.name,
+            self.game_state.name,
+            self.local_player.score,
+            self.local_player.status,
+            len(self.remote_player.hand),
+            self.remote_player.status
+        )
+    
+    def reset_view(self):
+        """Reseta o painel de fim de jogo do renderer, se esta for a mesa em exibição"""
+        if self.app.tables.active is self:
+            self.renderer.reset_game_state()
+    
+    def nonce_rng(self, is_host):
+        """Gerador dos nonces do lockstep, derivado da semente e do papel da mesa"""
+        return random.Random(f"{self.seed}:{'host' if is_host else 'client'}")
+    
+    def start_recording(self, is_host, use_relay):
+        self.stop_recording()
+        header = RecordingHeader(self.seed, is_host, use_relay, self.network.lockstep, self.room_id or "")
+        try:
+            self.recorder = MatchRecorder(recording_path(RECORDINGS_DIR, header), header)
+        except OSError as e:
+            print(f"Não foi possível gravar a partida: {e}")
+            return
+        self.network.recorder = self.recorder
+    
+    def stop_recording(self):
+        if self.recorder:
+            self.recorder.close()
+        self.recorder = None
+        self.network.recorder = None
+    
+    def initialize(self, is_host, peer_address=None, use_relay=False):
+        if RECORD_MATCHES:
+            self.start_recording(is_host, use_relay)
+        
+        self.engine.new_round()
+        
+        # Reseta o estado do jogo no renderer
+        self.reset_view()
+        
+        self.network.nonce_rng = self.nonce_rng(is_host)
+        
+        # Networking setup - agora com suporte a relay
+        self.network.setup_network(is_host, peer_address, self.room_id, use_relay)
+        
+        if is_host:
+            self.game_state = GameState.WAITING
+        else:
+            # Client immediately tries to connect
+            self.game_state = GameState.PLAYING
+    
+    def deal_initial_cards(self):
+        # Apenas o host distribui cartas para o jogador remoto (sem lockstep)
+        self.engine.deal_initial_cards(deal_remote=self.network.is_host)
+        
+        # No lockstep os dois lados derivam as mesmas cartas, nada precisa ser enviado
+        if not self.network.lockstep_active:
+            self.network.send_game_state(self.local_player)
+    
+    def start_lockstep_round(self, seed):
+        """Inicia uma rodada a partir da semente combinada com o outro jogador"""
+        # Host usa o assento 0 e o cliente o assento 1 do mesmo baralho
+        self.engine.new_lockstep_round(seed, 0 if self.network.is_host else 1)
+        self.reset_view()
+        self.deal_initial_cards()
+    
+    def handle_remote_intent(self, message):
+        """Aplica localmente uma ação (hit/stand) do outro jogador no modo lockstep"""
+        if not self.network.accept_intent(message):
+            return
+        
+        # Ação da rodada anterior que chegou depois do reinício (o host pode
+        # reiniciar logo após estourar): a rodada nova ainda não tem cartas
+        if not self.local_player.hand:
+            if message['type'] == 'hit':
+                self.engine.discard_remote_hit()
+            return
+        
+        if message['type'] == 'hit':
+            self.engine.remote_hit()
+        else:
+            self.engine.remote_stand()
+        if self.pending_record and self.remote_player.status != "playing":
+            self.flush_record()
+        
+        # Hash divergente indica que os baralhos dessincronizaram
+        if message.get('h') is not None and message['h'] != hand_digest(self.remote_player.hand):
+            print("Dessincronização detectada, solicitando estado completo")
+            self.network.send_message({'type': 'resync_request'})
+    
+    def handle_message(self, message):
+        msg_type = message.get('type')
+        
+        if msg_type in ('handshake_ack', 'seed_nonce', 'seed_reveal'):
+            # Troca de semente do modo lockstep
+            seed = self.network.handle_lockstep_message(message)
+            if seed is not None:
+                self.start_lockstep_round(seed)
+            elif msg_type == 'handshake_ack' and not self.network.lockstep_active:
+                # Host sem lockstep: o cliente distribui as próprias cartas
+                self.game_state = GameState.PLAYING
+                self.deal_initial_cards()
+        
+        elif msg_type in ('hit', 'stand') and self.network.lockstep_active:
+            self.handle_remote_intent(message)
+        
+        elif msg_type == 'resync_request':
+            # O outro lado detectou dessincronização: envia o estado completo
+            self.network.send_game_state(self.local_player)
+        
+        elif msg_type == 'deck_check':
+            # Depois de uma retomada: o cursor do assento do outro lado na
+            # mesma rodada precisa ser o que temos para ele
+            if self.engine.lockstep and self.engine.round_id is not None and message.get('round') == self.engine.round_id \
+                    and message.get('cursor') != self.engine.remote_deck.position:
+                print("Cursores do sapato divergem depois da retomada, embaralhando de novo")
+                self.resync_deck()
+        
+        elif msg_type == 'deck_resync' and self.network.is_host:
+            self.resync_deck()
+        
+        elif msg_type == 'game_state':
+            # Mão do oponente a partir dos índices recebidos (cartas do registro, já com sprite)
+            cards = decode_hand(message.get('hand', []))
+            
+            # O engine finaliza a partida se o oponente estourou ou os dois pararam
+            self.engine.set_remote_hand(cards, message.get('status', 'playing'))
+        
+        elif msg_type == 'restart_game' and message.get('commit') and self.network.lockstep:
+            # Reinício no modo lockstep: respondemos ao commit do host e as
+            # cartas são distribuídas quando o host revelar a semente
+            self.flush_record()
+            if message.get('reshuffle'):
+                self.engine.shoe_synced = False
+            self.engine.reset_players()
+            self.reset_view()
+            self.game_state = GameState.PLAYING
+            self.network.respond_seed_commit(message['commit'])
+        
+        elif msg_type == 'restart_game':
+            # O host iniciou um novo jogo, então reiniciamos também
+            # A diferença é que não enviamos mensagem de reinício de volta (para evitar loop)
+            self.flush_record()
+            self.engine.new_round()
+            self.reset_view()
+            
+            # Distribui as cartas iniciais para o jogador local; as do
+            # jogador remoto chegam do host via game_state
+            self.deal_initial_cards()
+        
+        elif msg_type == 'host_left':
+            # O host saiu da mesa, então também devemos voltar para a lista de salas
+            print("O host saiu da mesa. Retornando para a lista de salas.")
+            self.flush_record()
+            self.network.close_connection()
+            self.game_state = GameState.ROOM_LIST
+            self.room_client.list_rooms()
+    
+    def hit(self):
+        if self.recorder:
+            self.recorder.action('hit')
+        if not self.engine.can_act():
+            return
+        
+        # Reproduz o som da carta sendo puxada
+        self.sound_manager.play_card_sound()
+        self.engine.hit()
+        
+        if self.network.lockstep_active:
+            # Apenas a intenção vai pela rede; o outro lado compra a mesma carta
+            self.network.send_intent('hit', self.local_player)
+        else:
+            self.network.send_message({'type': 'hit'})
+            self.network.send_game_state(self.local_player)
+    
+    def stand(self):
+        if self.recorder:
+            self.recorder.action('stand')
+        if not self.engine.stand():
+            return
+        if self.network.lockstep_active:
+            self.network.send_intent('stand', self.local_player)
+        else:
+            self.network.send_message({'type': 'stand'})
+            self.network.send_game_state(self.local_player)
+    
+    def result(self):
+        """Resultado da rodada do nosso lado; num estouro duplo perde o host, nos dois lados"""
+        return self.engine.result(self.is_host)
+    
+    def determine_winner(self):
+        return RESULT_TEXT[self.result()]
+    
+    def hand_record(self, engine):
+        """A rodada terminada como evento do histórico: jogadores, cartas, ações, resultado e tempos"""
+        names = (self.player_name, self.network.peer_name or "Oponente")
+        players = []
+        for player, name, outcome in zip((engine.local_player, engine.remote_player), names, HAND_OUTCOMES[engine.result(self.is_host)]):
+            players.append({
+                'name': name,
+                'cards': encode_hand(player.hand),
+                'score': player.score,
+                'status': player.status,
+                'outcome': outcome
+            })
+        return {
+            't': engine.round_started,
+            'round': engine.round_id,
+            'duration': round(time.time() - engine.round_started, 3),
+            'room': self.room_id,
+            'seat': 'host' if self.is_host else 'client',
+            'lockstep': self.network.lockstep_active,
+            'decks': engine.shoe.decks if engine.shoe else None,
+            'wager': self.stake,
+            'players': players,
+            'actions': [list(action) for action in engine.actions]
+        }
+    
+    def record_hand(self, engine):
+        """
+        Fim da rodada (engine.on_round_over): registra a mão, a não ser que
+        o resultado ainda possa mudar. No lockstep, se o cliente estourou
+        com o host ainda jogando, o host pode ter estourado ao mesmo tempo
+        (e aí quem perde é ele, TableEngine.result); a ação dele ainda está
+        a caminho. O registro espera essa ação ou o fim da rodada no host
+        (reinício ou saída), em flush_record.
+        """
+        if (self.network.lockstep_active and not self.is_host
+                and self.local_player.status == "busted" and self.remote_player.status == "playing"):
+            self.pending_record = True
+            return
+        self.save_hand(engine)
+    
+    def flush_record(self):
+        """Registra a rodada que esperava pelo host, com o que se sabe agora"""
+        if self.pending_record:
+            self.pending_record = False
+            self.save_hand(self.engine)
+    
+    def save_hand(self, engine):
+        """
+        Guarda a rodada no histórico local, liquida a aposta do jogador local
+        e, se estivermos numa sala do servidor, informa o servidor (que
+        liquida os dois jogadores quando as duas cadeiras confirmarem a
+        rodada); nada disso espera pelo disco
+        """
+        history = self.app.hand_history
+        ledger = self.app.ledger
+        room_client = self.room_client
+        report = room_client is not None and room_client.seat(self.room_id) is not None
+        if not history and not ledger and not report:
+            return
+        hand = self.hand_record(engine)
+        if history:
+            history.append(hand)
+        if ledger:
+            ledger.settle_hand(hand, hand['players'][:1])
+        if report:
+            room_client.report_hand(self.room_id, hand)
+    
+    def restart_game(self):
+        if self.recorder:
+            self.recorder.action('restart')
+        if self.network.lockstep_active and self.network.is_host:
+            # Nova semente por commit-reveal; as cartas são distribuídas
+            # quando o cliente responder com o nonce dele
+            self.engine.reset_players()
+            self.reset_view()
+            self.game_state = GameState.PLAYING
+            commitment = self.network.begin_seed_exchange()
+            restart = {'type': 'restart_game', 'commit': commitment}
+            if not self.engine.shoe_synced:
+                # O sapato será embaralhado pela nova semente: o cliente também embaralha
+                restart['reshuffle'] = True
+            self.network.send_message(restart)
+            return
+        
+        self.engine.new_round()
+        self.reset_view()
+        
+        # Envia mensagem para o oponente informando que o jogo foi reiniciado
+        if self.network.is_host:
+            self.network.send_message({'type': 'restart_game'})
+        
+        # Distribui as cartas iniciais
+        self.deal_initial_cards()
+    
+    def send_deck_check(self):
+        """
+        Depois de uma retomada no lockstep: informa a rodada e o cursor do
+        nosso assento; como as nossas compras foram enviadas antes, o outro
+        lado precisa ter o mesmo cursor para o nosso assento
+        """
+        if self.engine.lockstep and self.engine.round_id is not None:
+            self.network.send_message({'type': 'deck_check', 'round': self.engine.round_id, 'cursor': self.engine.local_deck.position})
+    
+    def resync_deck(self):
+        """
+        Sapatos divergentes: os dois lados embaralham de novo com a próxima
+        semente; o host reinicia a rodada se ela já foi distribuída (com uma
+        troca de semente em andamento, a rodada nova já embaralha)
+        """
+        self.engine.shoe_synced = False
+        if not self.network.is_host:
+            self.network.send_message({'type': 'deck_resync'})
+        elif self.engine.round_id is not None:
+            self.restart_game()
+    
+    def leave(self, notify_peer=False):
+        """Sai da mesa: avisa o outro jogador, libera a sala no servidor e fecha a conexão"""
+        if notify_peer:
+            self.network.send_message({'type': 'host_left'})
+        self.flush_record()
+        self.room_client.leave_room(self.room_id)
+        self.network.close_connection()
+        self.stop_recording()
+        self.game_state = GameState.ROOM_LIST
+    
+    def lan_announcement(self):
+        """Mesa anunciada na rede local: apenas enquanto o host aguarda um oponente"""
+        if self.game_state != GameState.WAITING or not self.network.is_host or not self.network.room_id:
+            return None
+        return {'id': self.network.room_id, 'name': self.name, 'port': GAME_PORT}
+
+class TableManager:
+    """
+    Mesas abertas ao mesmo tempo (multi-mesa)
+    Todas compartilham a conexão do RoomClient: as mensagens de relay chegam
+    por ela com o room_id e são encaminhadas para a mesa correspondente. Só a
+    mesa ativa é desenhada por completo; as outras aparecem como miniaturas.
+    Mesas sem o servidor de salas disputam a porta GAME_PORT, então apenas
+    uma delas pode ser hospedada por conexão direta.
+    """
+    def __init__(self, app):
+        self.app = app
+        self.tables = {}  # {room_id: Table}, na ordem de abertura
+        self.active_id = None
+        self.lock = threading.Lock()
+    
+    def __len__(self):
+        return len(self.tables)
+    
+    def __iter__(self):
+        with self.lock:
+            return iter(list(self.tables.values()))
+    
+    @property
+    def active(self):
+        return self.tables.get(self.active_id)
+    
+    def get(self, room_id):
+        return self.tables.get(room_id)
+    
+    def open(self, room_id, name=None):
+        """Abre uma mesa para a sala (ou retorna a que já estiver aberta)"""
+        with self.lock:
+            table = self.tables.get(room_id)
+            if table is None:
+                table = Table(self.app, room_id, name)
+                self.tables[room_id] = table
+        return table
+    
+    def activate(self, room_id):
+        """Passa a exibir a mesa informada"""
+        if room_id not in self.tables or room_id == self.active_id:
+            return
+        self.active_id = room_id
+        
+        # O painel de fim de jogo é da mesa anterior
+        self.app.renderer.reset_game_state()
+    
+    def cycle(self, step=1):
+        """Ativa a próxima (ou a anterior) mesa aberta"""
+        room_ids = list(self.tables)
+        if not room_ids:
+            return
+        index = room_ids.index(self.active_id) if self.active_id in room_ids else -step
+        self.activate(room_ids[(index + step) % len(room_ids)])
+    
+    def prune(self):
+        """Remove as mesas cuja partida acabou e retorna a lista das removidas"""
+        with self.lock:
+            closed = [table for table in self.tables.values() if not table.is_open()]
+            for table in closed:
+                del self.tables[table.room_id]
+        
+        for table in closed:
+            table.stop_recording()
+            if table.network.running:
+                # close_connection espera as threads da mesa, então roda à parte
+                thread = threading.Thread(target=table.network.close_connection)
+                thread.daemon = True
+                thread.start()
+        
+        if self.active_id not in self.tables:
+            self.active_id = None
+            self.cycle()
+        return closed
+    
+    def route_relay(self, room_id, data):
+        """Entrega uma mensagem de relay à mesa da sala (ou à ativa, se vier sem room_id)"""
+        table = self.tables.get(room_id) if room_id else self.active
+        if table is None:
+            return False
+        table.network.handle_relay_message(data)
+        return True
+    
+    def lan_table(self):
+        """Primeira mesa hospedada que está aguardando oponente, para a descoberta na rede local"""
+        for table in self:
+            announcement = table.lan_announcement()
+            if announcement:
+                return announcement
+        return None
+    
+    def close_all(self):
+        """Fecha as conexões de todas as mesas em paralelo"""
+        threads = []
+        for table in self:
+            table.flush_record()
+            table.stop_recording()
+            thread = threading.Thread(target=table.network.close_connection)
+            thread.daemon = True
+            thread.start()
+            threads.append(thread)
+        for thread in threads:
+            thread.join()
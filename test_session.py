@@ -0,0 +1,41 @@
+"""
+Limites da sessão (outbox e reordenação) numa partida sem interface
+
+Rodar com: python -m pytest -q test_session.py
+"""
+from constants import GameState, OUTBOX_SIZE
+from headless import HeadlessMatch, ThresholdPolicy
+
+def started_match():
+    match = HeadlessMatch(7, ThresholdPolicy(), ThresholdPolicy())
+    match.start()
+    return match
+
+def test_receiving_side_acknowledges_on_its_own():
+    match = started_match()
+    host, client = match.host.network, match.client.network
+    for _ in range(3 * OUTBOX_SIZE):
+        assert host.send_message({'type': 'noop'})
+        match.link.pump()
+    assert len(host.outbox) <= OUTBOX_SIZE // 2
+    assert host.is_connected and client.is_connected
+
+def test_full_outbox_ends_the_match():
+    match = started_match()
+    host = match.host.network
+    for _ in range(OUTBOX_SIZE - len(host.outbox)):
+        assert host.send_message({'type': 'noop'})
+    match.link.queue.clear()  # O cliente nunca recebe nem confirma
+    assert not host.send_message({'type': 'noop'})
+    assert len(host.outbox) == OUTBOX_SIZE
+    assert not host.is_connected
+    assert match.host.game_state == GameState.MENU
+
+def test_message_beyond_the_window_ends_the_match():
+    match = started_match()
+    client = match.client.network
+    seq = client.last_received_seq + OUTBOX_SIZE + 1
+    client.process_incoming({'type': 'noop', '_seq': seq, '_ack': 0})
+    assert not client.reorder_buffer
+    assert not client.is_connected
+    assert match.client.game_state == GameState.MENU
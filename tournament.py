@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+"""
+Torneio de partidas entre bots, sem interface, em vários processos
+
+Cada partida é uma headless.HeadlessMatch (duas mesas de verdade trocando
+mensagens em memória) e tem semente própria, derivada da semente do torneio
+e do número da partida: o mesmo torneio repete as mesmas cartas e decisões
+em qualquer número de processos. As partidas vão para um
+ProcessPoolExecutor em lotes e os resultados são somados conforme os lotes
+terminam.
+
+Uso: python tournament.py [--matches 2000] [--rounds 5] [--workers N]
+"""
+import argparse
+import contextlib
+import hashlib
+import io
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from engine import LOCAL_WINS, REMOTE_WINS, PUSH
+from headless import HeadlessMatch, MatchResult, ThresholdPolicy
+
+def match_seed(tournament_seed, index):
+    """Semente da partida index: independe de qual processo a joga"""
+    digest = hashlib.sha256(f"{tournament_seed}:{index}".encode('utf-8')).digest()
+    return int.from_bytes(digest[:8], 'big')
+
+def play_chunk(tournament_seed, first, count, rounds, host_policy, client_policy):
+    """Joga as partidas first..first+count-1 (num processo do pool) e retorna a soma"""
+    total = MatchResult()
+    # As mensagens de conexão do NetworkManager não interessam no torneio
+    with contextlib.redirect_stdout(io.StringIO()):
+        for index in range(first, first + count):
+            match = HeadlessMatch(match_seed(tournament_seed, index), host_policy, client_policy)
+            total.add(match.play(rounds))
+    return total
+
+def chunks(matches, chunk_size):
+    for first in range(0, matches, chunk_size):
+        yield first, min(chunk_size, matches - first)
+
+def run_tournament(matches, rounds=5, host_policy=None, client_policy=None, workers=None,
+                   seed=0, chunk_size=50, progress=None):
+    """
+    Joga o torneio e retorna (MatchResult somado, segundos de relógio)
+    progress(parcial) é chamado a cada lote concluído, com a soma até ali.
+    workers=1 joga no próprio processo, sem pool.
+    """
+    host_policy = host_policy or ThresholdPolicy()
+    client_policy = client_policy or ThresholdPolicy()
+    total = MatchResult()
+    start = time.perf_counter()
+    
+    if workers == 1:
+        for first, count in chunks(matches, chunk_size):
+            total.add(play_chunk(seed, first, count, rounds, host_policy, client_policy))
+            if progress:
+                progress(total)
+        return total, time.perf_counter() - start
+    
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = [
+            executor.submit(play_chunk, seed, first, count, rounds, host_policy, client_policy)
+            for first, count in chunks(matches, chunk_size)
+        ]
+        for future in as_completed(futures):
+            total.add(future.result())
+            if progress:
+                progress(total)
+    return total, time.perf_counter() - start
+
+def report(result, wall_time):
+    lines = [f"{result.matches} partidas, {result.rounds} rodadas em {wall_time:.2f} s ({result.matches / wall_time:,.0f} partidas/s)"]
+    for outcome, label in ((LOCAL_WINS, "host vence"), (REMOTE_WINS, "cliente vence"), (PUSH, "empate")):
+        lines.append(f"{label:<14} {result.rate(outcome):.2%}")
+    lines.append(f"mensagens      {result.messages} ({result.messages / max(result.rounds, 1):.1f} por rodada)")
+    lines.append(f"divergências   {result.disagreements}  travadas {result.stalled}")
+    return "\n".join(lines)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--matches', type=int, default=2000)
+    parser.add_argument('--rounds', type=int, default=5)
+    parser.add_argument('--workers', type=int, default=os.cpu_count())
+    parser.add_argument('--host-stand', type=int, default=17)
+    parser.add_argument('--client-stand', type=int, default=17)
+    parser.add_argument('--chunk', type=int, default=50)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+    
+    def progress(partial):
+        print(f"\r{partial.matches}/{args.matches} partidas", end='', flush=True)
+    
+    result, wall_time = run_tournament(
+        args.matches, args.rounds,
+        ThresholdPolicy(args.host_stand), ThresholdPolicy(args.client_stand),
+        args.workers, args.seed, args.chunk, progress
+    )
+    print()
+    print(report(result, wall_time))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,173 @@
+import socket
+import queue
+import threading
+import itertools
+
+class TcpTransport:
+    """
+    Transporte padrão: conexões TCP reais
+    listen() e connect() devolvem sockets comuns; qualquer transporte com a
+    mesma interface (e objetos de conexão com sendall/recv/settimeout/
+    shutdown/close) pode ser usado no NetworkManager, RoomClient e RoomServer.
+    """
+    in_process = False
+    datagram = False
+    
+    def listen(self, port, host='0.0.0.0', backlog=1):
+        """Abre um socket de escuta na porta informada"""
+        listen_socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        listen_socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        try:
+            listen_socket.bind((host, port))
+            listen_socket.listen(backlog)
+        except OSError:
+            listen_socket.close()
+            raise
+        return listen_socket
+    
+    def connect(self, host, port, timeout=None):
+        """Conecta ao endereço informado (levanta OSError em caso de falha)"""
+        connection = socket.create_connection((host, port), timeout=timeout)
+        
+        # Mensagens pequenas e interativas: sem esperar o algoritmo de Nagle
+        connection.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        return connection
+
+class LoopbackTransport:
+    """
+    Transporte em memória, dentro do mesmo processo
+    Cada conexão é um par de filas de bytes e as portas "abertas" ficam num
+    registro do próprio transporte, então nada é aberto no sistema. Todas as
+    instâncias que compartilham o mesmo LoopbackTransport se enxergam,
+    independentemente do host informado no connect.
+    """
+    in_process = True
+    datagram = False
+    
+    def __init__(self):
+        self.listeners = {}  # {porta: LoopbackListener}
+        self.lock = threading.Lock()
+        self.connection_ids = itertools.count(1)
+    
+    def listen(self, port, host='0.0.0.0', backlog=1):
+        with self.lock:
+            if port in self.listeners:
+                raise OSError(f"Porta {port} já está em uso no transporte em memória")
+            listener = LoopbackListener(self, port)
+            self.listeners[port] = listener
+        return listener
+    
+    def connect(self, host, port, timeout=None):
+        with self.lock:
+            listener = self.listeners.get(port)
+        if listener is None:
+            raise ConnectionRefusedError(f"Nada escutando na porta {port}")
+        
+        connection_id = next(self.connection_ids)
+        local = LoopbackConnection(('loopback', port))
+        remote = LoopbackConnection(('loopback', connection_id))
+        local.peer, remote.peer = remote, local
+        listener.backlog.put(remote)
+        return local
+    
+    def release(self, port, listener):
+        with self.lock:
+            if self.listeners.get(port) is listener:
+                del self.listeners[port]
+
+class LoopbackListener:
+    """Equivalente ao socket de escuta para o LoopbackTransport"""
+    def __init__(self, transport, port):
+        self.transport = transport
+        self.port = port
+        self.backlog = queue.Queue()
+        self.timeout = None
+        self.closed = False
+    
+    def settimeout(self, timeout):
+        self.timeout = timeout
+    
+    def setsockopt(self, *args):
+        pass
+    
+    def accept(self):
+        if self.closed:
+            raise OSError("Listener fechado")
+        try:
+            connection = self.backlog.get(timeout=self.timeout)
+        except queue.Empty:
+            raise socket.timeout("timed out")
+        if connection is None:
+            raise OSError("Listener fechado")
+        return connection, connection.address
+    
+    def shutdown(self, how=None):
+        self.close()
+    
+    def close(self):
+        if self.closed:
+            return
+        self.closed = True
+        self.transport.release(self.port, self)
+        
+        # Acorda quem estiver bloqueado no accept
+        self.backlog.put(None)
+
+class LoopbackConnection:
+    """Uma ponta de uma conexão em memória, com a interface de socket usada no jogo"""
+    def __init__(self, address):
+        self.address = address
+        self.peer = None
+        self.incoming = queue.Queue()
+        self.pending = b""
+        self.timeout = None
+        self.eof = False
+        self.shut = False
+        self.closed = False
+    
+    def settimeout(self, timeout):
+        self.timeout = timeout
+    
+    def gettimeout(self):
+        return self.timeout
+    
+    def setsockopt(self, *args):
+        pass
+    
+    def getpeername(self):
+        return self.peer.address if self.peer else self.address
+    
+    def sendall(self, data):
+        if self.shut or self.peer is None or self.peer.shut:
+            raise BrokenPipeError("Conexão em memória encerrada")
+        self.peer.incoming.put(bytes(data))
+    
+    def recv(self, size):
+        if self.closed:
+            raise OSError("Conexão em memória fechada")
+        if not self.pending and not self.eof:
+            try:
+                chunk = self.incoming.get(timeout=self.timeout)
+            except queue.Empty:
+                raise socket.timeout("timed out")
+            if chunk == b"":
+                self.eof = True
+            self.pending = chunk
+        
+        data, self.pending = self.pending[:size], self.pending[size:]
+        return data
+    
+    def shutdown(self, how=None):
+        """Sinaliza fim de conexão para os dois lados (recv passa a retornar b"")"""
+        if self.shut:
+            return
+        self.shut = True
+        self.incoming.put(b"")
+        if self.peer:
+            self.peer.incoming.put(b"")
+    
+    def close(self):
+        if self.closed:
+            return
+        self.shutdown()
+        self.closed = True
@@ -0,0 +1,431 @@
+import socket
+import struct
+import threading
+import queue
+import random
+import time
+from constants import UDP_MIN_RTO, UDP_MAX_RETRIES, UDP_TICK
+from net_stats import LinkStats
+
+# Cabeçalho de cada datagrama: tipo, canal, id de quem enviou, seq, ack
+# cumulativo, bitmap de acks seletivos e posição no canal ordenado
+HEADER = struct.Struct('!BBIIIII')
+MAX_PAYLOAD = 1200 - HEADER.size
+
+# Tipos de datagrama
+SYN, SYN_ACK, DATA, ACK, FIN, REGISTER, REGISTERED = range(1, 8)
+
+# Canais de DATA
+UNORDERED, ORDERED = 0, 1
+
+# Intervalo entre REGISTERs enquanto o outro jogador não aparece no relay
+REGISTER_INTERVAL = 1.0
+
+def pack(kind, sender_id=0, channel=UNORDERED, seq=0, ack=0, ack_bits=0, order=0, payload=b""):
+    return HEADER.pack(kind, channel, sender_id, seq, ack, ack_bits, order) + payload
+
+def unpack(datagram):
+    """Retorna (tipo, canal, id, seq, ack, ack_bits, ordem, payload) ou None se inválido"""
+    if len(datagram) < HEADER.size:
+        return None
+    return HEADER.unpack_from(datagram) + (datagram[HEADER.size:],)
+
+class UdpTransport:
+    """
+    Transporte UDP com entrega confiável para as mensagens do jogo
+    Cada mensagem vira um datagrama numerado; o receptor confirma com um ack
+    cumulativo e um bitmap dos 32 seguintes, então só o que realmente se
+    perdeu é retransmitido (o RTO vem do RTT medido). Duplicatas são
+    descartadas e mensagens do canal ordenado (estado do jogo, reinício)
+    são entregues na ordem; as demais são entregues assim que chegam, sem
+    esperar por perdas anteriores.
+    """
+    in_process = False
+    datagram = True
+    
+    def listen(self, port, host='0.0.0.0', backlog=1):
+        listen_socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        listen_socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        try:
+            listen_socket.bind((host, port))
+        except OSError:
+            listen_socket.close()
+            raise
+        return UdpListener(listen_socket)
+    
+    def connect(self, host, port, timeout=None):
+        """Conecta diretamente a um UdpListener (handshake SYN/SYN_ACK)"""
+        connection = self.open_connection(host, port)
+        if not connection.handshake(pack(SYN, connection.local_id), SYN_ACK, timeout):
+            connection.close()
+            raise socket.timeout(f"Sem resposta UDP de {host}:{port}")
+        return connection
+    
+    def connect_relay(self, host, port, session_token, timeout=None):
+        """
+        Conecta ao relay UDP do servidor de salas
+        O servidor associa o endereço à cadeira pelo token da sessão e repassa
+        os datagramas, sem abrir o conteúdo, para a outra cadeira da sala.
+        """
+        connection = self.open_connection(host, port)
+        connection.register_payload = session_token.encode('utf-8')
+        register = pack(REGISTER, connection.local_id, payload=connection.register_payload)
+        if not connection.handshake(register, REGISTERED, timeout):
+            connection.close()
+            raise socket.timeout(f"Relay UDP de {host}:{port} não respondeu")
+        if connection.refused:
+            connection.close()
+            raise ConnectionRefusedError("Sessão não reconhecida pelo relay UDP")
+        return connection
+    
+    def open_connection(self, host, port):
+        udp_socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        udp_socket.connect((socket.gethostbyname(host), port))
+        udp_socket.settimeout(UDP_TICK)
+        connection = UdpConnection(udp_socket, udp_socket.getpeername(), owns_socket=True)
+        connection.start()
+        return connection
+
+class UdpListener:
+    """Socket UDP de escuta: separa os datagramas por endereço de origem"""
+    def __init__(self, udp_socket):
+        self.socket = udp_socket
+        self.socket.settimeout(UDP_TICK)
+        self.connections = {}  # {endereço: UdpConnection}
+        self.backlog = queue.Queue()
+        self.timeout = None
+        self.running = True
+        
+        self.thread = threading.Thread(target=self.receive_loop)
+        self.thread.daemon = True
+        self.thread.start()
+    
+    def settimeout(self, timeout):
+        self.timeout = timeout
+    
+    def setsockopt(self, *args):
+        pass
+    
+    def accept(self):
+        if not self.running:
+            raise OSError("Listener UDP fechado")
+        try:
+            connection = self.backlog.get(timeout=self.timeout)
+        except queue.Empty:
+            raise socket.timeout("timed out")
+        if connection is None:
+            raise OSError("Listener UDP fechado")
+        return connection, connection.address
+    
+    def receive_loop(self):
+        while self.running:
+            try:
+                datagram, addr = self.socket.recvfrom(2048)
+            except socket.timeout:
+                datagram = None
+            except OSError:
+                break
+            
+            if datagram:
+                self.handle_datagram(datagram, addr)
+            
+            now = time.time()
+            for addr, connection in list(self.connections.items()):
+                if connection.closed:
+                    del self.connections[addr]
+                else:
+                    connection.tick(now)
+    
+    def handle_datagram(self, datagram, addr):
+        packet = unpack(datagram)
+        if packet is None:
+            return
+        connection = self.connections.get(addr)
+        
+        if packet[0] == SYN:
+            if connection is None or connection.peer_id != packet[2]:
+                # Nova conexão (ou o outro lado reabriu a dele)
+                if connection is not None:
+                    connection.mark_dead()
+                connection = UdpConnection(self.socket, addr, owns_socket=False)
+                connection.peer_id = packet[2]
+                self.connections[addr] = connection
+                self.backlog.put(connection)
+            # Responde também a SYNs repetidos (o SYN_ACK anterior pode ter se perdido)
+            connection.send_raw(pack(SYN_ACK, connection.local_id))
+            return
+        
+        if connection is not None:
+            connection.handle_packet(packet)
+    
+    def shutdown(self, how=None):
+        self.close()
+    
+    def close(self):
+        if not self.running:
+            return
+        self.running = False
+        for connection in list(self.connections.values()):
+            connection.close()
+        self.backlog.put(None)
+        try:
+            self.socket.close()
+        except OSError:
+            pass
+
+class UdpConnection:
+    """Uma conexão UDP confiável, com a interface de socket usada pelo NetworkManager"""
+    def __init__(self, udp_socket, address, owns_socket):
+        self.socket = udp_socket
+        self.address = address
+        self.owns_socket = owns_socket
+        self.local_id = random.getrandbits(32)
+        self.peer_id = None
+        self.lock = threading.Lock()
+        self.stats = LinkStats('udp')
+        
+        # Envio: {seq: [canal, ordem, payload, primeiro envio, último envio, tentativas]}
+        self.next_seq = 1
+        self.next_order = 1
+        self.unacked = {}
+        
+        # Recepção: ack cumulativo, seqs recebidos acima dele e fila do canal ordenado
+        self.recv_cumulative = 0
+        self.recv_above = set()
+        self.expected_order = 1
+        self.order_buffer = {}
+        
+        self.delivered = queue.Queue()
+        self.pending = b""
+        self.timeout = None
+        self.eof = False
+        self.closed = False
+        
+        # Handshake (SYN_ACK ou REGISTERED) e estado do relay
+        self.handshake_event = threading.Event()
+        self.expected_reply = None
+        self.register_payload = None
+        self.last_register = 0
+        self.peer_present = False
+        self.refused = False
+    
+    def start(self):
+        """Inicia a thread de recepção (apenas conexões que têm o próprio socket)"""
+        self.thread = threading.Thread(target=self.receive_loop)
+        self.thread.daemon = True
+        self.thread.start()
+    
+    def receive_loop(self):
+        while not self.closed:
+            try:
+                datagram = self.socket.recv(2048)
+            except socket.timeout:
+                datagram = None
+            except OSError:
+                # Porta fechada do outro lado (ICMP) ou socket fechado
+                if not self.handshake_event.is_set():
+                    time.sleep(UDP_TICK)
+                    continue
+                self.mark_dead()
+                break
+            
+            if datagram:
+                packet = unpack(datagram)
+                if packet is not None:
+                    self.handle_packet(packet)
+            self.tick(time.time())
+    
+    def handshake(self, datagram, expected_reply, timeout):
+        """Repete o datagrama até receber a resposta esperada ou o prazo acabar"""
+        self.expected_reply = expected_reply
+        deadline = time.time() + (timeout or 5.0)
+        while time.time() < deadline:
+            self.send_raw(datagram)
+            self.last_register = time.time()
+            if self.handshake_event.wait(min(0.25, max(0.0, deadline - time.time()))):
+                return True
+        return False
+    
+    def send_raw(self, datagram):
+        try:
+            if self.owns_socket:
+                self.socket.send(datagram)
+            else:
+                self.socket.sendto(datagram, self.address)
+        except OSError:
+            pass
+    
+    def settimeout(self, timeout):
+        self.timeout = timeout
+    
+    def setsockopt(self, *args):
+        pass
+    
+    def getpeername(self):
+        return self.address
+    
+    def ack_fields(self):
+        """Ack cumulativo e bitmap dos 32 seqs seguintes já recebidos (chamar com o lock)"""
+        bits = 0
+        base = self.recv_cumulative + 2
+        for offset in range(32):
+            if base + offset in self.recv_above:
+                bits |= 1 << offset
+        return self.recv_cumulative, bits
+    
+    def sendall(self, data, ordered=False):
+        """Envia uma mensagem (um datagrama); ordered=True usa o canal ordenado"""
+        if self.closed or self.eof:
+            raise BrokenPipeError("Conexão UDP encerrada")
+        if len(data) > MAX_PAYLOAD:
+            raise ValueError(f"Mensagem de {len(data)} bytes excede o limite do datagrama")
+        
+        with self.lock:
+            seq = self.next_seq
+            self.next_seq += 1
+            channel, order = UNORDERED, 0
+            if ordered:
+                channel, order = ORDERED, self.next_order
+                self.next_order += 1
+            now = time.time()
+            self.unacked[seq] = [channel, order, data, now, now, 0]
+            ack, bits = self.ack_fields()
+        self.send_raw(pack(DATA, self.local_id, channel, seq, ack, bits, order, data))
+    
+    def handle_packet(self, packet):
+        kind, channel, sender_id, seq, ack, ack_bits, order, payload = packet
+        
+        if kind in (SYN_ACK, REGISTERED):
+            if kind == REGISTERED:
+                # O relay informa se a outra cadeira já registrou o endereço dela
+                self.refused = payload == b"!"
+                self.peer_present = payload == b"1"
+            elif self.peer_id is None:
+                self.peer_id = sender_id
+            if kind == self.expected_reply:
+                self.handshake_event.set()
+            return
+        
+        with self.lock:
+            if self.peer_id is not None and sender_id != self.peer_id and kind == DATA:
+                # O outro lado reabriu a conexão: recomeça a numeração de recepção
+                self.recv_cumulative = 0
+                self.recv_above.clear()
+                self.expected_order = 1
+                self.order_buffer.clear()
+            self.peer_id = sender_id
+            self.peer_present = True
+            self.process_acks(ack, ack_bits)
+            
+            if kind == DATA:
+                self.receive_data(channel, seq, order, payload)
+                ack, bits = self.ack_fields()
+                reply = pack(ACK, self.local_id, ack=ack, ack_bits=bits)
+            else:
+                reply = None
+        
+        if reply:
+            self.send_raw(reply)
+        if kind == FIN:
+            self.mark_dead()
+    
+    def process_acks(self, ack, ack_bits):
+        """Remove do envio os datagramas confirmados e mede o RTT (chamar com o lock)"""
+        now = time.time()
+        acked = [seq for seq in self.unacked if seq <= ack]
+        for offset in range(32):
+            if ack_bits & (1 << offset):
+                acked.append(ack + 2 + offset)
+        for seq in acked:
+            entry = self.unacked.pop(seq, None)
+            # Algoritmo de Karn: só amostra o RTT de quem não foi retransmitido
+            if entry and entry[5] == 0:
+                self.stats.add_rtt_sample(now - entry[3])
+    
+    def receive_data(self, channel, seq, order, payload):
+        """Descarta duplicatas e entrega a mensagem (chamar com o lock)"""
+        if seq <= self.recv_cumulative or seq in self.recv_above:
+            return
+        self.recv_above.add(seq)
+        while self.recv_cumulative + 1 in self.recv_above:
+            self.recv_cumulative += 1
+            self.recv_above.discard(self.recv_cumulative)
+        
+        if channel != ORDERED:
+            self.delivered.put(payload)
+            return
+        
+        self.order_buffer[order] = payload
+        while self.expected_order in self.order_buffer:
+            self.delivered.put(self.order_buffer.pop(self.expected_order))
+            self.expected_order += 1
+    
+    def tick(self, now):
+        """Retransmite o que passou do RTO e mantém o registro no relay"""
+        if self.closed or self.eof:
+            return
+        if self.register_payload and not self.peer_present and now - self.last_register >= REGISTER_INTERVAL:
+            self.last_register = now
+            self.send_raw(pack(REGISTER, self.local_id, payload=self.register_payload))
+        
+        resend = []
+        dead = False
+        with self.lock:
+            rto = self.stats.rto(UDP_MIN_RTO) or UDP_MIN_RTO * 4
+            ack, bits = self.ack_fields()
+            for seq, entry in self.unacked.items():
+                if now - entry[4] < rto * (2 ** entry[5]):
+                    continue
+                if entry[5] >= UDP_MAX_RETRIES:
+                    dead = True
+                    break
+                entry[4] = now
+                entry[5] += 1
+                resend.append(pack(DATA, self.local_id, entry[0], seq, ack, bits, entry[1], entry[2]))
+        
+        if dead:
+            print("Conexão UDP sem resposta, encerrando")
+            self.mark_dead()
+            return
+        for datagram in resend:
+            self.send_raw(datagram)
+    
+    def in_flight(self):
+        return len(self.unacked)
+    
+    def mark_dead(self):
+        """Sinaliza fim de conexão para quem estiver no recv"""
+        if not self.eof:
+            self.eof = True
+            self.delivered.put(b"")
+    
+    def recv(self, size):
+        if self.closed:
+            raise OSError("Conexão UDP fechada")
+        if not self.pending:
+            try:
+                self.pending = self.delivered.get(timeout=self.timeout)
+            except queue.Empty:
+                raise socket.timeout("timed out")
+            if not self.pending:
+                # Mantém o sinal de fim para as próximas leituras
+                self.delivered.put(b"")
+                return b""
+        data, self.pending = self.pending[:size], self.pending[size:]
+        return data
+    
+    def shutdown(self, how=None):
+        if not self.eof:
+            self.send_raw(pack(FIN, self.local_id))
+        self.mark_dead()
+    
+    def close(self):
+        if self.closed:
+            return
+        self.shutdown()
+        self.closed = True
+        if self.owns_socket:
+            try:
+                self.socket.close()
+            except OSError:
+                pass